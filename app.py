@@ -7,7 +7,8 @@ import streamlit as st
 import random
 import torch
 
-from src.graph import graph
+from src.graph import answer_cache, invoke_graph
+from src.registry import registry
 
 torch.classes.__path__ = []
 
@@ -21,8 +22,8 @@ st.set_page_config(page_title="Advanced-RAG", layout="wide")
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-if "graph" not in st.session_state:
-    st.session_state.graph = graph
+# Warm up models and clients in background (no-op if already running or done)
+registry.warmup(background=True)
 
 if "config" not in st.session_state:
     st.session_state.config = {"configurable": {"thread_id": str(random.randint(0, 1000))}}
@@ -51,7 +52,7 @@ if prompt := st.chat_input("What would you like to know?"):
             full_response = ""
 
             try:
-                result = st.session_state.graph.invoke(
+                result = invoke_graph(
                     {
                         "question": prompt, # user question
                         "iterations": 0, # reset generations iterations
@@ -72,6 +73,15 @@ if prompt := st.chat_input("What would you like to know?"):
 
 
 with st.sidebar:
+    with st.expander("🔥 Components status"):
+        for name, status in registry.status().items():
+            st.caption(f"- {name}: {status}")
+    with st.expander("💾 Answer cache"):
+        if registry.is_ready(["answer_cache"]):
+            for name, value in answer_cache.stats().items():
+                st.caption(f"- {name}: {value}")
+        else:
+            st.caption("- not loaded yet")
     with st.expander("⚙️ Tools"):
         st.caption(
             "- Pinecone Vector Database: vector database used to store and retrieve KB via semantic search."
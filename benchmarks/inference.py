@@ -0,0 +1,251 @@
+"""
+Benchmark of the fp32 PyTorch models against their int8 ONNX Runtime exports.
+
+For both the embedding model and the reranker it reports latency and throughput
+of each backend, the speed-up, and the accuracy loss of the quantization:
+* embeddings: cosine similarity between fp32 and int8 vectors.
+* reranker: Spearman rank correlation of the scores and top-k agreement per query.
+
+Usage: `python -m benchmarks.inference [--n-passages 256] [--output results.json]`.
+"""
+
+# Import packages and modules
+
+import argparse
+import json
+import time
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from src.constants import (
+    EMBEDDING_MODEL,
+    ONNX_BACKEND,
+    RERANKER_MODEL,
+    TOP_K,
+)
+from src.utils.logging import logger
+
+QUERIES = [
+    "What is chain of thought prompting?",
+    "How do LLM agents use memory?",
+    "What are adversarial attacks on LLMs?",
+    "What is few-shot prompting?",
+    "How does an agent plan with task decomposition?",
+    "What is token manipulation in adversarial attacks?",
+    "How does ReAct combine reasoning and acting?",
+    "What is a jailbreak prompt?",
+]
+
+PASSAGES = [
+    "Chain of thought prompting generates a sequence of short sentences describing the reasoning step by step.",
+    "Few-shot learning presents a set of high-quality demonstrations, each consisting of input and desired output.",
+    "Zero-shot learning simply feeds the task text to the model and asks for results.",
+    "Short-term memory is in-context learning, long-term memory relies on an external vector store.",
+    "Maximum inner product search retrieves the memories closest to the query embedding.",
+    "Task decomposition breaks a complicated task into smaller and simpler steps.",
+    "ReAct integrates reasoning and acting by extending the action space with language.",
+    "Reflexion equips agents with dynamic memory and self-reflection capabilities.",
+    "Adversarial attacks are inputs that trigger the model to output something undesired.",
+    "Token manipulation alters a small fraction of tokens in the input text to trigger model failure.",
+    "Jailbreak prompting adversarially triggers LLMs to output harmful content that should have been mitigated.",
+    "Gradient based attacks optimize the adversarial suffix with access to the model weights.",
+    "Automatic prompt engineering searches over a pool of instruction candidates.",
+    "Self-consistency sampling picks the majority vote among multiple sampled answers.",
+    "Tool use lets the agent call external APIs for missing information.",
+    "Red-teaming with humans in the loop finds failure modes of the model.",
+]
+
+
+# Define functions
+def _time(
+    function: Callable[[], Any],
+    repeats: int,
+) -> tuple[Any, float]:
+    """
+    Run a function several times after a warm-up call.
+
+    :param function: function to time
+    :type function: Callable[[], Any]
+    :param repeats: number of timed runs
+    :type repeats: int
+    :return: output of the last run and median latency in seconds
+    :rtype: tuple[Any, float]
+    """
+    output = function()  # warm-up (graph optimizations, lazy allocations)
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = function()
+        latencies.append(time.perf_counter() - start)
+
+    return output, float(np.median(latencies))
+
+
+def _rank(
+    values: np.ndarray,
+) -> np.ndarray:
+    """
+    Ranks of the values (ties are broken by position).
+
+    :param values: values to rank
+    :type values: np.ndarray
+    :return: rank of each value
+    :rtype: np.ndarray
+    """
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values)] = np.arange(len(values))
+    return ranks
+
+
+def spearman_correlation(
+    first: np.ndarray,
+    second: np.ndarray,
+) -> float:
+    """
+    Spearman rank correlation of two score vectors.
+
+    :param first: first scores
+    :type first: np.ndarray
+    :param second: second scores
+    :type second: np.ndarray
+    :return: rank correlation, between -1 and 1
+    :rtype: float
+    """
+    return float(np.corrcoef(_rank(first), _rank(second))[0, 1])
+
+
+def benchmark_embeddings(
+    passages: list[str],
+    repeats: int,
+) -> dict[str, Any]:
+    """
+    Compare the fp32 and int8 embedding models.
+
+    :param passages: texts to embed
+    :type passages: list[str]
+    :param repeats: number of timed runs
+    :type repeats: int
+    :return: latency, throughput and agreement metrics
+    :rtype: dict[str, Any]
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    from src.onnx_models import build_onnx_embeddings
+
+    models = {
+        "fp32": HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL, model_kwargs={"device": "cpu"}),
+        "int8": build_onnx_embeddings(
+            model_name=EMBEDDING_MODEL,
+            cache_dir=ONNX_BACKEND.get("cache_dir"),
+            quantization=ONNX_BACKEND.get("quantization"),
+        ),
+    }
+    vectors, results = {}, {}
+    for backend, model in models.items():
+        logger.info(f"Benchmarking {backend} embeddings on {len(passages)} passages...")
+        output, latency = _time(lambda: model.embed_documents(passages), repeats)
+        vectors[backend] = np.asarray(output)
+        results[backend] = {
+            "latency_s": round(latency, 4),
+            "throughput_per_s": round(len(passages) / latency, 2),
+        }
+
+    fp32 = vectors["fp32"] / np.linalg.norm(vectors["fp32"], axis=1, keepdims=True)
+    int8 = vectors["int8"] / np.linalg.norm(vectors["int8"], axis=1, keepdims=True)
+    cosine = np.sum(fp32 * int8, axis=1)
+
+    return {
+        **results,
+        "speedup": round(results["fp32"]["latency_s"] / results["int8"]["latency_s"], 2),
+        "cosine_mean": round(float(cosine.mean()), 4),
+        "cosine_min": round(float(cosine.min()), 4),
+    }
+
+
+def benchmark_reranker(
+    queries: list[str],
+    passages: list[str],
+    repeats: int,
+    top_k: int,
+) -> dict[str, Any]:
+    """
+    Compare the fp32 and int8 cross-encoders.
+
+    :param queries: queries to score the passages against
+    :type queries: list[str]
+    :param passages: candidate passages of each query
+    :type passages: list[str]
+    :param repeats: number of timed runs
+    :type repeats: int
+    :param top_k: number of top passages compared between the backends
+    :type top_k: int
+    :return: latency, throughput and agreement metrics
+    :rtype: dict[str, Any]
+    """
+    from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+
+    from src.onnx_models import build_onnx_cross_encoder
+
+    models = {
+        "fp32": HuggingFaceCrossEncoder(model_name=RERANKER_MODEL),
+        "int8": build_onnx_cross_encoder(
+            model_name=RERANKER_MODEL,
+            cache_dir=ONNX_BACKEND.get("cache_dir"),
+            quantization=ONNX_BACKEND.get("quantization"),
+        ),
+    }
+    pairs = [(query, passage) for query in queries for passage in passages]
+    scores, results = {}, {}
+    for backend, model in models.items():
+        logger.info(f"Benchmarking {backend} reranker on {len(pairs)} pairs...")
+        output, latency = _time(lambda: model.score(pairs), repeats)
+        scores[backend] = np.asarray(output, dtype=float).reshape(len(queries), len(passages))
+        results[backend] = {
+            "latency_s": round(latency, 4),
+            "throughput_per_s": round(len(pairs) / latency, 2),
+        }
+
+    correlations, agreements = [], []
+    for fp32, int8 in zip(scores["fp32"], scores["int8"]):
+        correlations.append(spearman_correlation(fp32, int8))
+        top_fp32 = set(np.argsort(-fp32)[:top_k].tolist())
+        top_int8 = set(np.argsort(-int8)[:top_k].tolist())
+        agreements.append(len(top_fp32 & top_int8) / top_k)
+
+    return {
+        **results,
+        "speedup": round(results["fp32"]["latency_s"] / results["int8"]["latency_s"], 2),
+        "spearman_mean": round(float(np.mean(correlations)), 4),
+        f"top_{top_k}_agreement": round(float(np.mean(agreements)), 4),
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print (optionally save) the results as JSON."""
+    parser = argparse.ArgumentParser(description="fp32 PyTorch vs int8 ONNX Runtime inference benchmark.")
+    parser.add_argument("--n-passages", type=int, default=256, help="number of passages embedded")
+    parser.add_argument("--n-candidates", type=int, default=16, help="number of passages reranked per query")
+    parser.add_argument("--repeats", type=int, default=3, help="number of timed runs")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="top passages compared between backends")
+    parser.add_argument("--output", type=str, default=None, help="JSON file where the results are saved")
+    args = parser.parse_args()
+
+    passages = [PASSAGES[position % len(PASSAGES)] for position in range(args.n_passages)]
+    candidates = [PASSAGES[position % len(PASSAGES)] for position in range(args.n_candidates)]
+    results = {
+        "embeddings": {"model": EMBEDDING_MODEL, **benchmark_embeddings(passages, args.repeats)},
+        "reranker": {"model": RERANKER_MODEL, **benchmark_reranker(QUERIES, candidates, args.repeats, args.top_k)},
+        "quantization": ONNX_BACKEND.get("quantization"),
+    }
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report)
+
+
+if __name__ == "__main__":
+    main()
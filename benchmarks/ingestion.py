@@ -0,0 +1,334 @@
+"""
+Benchmark of the ingestion pipeline throughput, stage by stage.
+
+It ingests a synthetic corpus (HTML pages or a JSON Lines dump, written to a temporary folder)
+or a local one into a temporary local index, and reports:
+* throughput: documents, chunks and embeddings per second.
+* peak RSS of the process (and of the embedding worker processes, if any).
+* latency percentiles of each stage of the pipeline (fetch/parse, clean, chunk, dedup, embed, upsert).
+
+Usage: `python -m benchmarks.ingestion [--n-documents 500] [--embedding fake] [--output results.json]`.
+"""
+
+# Import packages and modules
+
+import argparse
+import functools
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing_extensions import Self
+
+from benchmarks.inference import PASSAGES
+from src.constants import DEDUP, INGESTION_PIPELINE, SEMANTIC_CHUNKER
+from src.ingestion import (
+    default_workers,
+    DirectorySource,
+    DocumentSource,
+    IngestionManifest,
+    JSONLSource,
+    MinHashDeduplicator,
+    ProcessPoolEmbeddings,
+    SemanticChunkEmbedder,
+    StreamingIngestionPipeline,
+)
+from src.utils.logging import logger
+from src.vectorstores import LocalVectorStore
+
+
+# Define classes
+class TimedEmbeddings(Embeddings):
+    """Embeddings wrapper counting the embedded texts and the time spent encoding them."""
+
+    def __init__(
+        self: Self,
+        embedding: Embeddings,
+    ) -> None:
+        """
+        Initialize the wrapper.
+
+        :param embedding: underlying embedding model
+        :type embedding: Embeddings
+        """
+        self.embedding = embedding
+        self.texts = 0
+        self.seconds = 0.0
+
+    def embed_documents(
+        self: Self,
+        texts: list[str],
+    ) -> list[list[float]]:
+        """
+        Embed documents, counting them.
+
+        :param texts: documents to embed
+        :type texts: list[str]
+        :return: documents vectors
+        :rtype: list[list[float]]
+        """
+        start = time.perf_counter()
+        vectors = self.embedding.embed_documents(texts)
+        self.seconds += time.perf_counter() - start
+        self.texts += len(texts)
+        return vectors
+
+    def embed_query(
+        self: Self,
+        text: str,
+    ) -> list[float]:
+        """
+        Embed a query.
+
+        :param text: query to embed
+        :type text: str
+        :return: query vector
+        :rtype: list[float]
+        """
+        return self.embedding.embed_query(text)
+
+
+# Define functions
+def write_corpus(
+    folder: str,
+    n_documents: int,
+    n_paragraphs: int,
+    corpus_format: str,
+    seed: int = 0,
+) -> DocumentSource:
+    """
+    Write a synthetic corpus of documents made of shuffled passages, with a footer shared by all the documents.
+
+    :param folder: folder where the corpus is written
+    :type folder: str
+    :param n_documents: number of documents
+    :type n_documents: int
+    :param n_paragraphs: number of paragraphs of a document
+    :type n_paragraphs: int
+    :param corpus_format: 'html' (one page per file) or 'jsonl' (one dump)
+    :type corpus_format: str
+    :param seed: seed of the shuffling
+    :type seed: int
+    :return: source of the corpus
+    :rtype: DocumentSource
+    """
+    generator = random.Random(seed)
+    footer = "Cited as Weng, Lilian. Lil'Log. Subscribe to the newsletter to receive the next posts on language models."
+    documents = []
+    for number in range(n_documents):
+        paragraphs = [
+            f"{' '.join(generator.sample(PASSAGES, k=4))} (document {number}, paragraph {paragraph})"
+            for paragraph in range(n_paragraphs)
+        ]
+        documents.append((f"Post {number}", paragraphs + [footer]))
+
+    if corpus_format == "jsonl":
+        path = os.path.join(folder, "corpus.jsonl")
+        with open(path, "w") as file:
+            for number, (title, paragraphs) in enumerate(documents):
+                file.write(json.dumps({"id": f"post-{number}", "title": title, "text": "\n\n".join(paragraphs)}) + "\n")
+        return JSONLSource(path)
+    for number, (title, paragraphs) in enumerate(documents):
+        body = "".join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+        with open(os.path.join(folder, f"post-{number}.html"), "w") as file:
+            file.write(f'<html lang="en"><head><title>{title}</title></head><body><nav>Home | Posts | About</nav>{body}</body></html>')
+    return DirectorySource(folder)
+
+
+def percentiles(
+    latencies: list[float],
+) -> dict[str, float]:
+    """
+    Summarize the latencies of a stage.
+
+    :param latencies: latency in seconds of each item (or batch) processed by the stage
+    :type latencies: list[float]
+    :return: count, total in seconds and mean/p50/p90/p99/max in milliseconds
+    :rtype: dict[str, float]
+    """
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "total_s": round(float(values.sum()) / 1000, 4),
+        "mean_ms": round(float(values.mean()), 3),
+        **{f"p{q}_ms": round(float(np.percentile(values, q)), 3) for q in (50, 90, 99)},
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def peak_rss_mb(
+    who: int = resource.RUSAGE_SELF,
+) -> float:
+    """
+    Peak resident set size.
+
+    :param who: RUSAGE_SELF for this process, RUSAGE_CHILDREN for the largest terminated child process
+    :type who: int
+    :return: peak RSS in MB
+    :rtype: float
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KB on Linux
+
+
+def build_embedding(
+    name: str,
+    workers: int,
+    dimension: int,
+) -> Embeddings:
+    """
+    Build the embedding model of the benchmark.
+
+    :param name: 'fake' (deterministic hashing, measures the pipeline overhead) or 'hf' (the configured model)
+    :type name: str
+    :param workers: number of embedding processes of the 'hf' model
+    :type workers: int
+    :param dimension: dimension of the 'fake' vectors
+    :type dimension: int
+    :return: embedding model
+    :rtype: Embeddings
+    """
+    if name == "fake":
+        return DeterministicFakeEmbedding(size=dimension)
+    from src.embeddings import build_hf_embeddings
+
+    return ProcessPoolEmbeddings(factory=functools.partial(build_hf_embeddings, show_progress=False), workers=workers)
+
+
+def benchmark_ingestion(
+    source: DocumentSource,
+    embedding: Embeddings,
+    splitter: str,
+    dedup: bool,
+    index_dir: str,
+    pipeline_config: dict,
+) -> dict[str, Any]:
+    """
+    Ingest a corpus into a fresh local index and measure the pipeline.
+
+    :param source: source of the corpus
+    :type source: DocumentSource
+    :param embedding: embedding model
+    :type embedding: Embeddings
+    :param splitter: 'semantic' (SemanticChunkEmbedder) or 'recursive' (RecursiveCharacterTextSplitter)
+    :type splitter: str
+    :param dedup: whether to drop the near-duplicate chunks
+    :type dedup: bool
+    :param index_dir: folder of the local index and the manifest
+    :type index_dir: str
+    :param pipeline_config: batch and queue sizes of the pipeline
+    :type pipeline_config: dict
+    :return: statistics, throughput and stage latencies of the run
+    :rtype: dict[str, Any]
+    """
+    timed_embedding = TimedEmbeddings(embedding)
+    if splitter == "semantic":
+        text_splitter = SemanticChunkEmbedder(embeddings=timed_embedding, **SEMANTIC_CHUNKER)
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    deduplicator = None
+    if dedup:
+        deduplicator = MinHashDeduplicator(
+            threshold=DEDUP.get("threshold"),
+            num_perm=DEDUP.get("num_perm"),
+            shingle_size=DEDUP.get("shingle_size"),
+        )
+    pipeline = StreamingIngestionPipeline(
+        fetcher=None,  # local sources only
+        text_splitter=text_splitter,
+        embedding=timed_embedding,
+        vectorstore=LocalVectorStore(embedding=timed_embedding, persist_dir=os.path.join(index_dir, "index")),
+        manifest=IngestionManifest(index="local:benchmark"),
+        manifest_path=os.path.join(index_dir, "manifest.json"),
+        topic_keywords={},
+        deduplicator=deduplicator,
+        **pipeline_config,
+    )
+
+    logger.info("Benchmarking the ingestion pipeline...")
+    start = time.perf_counter()
+    stats = pipeline.run([source])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "stats": stats,
+        "duplicates_dropped": deduplicator.stats.get("dropped") if deduplicator else 0,
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_s": round(stats.get("pages") / elapsed, 2),
+        "chunks_per_s": round(stats.get("chunks") / elapsed, 2),
+        "embeddings_per_s": round(timed_embedding.texts / elapsed, 2),
+        "embeddings": timed_embedding.texts,
+        "encoding_s": round(timed_embedding.seconds, 3),
+        "stages": {stage: percentiles(latencies) for stage, latencies in pipeline.timings.items()},
+    }
+
+
+def main() -> None:
+    """Run the benchmark and print (optionally save) the results as JSON."""
+    parser = argparse.ArgumentParser(description="Ingestion pipeline throughput benchmark.")
+    corpus = parser.add_argument_group("corpus")
+    corpus.add_argument("--n-documents", type=int, default=500, help="number of synthetic documents")
+    corpus.add_argument("--n-paragraphs", type=int, default=8, help="number of paragraphs of a synthetic document")
+    corpus.add_argument("--format", choices=["html", "jsonl"], default="html", help="format of the synthetic corpus")
+    corpus.add_argument("--directory", default=None, help="local folder ingested instead of a synthetic corpus")
+    corpus.add_argument("--jsonl", default=None, help="JSON Lines dump ingested instead of a synthetic corpus")
+    models = parser.add_argument_group("models")
+    models.add_argument("--embedding", choices=["fake", "hf"], default="fake", help="'fake' measures the pipeline alone, 'hf' the configured model")
+    models.add_argument("--embed-workers", type=int, default=default_workers(), help="embedding processes of the 'hf' model")
+    models.add_argument("--dimension", type=int, default=768, help="dimension of the 'fake' vectors")
+    models.add_argument("--splitter", choices=["semantic", "recursive"], default="semantic", help="chunker of the documents")
+    models.add_argument("--no-dedup", action="store_true", help="keep the near-duplicate chunks")
+    for name, value in INGESTION_PIPELINE.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value, help=f"defaults to {value}")
+    parser.add_argument("--output", type=str, default=None, help="JSON file where the results are saved")
+    args = parser.parse_args()
+
+    embedding = build_embedding(args.embedding, args.embed_workers, args.dimension)
+    try:
+        with tempfile.TemporaryDirectory(prefix="benchmark-ingestion-") as folder:
+            if args.directory:
+                source = DirectorySource(args.directory)
+            elif args.jsonl:
+                source = JSONLSource(args.jsonl)
+            else:
+                os.makedirs(os.path.join(folder, "corpus"))
+                source = write_corpus(os.path.join(folder, "corpus"), args.n_documents, args.n_paragraphs, args.format)
+            results = benchmark_ingestion(
+                source=source,
+                embedding=embedding,
+                splitter=args.splitter,
+                dedup=not args.no_dedup,
+                index_dir=folder,
+                pipeline_config={name: getattr(args, name) for name in INGESTION_PIPELINE},
+            )
+    finally:
+        if isinstance(embedding, ProcessPoolEmbeddings):
+            embedding.close()  # the workers terminate, so that their peak RSS is accounted
+    results = {
+        "corpus": args.directory or args.jsonl or f"synthetic {args.format} ({args.n_documents} documents)",
+        "embedding": args.embedding,
+        "splitter": args.splitter,
+        **results,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_workers_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report)
+
+
+if __name__ == "__main__":
+    main()
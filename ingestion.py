@@ -1,21 +1,63 @@
+"""
+Ingestion job: fetch, chunk, embed and index the knowledge base into the Vector Store.
+
+Usage: `python ingestion.py [--backend local] [--source URL ...] [--sitemap URL] [--directory PATH]
+[--jsonl PATH] [--embed-workers 32] [--full]`
+(run `python ingestion.py --help` for all the flags). The job is non-interactive:
+a missing Pinecone index is created with the given settings, and an existing index is
+refreshed incrementally unless --full is passed.
+"""
+
 # Import packages and modules
 
-from itertools import chain
+import argparse
+import functools
+import json
 import os
 import time
 
 from dotenv import load_dotenv
-from langchain_experimental.text_splitter import SemanticChunker
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone, ServerlessSpec
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_core.documents import Document
 import warnings
+from src.answer_cache import bump_kb_version
+from src.embedding_store import EmbeddingStore, StoredEmbeddings
+from src.embeddings import build_hf_embeddings
 from src.constants import (
+    BM25_PARAMS_PATH,
+    DEDUP,
     EMBEDDING_MODEL,
+    EMBEDDING_STORE,
+    FETCH,
+    INGESTION_MANIFEST_PATH,
+    INGESTION_PIPELINE,
+    KB_VERSION_PATH,
+    LOCAL_INDEX,
+    ONNX_BACKEND,
+    RETRIEVAL_SEARCH,
+    SEMANTIC_CHUNKER,
+    TOPIC_KEYWORDS,
+)
+from src.ingestion import (
+    ConcurrentFetcher,
+    default_workers,
+    DirectorySource,
+    DocumentSource,
+    IngestionManifest,
+    JSONLSource,
+    MinHashDeduplicator,
+    ProcessPoolEmbeddings,
+    SemanticChunkEmbedder,
+    SitemapSource,
+    StreamingIngestionPipeline,
+    WebSource,
 )
 from src.utils.logging import logger
+from src.vectorstores import (
+    build_sparse_encoder,
+    build_vectorstore,
+    get_backend,
+    LocalVectorStore,
+)
 
 warnings.filterwarnings("ignore")
 
@@ -29,71 +71,253 @@ URLS = [
     "https://lilianweng.github.io/posts/2023-10-25-adv-attack-llm/",
 ]
 
-# Initialize Pinecone client
+# Define functions
+def ingest_documents(
+    backend: str,
+    sources: list[str | DocumentSource],
+    incremental: bool = True,
+    embed_workers: int | None = None,
+    embed_worker_batch_size: int = 32,
+    fetcher: ConcurrentFetcher | None = None,
+    pipeline_config: dict | None = None,
+    dedup_config: dict | None = None,
+) -> None:
+    """
+    Fetch, chunk and index the documents into the Vector Store backend.
 
-logger.info("Initializing Pinecone...")
-pc = Pinecone(
-    api_key=os.getenv("PINECONE_API_KEY"),
-    ssl_verify=False,
-)
+    In incremental mode, only the chunks of the new or changed documents are embedded and upserted,
+    and the chunks of the changed or removed pages that are no longer there are deleted.
 
-logger.info("Getting indexes...")
-available_indexes_raw = pc.list_indexes().get("indexes")
-available_indexes = [index.get("name") for index in available_indexes_raw]
-index_name = os.getenv("INDEX_NAME")
-
-if index_name not in available_indexes: # change execution condition
-    logger.info("Index does not exist.")
-    task = input("The index does not exist. Do you want to create it? (y/n): ")
-    if task == "y":
-        logger.info("Creating index...")
-        dimension = input("Enter the dimension of the embeddings to store: ")
-        metric = input("Enter the metric to use for the index (dotproduct or cosine): ")
-        pc.create_index(
-            name=index_name,
-            dimension=int(dimension),
-            metric=metric,
-            spec=ServerlessSpec(cloud="aws", region="us-east-1"),
-        )
-        time.sleep(10)
+    :param backend: name of the Vector Store backend, either 'pinecone' or 'local'
+    :type backend: str
+    :param sources: sources of all the documents of the knowledge base (URLs are fetched as web pages)
+    :type sources: list[str | DocumentSource]
+    :param incremental: whether to refresh the existing index from the manifest instead of indexing everything
+    :type incremental: bool
+    :param embed_workers: number of embedding processes, defaults to default_workers()
+    :type embed_workers: int | None
+    :param embed_worker_batch_size: number of texts sent to an embedding process at once
+    :type embed_worker_batch_size: int
+    :param fetcher: fetcher of the web pages, shared with the sitemap sources, defaults to one configured by FETCH
+    :type fetcher: ConcurrentFetcher | None
+    :param pipeline_config: batch and queue sizes of the pipeline, defaults to INGESTION_PIPELINE
+    :type pipeline_config: dict | None
+    :param dedup_config: settings of the near-duplicate chunk elimination, defaults to DEDUP
+    :type dedup_config: dict | None
+    """
+    index = f"local:{LOCAL_INDEX.get('persist_dir')}" if backend == "local" else f"pinecone:{os.getenv('INDEX_NAME')}"
+    if incremental:
+        manifest = IngestionManifest.load(INGESTION_MANIFEST_PATH, index=index)
+        if not manifest.sources:
+            logger.warning(f"No manifest of {index}, the chunks indexed without one are not tracked and will not be deleted.")
     else:
-        logger.warning("Index is not existing, create it before ingesting documents.")
-    task = input("Do you want to ingest documents? (y/n): ")
-    if task == "y":
-        # Get Docs from URLs
-        logger.info("Getting docs from URLs...")
-        docs: list[list[Document]] = [WebBaseLoader(url).load() for url in URLS] # return a list of Document objects (one per URL page)
-
-        # Flatten the list of lists into a single list of Documents
-        docs_flat: list[Document] = list(chain.from_iterable(docs)) # equivalent to [item for sublist in docs for item in sublist]
-        # Set embedding model (using HuggingFace)
-        logger.info("Setting up embedding model...")
-        hf_embedding_model = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL,
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": False},
-            show_progress=True,
-            multi_process=False,
+        manifest = IngestionManifest(index=index)
+    # Set embedding model (using HuggingFace), each worker process holding a copy of the model
+    logger.info("Setting up embedding model...")
+    pool_embedding_model = ProcessPoolEmbeddings(
+        factory=functools.partial(build_hf_embeddings, show_progress=False),
+        workers=embed_workers,
+        batch_size=embed_worker_batch_size,
+    )
+    hf_embedding_model = pool_embedding_model
+    if EMBEDDING_STORE.get("enabled"):
+        # Read the vectors of the contents already encoded (e.g., when re-indexing into another backend)
+        model_name = f"{EMBEDDING_MODEL}-onnx-{ONNX_BACKEND.get('quantization')}" if ONNX_BACKEND.get("enabled") else EMBEDDING_MODEL
+        hf_embedding_model = StoredEmbeddings(
+            embedding=pool_embedding_model,
+            store=EmbeddingStore(
+                root=EMBEDDING_STORE.get("root"),
+                model_name=model_name,
+                dtype=EMBEDDING_STORE.get("dtype"),
+            ),
+        )
+    text_splitter = SemanticChunkEmbedder(
+        embeddings=hf_embedding_model,
+        **SEMANTIC_CHUNKER,
+    )  # pools the chunk vectors as it splits them with the 'mean' pooling, the embed stage encodes them otherwise
+    fetcher = fetcher or ConcurrentFetcher(**FETCH)
+    dedup_config = dedup_config or DEDUP
+    deduplicator = None
+    if dedup_config.get("enabled"):
+        # Drop the near-duplicate chunks (boilerplate repeated across pages) before embedding them
+        deduplicator = MinHashDeduplicator(
+            threshold=dedup_config.get("threshold"),
+            num_perm=dedup_config.get("num_perm"),
+            shingle_size=dedup_config.get("shingle_size"),
+        )
+    urls = [source for source in sources if isinstance(source, str)]
+    sources = [source for source in sources if not isinstance(source, str)]
+    if urls:
+        sources.insert(0, WebSource(urls, fetcher))
+    # Define Vector Store
+    try:
+        logger.info("Indexing documents...")
+        vectorstore = build_vectorstore(
+            embedding=hf_embedding_model,
+            backend=backend,
         )
-        text_splitter = SemanticChunker(
-            embeddings=hf_embedding_model,
-            breakpoint_threshold_type="percentile",
-            min_chunk_size=200,
+        sparse_encoder = None
+        if RETRIEVAL_SEARCH.get("search_type") == "hybrid":
+            # Store BM25 sparse vectors alongside the dense ones, the encoder being fitted on the chunks as they stream
+            sparse_encoder = build_sparse_encoder(
+                BM25_PARAMS_PATH if manifest.sources else None,
+            )  # an incremental run adds the new chunks to the statistics of the indexed ones
+        # Fetch, clean, chunk, embed and upsert the pages in overlapping stages
+        pipeline = StreamingIngestionPipeline(
+            fetcher=fetcher,
+            text_splitter=text_splitter,
+            embedding=hf_embedding_model,
+            vectorstore=vectorstore,
+            manifest=manifest,
+            manifest_path=INGESTION_MANIFEST_PATH,
+            topic_keywords=TOPIC_KEYWORDS,
+            sparse_encoder=sparse_encoder,
+            sparse_encoder_path=BM25_PARAMS_PATH,
+            deduplicator=deduplicator,
+            **(pipeline_config or INGESTION_PIPELINE),
+        )
+        stats = pipeline.run(sources)
+        if deduplicator is not None:
+            os.makedirs(os.path.dirname(dedup_config.get("report_path")) or ".", exist_ok=True)
+            with open(dedup_config.get("report_path"), "w") as file:
+                json.dump(deduplicator.report(), file, indent=2)
+        if stats.get("upserted") or stats.get("deleted"):
+            bump_kb_version(KB_VERSION_PATH)  # invalidate the answers cached on the previous knowledge base
+        else:
+            logger.info("Index is up to date.")
+    except Exception as exc:
+        logger.error(f"Error indexing documents: {exc}")
+        raise
+    finally:
+        pool_embedding_model.close()
+
+
+def parse_args(
+    argv: list[str] | None = None,
+) -> argparse.Namespace:
+    """
+    Parse the command line arguments of the ingestion job.
+
+    :param argv: command line arguments, defaults to sys.argv
+    :type argv: list[str] | None
+    :return: parsed arguments
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Fetch, chunk, embed and index the knowledge base.",
+        epilog=(
+            "The sources list the whole knowledge base: the chunks of the documents no longer listed are deleted "
+            "from the index. The default URLs are ingested only when no source of any kind is given."
+        ),
+    )
+    sources = parser.add_argument_group("sources")
+    sources.add_argument("--source", action="append", dest="sources", help="URL of a page to ingest (repeatable), defaults to URLS when no source is given")
+    sources.add_argument("--sources-file", help="file listing the URLs to ingest, one per line")
+    sources.add_argument("--sitemap", action="append", default=[], help="URL of a sitemap (or sitemap index) listing pages to ingest (repeatable)")
+    sources.add_argument("--sitemap-include", default=None, help="regular expression the URLs of the sitemaps must match")
+    sources.add_argument("--directory", action="append", default=[], help="local folder of HTML, Markdown, text and PDF files to ingest (repeatable)")
+    sources.add_argument("--jsonl", action="append", default=[], help="JSON Lines dump with one document per line to ingest (repeatable)")
+    sources.add_argument("--jsonl-text-field", default="text", help="field holding the text of the JSON Lines records")
+    sources.add_argument("--jsonl-id-field", default="id", help="field holding the id of the JSON Lines records")
+    index = parser.add_argument_group("index")
+    index.add_argument("--backend", choices=["local", "pinecone"], default=None, help="Vector Store backend, defaults to VECTOR_STORE_BACKEND")
+    index.add_argument("--index-name", default=None, help="Pinecone index name, defaults to INDEX_NAME")
+    index.add_argument("--dimension", type=int, default=768, help="dimension of the embeddings of a created Pinecone index")
+    index.add_argument(
+        "--metric",
+        choices=["cosine", "dotproduct"],
+        default=None,
+        help="metric of a created Pinecone index, defaults to dotproduct for hybrid search and cosine otherwise",
+    )
+    index.add_argument("--cloud", default="aws", help="cloud of a created Pinecone index")
+    index.add_argument("--region", default="us-east-1", help="region of a created Pinecone index")
+    index.add_argument("--full", action="store_true", help="re-index every page instead of refreshing the index incrementally")
+    dedup = parser.add_argument_group("near-duplicate chunks")
+    dedup.add_argument("--no-dedup", action="store_true", help="keep the near-duplicate chunks")
+    dedup.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEDUP.get("threshold"),
+        help=f"similarity from which a chunk is dropped as a near-duplicate, defaults to {DEDUP.get('threshold')}",
+    )
+    batches = parser.add_argument_group("batch sizes")
+    for name, value in INGESTION_PIPELINE.items():
+        batches.add_argument(f"--{name.replace('_', '-')}", type=int, default=value, help=f"defaults to {value}")
+    workers = parser.add_argument_group("workers")
+    workers.add_argument("--fetch-workers", type=int, default=FETCH.get("max_workers"), help="concurrent requests overall")
+    workers.add_argument("--per-host-limit", type=int, default=FETCH.get("per_host_limit"), help="concurrent requests to the same host")
+    workers.add_argument(
+        "--embed-workers",
+        type=int,
+        default=default_workers(),
+        help=f"embedding processes, defaults to the number of cores up to {default_workers()}",
+    )
+    workers.add_argument("--embed-worker-batch-size", type=int, default=32, help="texts sent to an embedding process at once")
+
+    return parser.parse_args(argv)
+
+
+def main(
+    argv: list[str] | None = None,
+) -> None:
+    """
+    Run the ingestion job.
+
+    :param argv: command line arguments, defaults to sys.argv
+    :type argv: list[str] | None
+    """
+    args = parse_args(argv)
+    if args.index_name:
+        os.environ["INDEX_NAME"] = args.index_name
+    backend = args.backend or get_backend()
+    sources = list(args.sources or [])
+    if args.sources_file:
+        with open(args.sources_file) as file:
+            sources.extend(line.strip() for line in file if line.strip() and not line.startswith("#"))
+    # A single fetcher, so that the limits per host hold across the sitemaps and the pages
+    fetcher = ConcurrentFetcher(**{**FETCH, "max_workers": args.fetch_workers, "per_host_limit": args.per_host_limit})
+    sources.extend(SitemapSource(sitemap, fetcher, include=args.sitemap_include) for sitemap in args.sitemap)
+    sources.extend(DirectorySource(directory) for directory in args.directory)
+    sources.extend(JSONLSource(path, text_field=args.jsonl_text_field, id_field=args.jsonl_id_field) for path in args.jsonl)
+    sources = sources or list(URLS)  # the default URLs only when no source is given
+
+    new_index = False
+    if backend == "local":
+        new_index = not LocalVectorStore.exists(LOCAL_INDEX.get("persist_dir"))
+    else:
+        # Initialize Pinecone client
+        logger.info("Initializing Pinecone...")
+        pc = Pinecone(
+            api_key=os.getenv("PINECONE_API_KEY"),
+            ssl_verify=False,
         )
-        logger.info("Splitting documents into chunks...")
-        chunks: list[Document] = text_splitter.split_documents(docs_flat) # split the documents into chunks
-        # Define Vector Store
-        try:
-            logger.info("Indexing documents...")
-            index = pc.Index(index_name)
-            vectorstore = PineconeVectorStore(
-                index=index,
-                embedding=hf_embedding_model,
+        logger.info("Getting indexes...")
+        available_indexes = [index.get("name") for index in pc.list_indexes().get("indexes")]
+        index_name = os.getenv("INDEX_NAME")
+        if index_name not in available_indexes:
+            metric = args.metric or ("dotproduct" if RETRIEVAL_SEARCH.get("search_type") == "hybrid" else "cosine")
+            logger.info(f"Creating index {index_name} ({args.dimension} dimensions, {metric})...")
+            pc.create_index(
+                name=index_name,
+                dimension=args.dimension,
+                metric=metric,
+                spec=ServerlessSpec(cloud=args.cloud, region=args.region),
             )
-            vectorstore.add_documents(chunks)
-        except Exception as exc:
-            logger.error(f"Error indexing documents: {exc}")
-else:
-    logger.info("VDB already exists. Skipping indexing.")
+            time.sleep(10)
+            new_index = True
+
+    ingest_documents(
+        backend=backend,
+        sources=sources,
+        incremental=not (args.full or new_index),
+        embed_workers=args.embed_workers,
+        embed_worker_batch_size=args.embed_worker_batch_size,
+        fetcher=fetcher,
+        pipeline_config={name: getattr(args, name) for name in INGESTION_PIPELINE},
+        dedup_config={**DEDUP, "enabled": DEDUP.get("enabled") and not args.no_dedup, "threshold": args.dedup_threshold},
+    )
+    logger.info("Done!")
+
 
-logger.info("Done!")
+if __name__ == "__main__":
+    main()
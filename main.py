@@ -4,18 +4,20 @@
 from dotenv import load_dotenv
 import warnings
 
-from src.graph import graph
+from src.graph import invoke_graph
+from src.registry import registry
 
 warnings.filterwarnings("ignore")
 load_dotenv("local/.env")
 
 if __name__ == "__main__":
     mem = {"configurable": {"thread_id": "1"}}
+    registry.warmup(background=True)  # load models while the user types the question
     question = input("Enter your question: ")
-    res = graph.invoke(
+    res = invoke_graph(
         {"question": question},
         mem
-    )
+    )  # near-duplicate questions are answered by the semantic answer cache
     print("**************************************GENERATED RESPONSE**************************************")
     print(res.get("generation"))
     print("**************************************CONFIDENCE SCORE**************************************")
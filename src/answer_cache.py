@@ -0,0 +1,285 @@
+"""
+Module containing the semantic answer cache placed in front of the Graph.
+
+The SemanticAnswerCache embeds the incoming question and returns the final
+answer of a previous question whose embedding is similar enough (cosine
+similarity above a threshold), skipping the whole Graph (routing, retrieval,
+grading, generation and self-reflection).
+Cached answers are tied to a knowledge base version stamp, rewritten at each
+ingestion, so that re-ingesting the knowledge base invalidates them (and an answer
+computed while it was re-ingested is not cached).
+Answers are copied in and out of the cache, so that callers mutating them do not corrupt it.
+"""
+
+# Import packages and modules
+
+import copy
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+
+# Define classes
+class SemanticAnswerCache:
+    """Thread-safe cache of the Graph answers looked up by question similarity."""
+
+    def __init__(
+        self: Self,
+        embedding: Embeddings,
+        threshold: float = 0.95,
+        max_size: int = 1_000,
+        ttl: float | None = None,
+        version_path: str | None = None,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param embedding: embedding model used to embed the questions
+        :type embedding: Embeddings
+        :param threshold: minimum cosine similarity between two questions for a hit
+        :type threshold: float
+        :param max_size: maximum number of cached answers
+        :type max_size: int
+        :param ttl: time-to-live of each answer in seconds (None means no expiration)
+        :type ttl: float | None
+        :param version_path: file holding the knowledge base version stamp (None disables the invalidation)
+        :type version_path: str | None
+        """
+        self.embedding = embedding
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version_path = version_path
+        self._entries: OrderedDict[str, tuple[np.ndarray, dict[str, Any], float]] = OrderedDict()
+        self._matrix: np.ndarray | None = None  # stacked question vectors, rebuilt lazily after changes
+        self._keys: list[str] = []
+        self._version = read_kb_version(version_path)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lookup_time = 0.0
+
+    def __len__(self: Self) -> int:
+        """
+        Number of cached answers.
+
+        :return: number of answers
+        :rtype: int
+        """
+        return len(self._entries)
+
+    def lookup(
+        self: Self,
+        question: str,
+    ) -> dict[str, Any] | None:
+        """
+        Get the answer of the most similar cached question, if similar enough.
+
+        :param question: question asked by the user
+        :type question: str
+        :return: copy of the cached final state of the Graph, None on a miss
+        :rtype: dict[str, Any] | None
+        """
+        start = time.perf_counter()
+        vector = self._embed(question)
+        with self._lock:
+            self._check_version()
+            self._evict_expired()
+            result = None
+            if self._entries:
+                if self._matrix is None:
+                    self._keys = list(self._entries)
+                    self._matrix = np.vstack([self._entries[key][0] for key in self._keys])
+                similarities = self._matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key = self._keys[best]
+                    self._entries.move_to_end(key)
+                    result = copy.deepcopy(self._entries[key][1])
+                    logger.info(f"Answer cache hit (similarity {similarities[best]:.3f}).")
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._lookup_time += time.perf_counter() - start
+        return result
+
+    def version(self: Self) -> str | None:
+        """
+        Current knowledge base version stamp, to be read before running the Graph.
+
+        :return: version stamp, None if missing
+        :rtype: str | None
+        """
+        return read_kb_version(self.version_path)
+
+    def update(
+        self: Self,
+        question: str,
+        result: dict[str, Any],
+        version: str | None,
+    ) -> bool:
+        """
+        Cache the final state of the Graph for a question, unless the knowledge base changed meanwhile.
+
+        :param question: question asked by the user
+        :type question: str
+        :param result: final state of the Graph
+        :type result: dict[str, Any]
+        :param version: knowledge base version stamp read before running the Graph
+        :type version: str | None
+        :return: True if the answer was cached
+        :rtype: bool
+        """
+        vector = self._embed(question)
+        with self._lock:
+            self._check_version()
+            if version != self._version:
+                logger.info("Knowledge base re-ingested while answering, not caching the answer.")
+                return False
+            key = uuid.uuid4().hex
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+            self._entries[key] = (vector, copy.deepcopy(result), expires_at)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+        return True
+
+    def get_or_invoke(
+        self: Self,
+        question: str,
+        invoke: Callable[[], dict[str, Any]],
+        cacheable: Callable[[dict[str, Any]], bool] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Return the cached answer of a similar question, or invoke the Graph and cache its answer.
+
+        :param question: question asked by the user
+        :type question: str
+        :param invoke: function running the Graph on the question
+        :type invoke: Callable[[], dict[str, Any]]
+        :param cacheable: predicate telling if a final state can be cached, defaults to having a generation
+        :type cacheable: Callable[[dict[str, Any]], bool] | None
+        :return: final state of the Graph
+        :rtype: dict[str, Any]
+        """
+        version = self.version()
+        result = self.lookup(question)
+        if result is not None:
+            return result
+        result = invoke()
+        if cacheable(result) if cacheable is not None else bool(result.get("generation")):
+            self.update(question, result, version=version)
+        return result
+
+    def clear(self: Self) -> None:
+        """Remove all the cached answers."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self: Self) -> dict[str, float]:
+        """
+        Get the cache statistics.
+
+        :return: size, hits, misses, hit rate, invalidations and mean lookup latency (ms) of the cache
+        :rtype: dict[str, float]
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "mean_lookup_ms": round(self._lookup_time / lookups * 1_000, 2) if lookups else 0.0,
+        }
+
+    def _embed(
+        self: Self,
+        question: str,
+    ) -> np.ndarray:
+        """
+        Embed a question as a unit vector.
+
+        :param question: question to embed
+        :type question: str
+        :return: normalized question vector
+        :rtype: np.ndarray
+        """
+        vector = np.asarray(self.embedding.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _check_version(self: Self) -> None:
+        """Drop all the answers if the knowledge base was re-ingested (lock must be held)."""
+        version = read_kb_version(self.version_path)
+        if version != self._version:
+            if self._entries:
+                logger.info("Knowledge base version changed, invalidating the answer cache.")
+                self.invalidations += 1
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _evict_expired(self: Self) -> None:
+        """Drop the expired answers (lock must be held)."""
+        now = time.monotonic()
+        expired = [key for key, (_, _, expires_at) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+
+# Define functions
+def read_kb_version(
+    path: str | None,
+) -> str | None:
+    """
+    Read the knowledge base version stamp.
+
+    :param path: file holding the stamp
+    :type path: str | None
+    :return: version stamp, None if missing
+    :rtype: str | None
+    """
+    if path is None or not os.path.isfile(path):
+        return None
+    with open(path) as file:
+        return file.read().strip()
+
+
+def bump_kb_version(
+    path: str,
+) -> str:
+    """
+    Write a new knowledge base version stamp (to be called after each ingestion).
+
+    :param path: file holding the stamp
+    :type path: str
+    :return: new version stamp
+    :rtype: str
+    """
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(version)
+    os.replace(tmp_path, path)
+    logger.info(f"Knowledge base version set to {version}.")
+
+    return version
@@ -3,6 +3,7 @@ Package dedicated to all chains used within the Graph Nodes.
 
 The main modules are:
 * answer_grader: Chain to assess hallucination in the answer compared to the original question.
+* cache: Cache of the grader chains verdicts, in memory or in SQLite.
 * generation: Chain to generate an answer to a question.
 * retrieval_grader: Chain to assess relevance of a document to a question.
 * hallucination_grader: Chain to assess hallucination in the answer compared to the retrieved documents.
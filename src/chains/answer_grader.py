@@ -10,19 +10,16 @@ is grounded in the user query or not.
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
-from langchain_core.runnables import RunnableSequence
+from langchain_core.runnables import Runnable, RunnableSequence
 from langchain_ollama import ChatOllama
 import warnings
+from src.chains.cache import cached
 from src.constants import ANSWER_GRADER_TEMPLATE
+from src.registry import registry
 
 warnings.filterwarnings("ignore")
 load_dotenv("local/.env")
 
-# Define LLM
-llm = ChatOllama(
-    model="mistral-nemo", # qwen2.5
-    temperature=0.0,
-)
 
 # Define Grader Structure
 class GradeAnswer(BaseModel):
@@ -34,16 +31,39 @@ class GradeAnswer(BaseModel):
     )
 
 
-structured_llm_answ_grader = llm.with_structured_output(
-    schema=GradeAnswer,
-    method="json_schema",
-)
+# Define chain factory
+def build_answer_grader() -> Runnable:
+    """
+    Build the Answer Grader chain.
+
+    :return: chain grading if the answer addresses the question
+    :rtype: Runnable
+    """
+    # Define LLM
+    llm = ChatOllama(
+        model="mistral-nemo", # qwen2.5
+        temperature=0.0,
+    )
+    structured_llm_answ_grader = llm.with_structured_output(
+        schema=GradeAnswer,
+        method="json_schema",
+    )
+
+    # Assemble prompt
+    answer_prompt = PromptTemplate(
+        template=ANSWER_GRADER_TEMPLATE,
+        input_variables=["question", "generation"],
+    )
+
+    # Assemble chain
+    return cached(
+        answer_prompt | structured_llm_answ_grader,
+        name="answer_grader",
+        model=llm.model,
+        template=ANSWER_GRADER_TEMPLATE,
+        schema=GradeAnswer,
+    )
 
-# Assemble prompt
-answer_prompt = PromptTemplate(
-    template=ANSWER_GRADER_TEMPLATE,
-    input_variables=["question", "generation"],
-)
 
-# Assemble chain
-answer_grader: RunnableSequence = answer_prompt | structured_llm_answ_grader
+registry.register("answer_grader", build_answer_grader)
+answer_grader: RunnableSequence = registry.lazy("answer_grader")
@@ -0,0 +1,189 @@
+"""
+Module implementing the cache of the grader chains verdicts.
+
+The graders are deterministic (temperature 0), so a verdict only depends on the chain,
+the model, the prompt template and the input. CachedChain wraps a grader chain and
+stores its verdicts under a key made of these four parts, in memory (LRU) or in SQLite
+(persistent across restarts and shared by the workers).
+Editing a template or changing the model changes the key prefix of the chain: the verdicts
+of the previous version are never hit again, and are deleted when the chain is built.
+"""
+
+# Import packages and modules
+
+import hashlib
+import json
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_core.runnables import Runnable, RunnableConfig
+from pydantic import BaseModel
+from typing_extensions import Self
+
+from src.constants import GRADER_CACHE
+from src.registry import registry
+from src.utils.cache import hash_key, LRUCache, SQLiteCache
+from src.utils.logging import logger
+
+
+# Define helper functions
+def normalize_input(
+    value: Any,
+) -> Any:
+    """
+    Reduce the input of a chain to JSON serializable values (documents to their content).
+
+    :param value: input of the chain, or part of it
+    :type value: Any
+    :return: JSON serializable input
+    :rtype: Any
+    """
+    if isinstance(value, Document):
+        return value.page_content
+    if isinstance(value, dict):
+        return {str(key): normalize_input(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_input(item) for item in value]
+    return value
+
+
+def input_hash(
+    value: Any,
+) -> str:
+    """
+    Hash the input of a chain.
+
+    :param value: input of the chain
+    :type value: Any
+    :return: SHA-256 hex digest of the normalized input
+    :rtype: str
+    """
+    serialized = json.dumps(normalize_input(value), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+# Define classes
+class CachedChain(Runnable):
+    """Chain wrapper caching the structured outputs of a deterministic chain."""
+
+    def __init__(
+        self: Self,
+        chain: Runnable,
+        name: str,
+        model: str,
+        template: str,
+        schema: type[BaseModel],
+        cache: LRUCache | SQLiteCache,
+    ) -> None:
+        """
+        Initialize the wrapper, deleting the verdicts cached for other versions of the chain.
+
+        :param chain: chain to wrap
+        :type chain: Runnable
+        :param name: name of the chain
+        :type name: str
+        :param model: name of the LLM of the chain
+        :type model: str
+        :param template: prompt template of the chain
+        :type template: str
+        :param schema: structured output of the chain
+        :type schema: type[BaseModel]
+        :param cache: cache of the verdicts
+        :type cache: LRUCache | SQLiteCache
+        """
+        self.chain = chain
+        self.name = name
+        self.schema = schema
+        self.cache = cache
+        self.fingerprint = hash_key(model, hash_key(template))[:16]
+        self.prefix = f"{name}:{self.fingerprint}:"
+        stale = cache.delete_stale(f"{name}:", self.prefix)
+        if stale:
+            logger.info(f"Deleted {stale} cached verdicts of a previous version of the {name} chain.")
+
+    def key(
+        self: Self,
+        input: Any,
+    ) -> str:
+        """
+        Key of the verdict of an input.
+
+        :param input: input of the chain
+        :type input: Any
+        :return: cache key (chain name, model and template fingerprint, input hash)
+        :rtype: str
+        """
+        return self.prefix + input_hash(input)
+
+    def invoke(
+        self: Self,
+        input: Any,
+        config: RunnableConfig | None = None,
+        **kwargs: Any,
+    ) -> BaseModel | None:
+        """
+        Get the cached verdict of an input, invoking the chain on a miss.
+
+        :param input: input of the chain
+        :type input: Any
+        :param config: config passed to the chain
+        :type config: RunnableConfig | None
+        :return: output of the chain
+        :rtype: BaseModel | None
+        """
+        key = self.key(input)
+        value = self.cache.get(key)
+        if value is not None:
+            return self.schema.model_validate(value)
+        output = self.chain.invoke(input, config, **kwargs)
+        if output is not None:  # an output not matching the schema is retried next time
+            self.cache.set(key, output.model_dump())
+        return output
+
+
+# Define factories
+def build_grader_cache() -> LRUCache | SQLiteCache:
+    """
+    Build the cache shared by the grader chains.
+
+    :return: SQLite or in-memory LRU cache, depending on GRADER_CACHE
+    :rtype: LRUCache | SQLiteCache
+    """
+    if GRADER_CACHE.get("backend") == "sqlite":
+        return SQLiteCache(
+            path=GRADER_CACHE.get("path"),
+            max_size=GRADER_CACHE.get("max_size"),
+            ttl=GRADER_CACHE.get("ttl"),
+        )
+    return LRUCache(max_size=GRADER_CACHE.get("max_size"), ttl=GRADER_CACHE.get("ttl"))
+
+
+def cached(
+    chain: Runnable,
+    name: str,
+    model: str,
+    template: str,
+    schema: type[BaseModel],
+) -> Runnable:
+    """
+    Wrap a grader chain with the grader cache, if enabled.
+
+    :param chain: grader chain
+    :type chain: Runnable
+    :param name: name of the chain
+    :type name: str
+    :param model: name of the LLM of the chain
+    :type model: str
+    :param template: prompt template of the chain
+    :type template: str
+    :param schema: structured output of the chain
+    :type schema: type[BaseModel]
+    :return: cached chain, or the chain itself if the cache is disabled
+    :rtype: Runnable
+    """
+    if not GRADER_CACHE.get("enabled"):
+        return chain
+    return CachedChain(chain=chain, name=name, model=model, template=template, schema=schema, cache=registry.get("grader_cache"))
+
+
+registry.register("grader_cache", build_grader_cache, warmup=GRADER_CACHE.get("enabled"))
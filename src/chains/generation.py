@@ -8,30 +8,44 @@ from langchain_core.runnables import RunnableSequence, RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
 from src.utils.misc import format_docs
 from src.constants import GENERATION_TEMPLATE
+from src.registry import registry
 
 import warnings
 
 warnings.filterwarnings("ignore")
 
-# Define LLM
-llm = ChatOllama(
-    model="phi4",
-    temperature=0.0,
-    # callbacks=[LLMCallbackHandler()],
-)
-
-# Assemble prompt
-generation_prompt = PromptTemplate(
-    template=GENERATION_TEMPLATE,
-    input_variables=["context", "question"],
-)
-
-# Assemble chain
-generation_chain: RunnableSequence = (
-    RunnableLambda(
-        lambda x: {"context": format_docs(x["context"]), "question": x["question"]}
+
+# Define chain factory
+def build_generation_chain() -> RunnableSequence:
+    """
+    Build the Generation chain.
+
+    :return: chain generating the answer from the context and question
+    :rtype: RunnableSequence
+    """
+    # Define LLM
+    llm = ChatOllama(
+        model="phi4",
+        temperature=0.0,
+        # callbacks=[LLMCallbackHandler()],
+    )
+
+    # Assemble prompt
+    generation_prompt = PromptTemplate(
+        template=GENERATION_TEMPLATE,
+        input_variables=["context", "question"],
     )
-    | generation_prompt
-    | llm
-    | StrOutputParser()
-)
+
+    # Assemble chain
+    return (
+        RunnableLambda(
+            lambda x: {"context": format_docs(x["context"]), "question": x["question"]}
+        )
+        | generation_prompt
+        | llm
+        | StrOutputParser()
+    )
+
+
+registry.register("generation_chain", build_generation_chain)
+generation_chain: RunnableSequence = registry.lazy("generation_chain")
@@ -10,21 +10,17 @@ is grounded in the retrieved documents (i.e., provided context) or not.
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
-from langchain_core.runnables import RunnableSequence, RunnableLambda
+from langchain_core.runnables import Runnable, RunnableSequence, RunnableLambda
 from langchain_ollama import ChatOllama
 import warnings
+from src.chains.cache import cached
 from src.utils.misc import format_docs
 from src.constants import HALLUCINATION_GRADER_TEMPLATE
+from src.registry import registry
 
 warnings.filterwarnings("ignore")
 load_dotenv("local/.env")
 
-# Define LLM
-llm = ChatOllama(
-    model="mistral-nemo", # qwen2.5
-    temperature=0.0,
-)
-
 
 # Define Grader Structure
 class GradeHallucination(BaseModel):
@@ -36,25 +32,46 @@ class GradeHallucination(BaseModel):
     )
 
 
-structured_llm_answ_grader = llm.with_structured_output(
-    schema=GradeHallucination,
-    method="json_schema",
-)
-
-# Assemble prompt
-hallucination_prompt = PromptTemplate(
-    template=HALLUCINATION_GRADER_TEMPLATE,
-    input_variables=["documents", "generation"],
-)
-
-# Assemble chain
-hallucination_grader: RunnableSequence = (
-    RunnableLambda(
-        lambda x: {
-            "documents": format_docs(x["documents"]),
-            "generation": x["generation"],
-        }
+# Define chain factory
+def build_hallucination_grader() -> Runnable:
+    """
+    Build the Hallucination Grader chain.
+
+    :return: chain grading if the answer is grounded in the documents
+    :rtype: Runnable
+    """
+    # Define LLM
+    llm = ChatOllama(
+        model="mistral-nemo", # qwen2.5
+        temperature=0.0,
+    )
+    structured_llm_answ_grader = llm.with_structured_output(
+        schema=GradeHallucination,
+        method="json_schema",
+    )
+
+    # Assemble prompt
+    hallucination_prompt = PromptTemplate(
+        template=HALLUCINATION_GRADER_TEMPLATE,
+        input_variables=["documents", "generation"],
     )
-    | hallucination_prompt
-    | structured_llm_answ_grader
-)
+
+    # Assemble chain
+    return cached(
+        RunnableLambda(
+            lambda x: {
+                "documents": format_docs(x["documents"]),
+                "generation": x["generation"],
+            }
+        )
+        | hallucination_prompt
+        | structured_llm_answ_grader,
+        name="hallucination_grader",
+        model=llm.model,
+        template=HALLUCINATION_GRADER_TEMPLATE,
+        schema=GradeHallucination,
+    )
+
+
+registry.register("hallucination_grader", build_hallucination_grader)
+hallucination_grader: RunnableSequence = registry.lazy("hallucination_grader")
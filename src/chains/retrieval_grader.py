@@ -2,6 +2,8 @@
 Module implementing the Retrieval Grader chain.
 
 More in detail the chain assess if the retrieved documents are relevant to the question.
+The listwise variant grades all the retrieved documents in a single call, sending the
+few-shot prefix of the prompt once instead of once per document.
 """
 
 # Import packages and modules
@@ -9,14 +11,10 @@ More in detail the chain assess if the retrieved documents are relevant to the q
 from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
 from langchain_ollama import ChatOllama
-from langchain_core.runnables import RunnableSequence
-from src.constants import RETRIEVAL_GRADER_TEMPLATE
-
-# Define LLM
-llm = ChatOllama(
-    model="mistral-nemo", # llama3.2:3b
-    temperature=0.0,
-)
+from langchain_core.runnables import Runnable, RunnableLambda, RunnableSequence
+from src.chains.cache import cached
+from src.constants import GRADING_MODE, LISTWISE_RETRIEVAL_GRADER_TEMPLATE, RETRIEVAL_GRADER_TEMPLATE
+from src.registry import registry
 
 
 # Define Grader Structure
@@ -29,16 +27,118 @@ class GradeDocuments(BaseModel):
     )
 
 
-structured_llm_doc_grader = llm.with_structured_output(
-    schema=GradeDocuments,
-    method="json_schema",
-)
+class DocumentVerdict(BaseModel):
+    """Binary score for relevance check on one of the listed documents."""
+
+    index: int = Field(
+        ...,
+        description="Number of the document in the list.",
+    )
+    binary_score: str = Field(
+        ...,
+        description="Document is relevant to the question, 'yes' or 'no'.",
+    )
+
+
+class GradeDocumentsList(BaseModel):
+    """Binary scores for relevance check on a list of retrieved documents."""
+
+    verdicts: list[DocumentVerdict] = Field(
+        ...,
+        description="Relevance of each listed document to the question.",
+    )
+
+
+# Define helper functions
+def format_numbered_docs(
+    documents: list[str],
+) -> str:
+    """
+    Format documents as a numbered list (from 1) for the listwise grader.
+
+    :param documents: contents of the documents
+    :type documents: list[str]
+    :return: one line per document, prefixed by its number
+    :rtype: str
+    """
+    return "\n".join(f"[{number}] {' '.join(document.split())}" for number, document in enumerate(documents, start=1))
+
+
+# Define chain factory
+def build_retrieval_grader() -> Runnable:
+    """
+    Build the Retrieval Grader chain.
+
+    :return: chain grading the relevance of a document to a question
+    :rtype: Runnable
+    """
+    # Define LLM
+    llm = ChatOllama(
+        model="mistral-nemo", # llama3.2:3b
+        temperature=0.0,
+    )
+    structured_llm_doc_grader = llm.with_structured_output(
+        schema=GradeDocuments,
+        method="json_schema",
+    )
+
+    # Assemble prompt
+    grader_prompt = PromptTemplate(
+        template=RETRIEVAL_GRADER_TEMPLATE,
+        input_variables=["document", "question"],
+    )
+
+    # Assemble chain
+    return cached(
+        grader_prompt | structured_llm_doc_grader,
+        name="retrieval_grader",
+        model=llm.model,
+        template=RETRIEVAL_GRADER_TEMPLATE,
+        schema=GradeDocuments,
+    )
+
+
+def build_listwise_retrieval_grader() -> Runnable:
+    """
+    Build the listwise Retrieval Grader chain.
+
+    :return: chain grading the relevance of a list of documents to a question in one call
+    :rtype: Runnable
+    """
+    # Define LLM
+    llm = ChatOllama(
+        model="mistral-nemo",
+        temperature=0.0,
+    )
+    structured_llm_docs_grader = llm.with_structured_output(
+        schema=GradeDocumentsList,
+        method="json_schema",
+    )
+
+    # Assemble prompt
+    grader_prompt = PromptTemplate(
+        template=LISTWISE_RETRIEVAL_GRADER_TEMPLATE,
+        input_variables=["documents", "question"],
+    )
+
+    # Assemble chain
+    return cached(
+        RunnableLambda(
+            lambda x: {
+                "documents": format_numbered_docs(x["documents"]),
+                "question": x["question"],
+            }
+        )
+        | grader_prompt
+        | structured_llm_docs_grader,
+        name="listwise_retrieval_grader",
+        model=llm.model,
+        template=LISTWISE_RETRIEVAL_GRADER_TEMPLATE,
+        schema=GradeDocumentsList,
+    )
 
-# Assemble prompt
-grader_prompt = PromptTemplate(
-    template=RETRIEVAL_GRADER_TEMPLATE,
-    input_variables=["document", "question"],
-)
 
-# Assemble chain
-retrieval_grader: RunnableSequence = grader_prompt | structured_llm_doc_grader
+registry.register("retrieval_grader", build_retrieval_grader)
+retrieval_grader: RunnableSequence = registry.lazy("retrieval_grader")
+registry.register("listwise_retrieval_grader", build_listwise_retrieval_grader, warmup=GRADING_MODE == "listwise")
+listwise_retrieval_grader: RunnableSequence = registry.lazy("listwise_retrieval_grader")
@@ -18,16 +18,11 @@ from src.constants import (
     TOPICS,
     QUESTION_ROUTER_TEMPLATE,
 )
+from src.registry import registry
 
 warnings.filterwarnings("ignore")
 load_dotenv("local/.env")
 
-# Define LLM
-llm = ChatOllama(
-    model="qwen2.5",
-    temperature=0.0,
-)
-
 
 # Define Route query
 class RouteQuery(BaseModel):
@@ -39,19 +34,36 @@ class RouteQuery(BaseModel):
     )
 
 
-structured_llm_router = llm.with_structured_output(
-    schema=RouteQuery,
-    method="json_schema",
-)
+# Define chain factory
+def build_question_router() -> RunnableSequence:
+    """
+    Build the Question Router chain.
+
+    :return: chain routing the question to the vector store or the web search
+    :rtype: RunnableSequence
+    """
+    # Define LLM
+    llm = ChatOllama(
+        model="qwen2.5",
+        temperature=0.0,
+    )
+    structured_llm_router = llm.with_structured_output(
+        schema=RouteQuery,
+        method="json_schema",
+    )
+
+    # Assemble prompt
+    router_prompt = PromptTemplate(
+        template=QUESTION_ROUTER_TEMPLATE,
+        input_variables=["question"],
+        partial_variables={
+            "topics": "- ".join([topic + "\n" for topic in TOPICS]),
+        },
+    )
+
+    # Assemble chain
+    return router_prompt | structured_llm_router
 
-# Assemble prompt
-router_prompt = PromptTemplate(
-    template=QUESTION_ROUTER_TEMPLATE,
-    input_variables=["question"],
-    partial_variables={
-        "topics": "- ".join([topic + "\n" for topic in TOPICS]),
-    },
-)
 
-# Assemble chain
-question_router: RunnableSequence = router_prompt | structured_llm_router
+registry.register("question_router", build_question_router)
+question_router: RunnableSequence = registry.lazy("question_router")
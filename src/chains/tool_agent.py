@@ -16,6 +16,7 @@ import warnings
 from datetime import datetime
 from src.utils.logging import logger
 from src.constants import FUNCTION_CALLER_TEMPLATE
+from src.registry import registry
 
 warnings.filterwarnings("ignore")
 load_dotenv("local/.env")
@@ -98,21 +99,33 @@ prompt = PromptTemplate(
     },
 )
 
-# Define LLM
-llm = ChatOllama(
-    model="qwen2.5",
-    temperature=0.0,
-)
+# Define agent factory
+def build_tool_agent_executor() -> AgentExecutor:
+    """
+    Build the Tool calling Agent and its executor.
 
-# Create Tool caller Agent
-tool_agent: RunnableSequence = create_tool_calling_agent(
-    llm=llm,
-    tools=tools,
-    prompt=prompt,
-)
+    :return: executor of the Tool calling Agent
+    :rtype: AgentExecutor
+    """
+    # Define LLM
+    llm = ChatOllama(
+        model="qwen2.5",
+        temperature=0.0,
+    )
 
-tool_agent_executor = AgentExecutor(
-    agent=tool_agent,
-    tools=tools,
-    verbose=False,
-)
+    # Create Tool caller Agent
+    tool_agent: RunnableSequence = create_tool_calling_agent(
+        llm=llm,
+        tools=tools,
+        prompt=prompt,
+    )
+
+    return AgentExecutor(
+        agent=tool_agent,
+        tools=tools,
+        verbose=False,
+    )
+
+
+registry.register("tool_agent_executor", build_tool_agent_executor)
+tool_agent_executor: AgentExecutor = registry.lazy("tool_agent_executor")
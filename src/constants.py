@@ -8,6 +8,20 @@ LOG_FILE_NAME = "app.log"  # Name of the log file
 EMBEDDING_MODEL = "thenlper/gte-base" # 768-dimensional embedding model with 512-dimensional context window
 RERANKER_MODEL = "BAAI/bge-reranker-large" # cross-encoder to be used for reranking
 
+# Query embeddings cache
+EMBEDDING_CACHE = {
+    "max_size": 10_000, # maximum number of cached vectors (least recently used are evicted)
+    "ttl": 7 * 24 * 3600, # time-to-live of each cached vector in seconds (None for no expiration)
+    "persist_path": None, # JSON file to persist the cache across runs (e.g. "local/cache/embeddings.json"), None for in-memory only
+}
+
+# Document embeddings store
+EMBEDDING_STORE = {
+    "enabled": True, # read the vectors of the already encoded contents from disk at ingestion
+    "root": "local/embedding_store", # folder of the store (one sub-folder per model)
+    "dtype": "float16", # storage type of the vectors, "float16" (half the size) or "float32"
+}
+
 # Search types
 MMR = {
     "search_type": "mmr", # use Maximal Marginal Relevance to retrieve the most relevant documents
@@ -24,8 +38,115 @@ SIMILARITY = {
     },
 }
 
+HYBRID = {
+    "search_type": "hybrid", # fuse dense (semantic) and BM25 sparse (keyword) scores
+    "search_kwargs": {
+        "k": 6, # number of documents to retrieve (keyword matches need fewer candidates)
+        "alpha": 0.5, # weight of the dense score (1 is pure dense search, 0 is pure BM25 search)
+    },
+}
+RETRIEVAL_SEARCH = SIMILARITY # search used by the retriever: SIMILARITY, MMR or HYBRID (HYBRID needs a hybrid ingestion)
+BM25_PARAMS_PATH = "local/bm25_params.json" # BM25 encoder parameters fitted at ingestion time
+
 TOP_K = 5 # number of documents to pass to the Graders (this is after either MMR or Similarity search and reranking)
 
+# Topic-aware metadata pre-filtering
+METADATA_FILTER = {
+    "enabled": False, # restrict the vector search to the chunks of the topics inferred from the question (enable once the index is re-ingested with topic tags)
+    "min_hits": TOP_K, # minimum number of filtered hits, otherwise the search falls back to the whole index
+}
+
+# Two-stage rerank cascade
+RERANK_CASCADE = {
+    "enabled": False, # prune candidates with a cheap first stage before RERANKER_MODEL
+    "first_stage_model": None, # small cross-encoder (e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2"), None to keep the bi-encoder (vector search) ranking
+    "first_stage_top_n": 6, # number of candidates scored by RERANKER_MODEL (must be >= TOP_K)
+}
+
+# Reranker scores cache
+RERANKER_CACHE = {
+    "max_size": 50_000, # maximum number of cached (query, chunk) scores (least recently used are evicted)
+    "ttl": 7 * 24 * 3600, # time-to-live of each cached score in seconds (None for no expiration)
+}
+
+# Bounded thread pools of the async path (ainvoke) and of the concurrent nodes
+ASYNC_EXECUTORS = {
+    "inference": 2, # threads running the embedding and reranking models (CPU bound, keep at most the number of cores)
+    "io": 16, # threads running the Vector Store queries (network bound)
+    "grader": TOP_K, # concurrent retrieval grader LLM calls, across Graph runs (Ollama serves them in parallel up to OLLAMA_NUM_PARALLEL)
+}
+
+# Semantic answer cache in front of the Graph
+ANSWER_CACHE = {
+    "enabled": True, # answer near-duplicate questions from previous final answers
+    "threshold": 0.95, # minimum cosine similarity between the questions embeddings for a hit
+    "max_size": 1_000, # maximum number of cached answers (least recently used are evicted)
+    "ttl": 24 * 3600, # time-to-live of each cached answer in seconds (None for no expiration)
+}
+KB_VERSION_PATH = "local/kb_version.txt" # stamp rewritten at each ingestion, invalidating the cached answers
+
+# Grader chains verdicts cache (keyed by chain, model, prompt template and input)
+GRADER_CACHE = {
+    "enabled": True, # reuse the verdicts of the retrieval, hallucination and answer graders
+    "backend": "memory", # "memory" (LRU of this process) or "sqlite" (persistent, shared by the workers)
+    "path": "local/grader_cache.sqlite", # database of the "sqlite" backend
+    "max_size": 100_000, # maximum number of cached verdicts (least recently used are evicted)
+    "ttl": 7 * 24 * 3600, # time-to-live of each cached verdict in seconds (None for no expiration)
+}
+
+# Quantized ONNX inference backend (requires the "onnx" extra)
+ONNX_BACKEND = {
+    "enabled": False, # serve EMBEDDING_MODEL and RERANKER_MODEL with int8 ONNX Runtime instead of fp32 PyTorch
+    "cache_dir": "local/onnx", # directory where the quantized exports are cached
+    "quantization": "avx2", # target instruction set of the quantization: "arm64", "avx2", "avx512" or "avx512_vnni"
+}
+
+# Vector store
+VECTOR_STORE_BACKEND = "pinecone" # "pinecone" (managed service) or "local" (in-process NumPy index), overridable via the VECTOR_STORE_BACKEND env variable
+PINECONE_POOL = {
+    "pool_threads": 16, # threads of the Pinecone client for parallel requests
+    "connection_pool_maxsize": 16, # HTTP connections kept alive and shared by the concurrent queries
+}
+LOCAL_INDEX = {
+    "persist_dir": "local/index", # directory where the local index is persisted
+    "index_type": "exact", # "exact" (brute-force search) or "ivf" (approximate search over k-means clusters)
+    "metric": "cosine", # "cosine" or "dotproduct"
+    "n_lists": 64, # number of clusters of the IVF index
+    "n_probe": 8, # number of clusters probed at query time by the IVF index
+}
+
+# Ingestion fetch stage
+FETCH = {
+    "max_workers": 16, # concurrent requests overall
+    "per_host_limit": 4, # concurrent requests to the same host
+    "min_interval": 0.0, # minimum interval in seconds between two requests to the same host
+    "retries": 3, # retries on connection errors, 429 and 5xx responses
+    "backoff": 0.5, # base delay in seconds of the exponential backoff between retries
+    "timeout": 30.0, # timeout in seconds of each request
+    "cache_dir": "local/http_cache", # on-disk HTTP cache revalidated with ETag/Last-Modified, None to disable it
+}
+EMBED_WORKERS = 4 # default maximum of embedding processes, each holding a copy of the model in memory
+INGESTION_MANIFEST_PATH = "local/ingestion_manifest.json" # content hash and chunk ids of each indexed source, for incremental refreshes
+INGESTION_PIPELINE = {
+    "chunk_batch_size": 4, # pages chunked together
+    "embed_batch_size": 64, # chunks embedded together
+    "upsert_batch_size": 100, # vectors per upsert (and delete) request
+    "queue_size": 2, # batches buffered between two stages, a full queue holds back the upstream stage
+    "checkpoint_interval": 10, # upsert batches between two checkpoints of the manifest (and of the local index)
+}
+DEDUP = {
+    "enabled": True,
+    "threshold": 0.85, # Jaccard similarity of the word shingles from which a chunk is dropped as a near-duplicate
+    "num_perm": 128, # hash permutations of the MinHash signatures
+    "shingle_size": 5, # words per shingle
+    "report_path": "local/dedup_report.json", # report of the chunks dropped by the last ingestion
+}
+SEMANTIC_CHUNKER = {
+    "breakpoint_threshold_type": "percentile",
+    "min_chunk_size": 200,
+    "pooling": "encode", # "encode" (chunks encoded again, batched, as the queries are) or "mean" (opt-in, chunk vectors averaged from the sentence windows, not evaluated on the retrieval yet)
+}
+
 # Nodes
 RETRIEVE = "retrieve"
 GRADE_DOCUMENTS = "grade_documents"
@@ -34,6 +155,14 @@ WEBSEARCH = "websearch"
 
 # Confidence threshold
 CONFIDENCE_THRESHOLD = 0.5
+GRADING_MODE = "pointwise" # "pointwise" (one retrieval grader call per document), "listwise" (one call grading all the documents, falling back to pointwise) or "reranker" (reranker scores, the LLM grades the uncertain band only)
+RERANKER_GRADING = {
+    "scale": 1.0, # Platt scaling of the reranker logit, sigmoid(scale * logit + bias), fit on labelled (question, chunk) pairs
+    "bias": 0.0,
+    "relevant_above": 0.8, # calibrated score from which a document is relevant without an LLM call
+    "irrelevant_below": 0.2, # calibrated score under which a document is not relevant without an LLM call
+}
+EARLY_EXIT_GRADING = False # grade only as many documents as needed to know if the confidence score exceeds CONFIDENCE_THRESHOLD (fewer LLM calls, in more sequential rounds)
 
 # Max generations iterations
 MAX_ITERATIONS = 2 # allows a maxium of 3 generations
@@ -45,6 +174,12 @@ TOPICS = [
     "prompt engineering",
     "adversarial attacks",
 ]
+TOPIC_KEYWORDS = {
+    "agent": ["agent", "planning", "task decomposition", "tool use", "react", "reflexion"],
+    "agent memory": ["memory", "memories", "long-term", "short-term", "mips", "maximum inner product"],
+    "prompt engineering": ["prompt", "few-shot", "zero-shot", "chain of thought", "chain-of-thought", "in-context", "instruction"],
+    "adversarial attacks": ["adversarial", "attack", "jailbreak", "red-teaming", "red teaming", "token manipulation"],
+} # keywords tagging the chunks with TOPICS at ingestion and inferring the topics of the questions
 
 # LLMs templates
 
@@ -162,6 +297,32 @@ User question: {question}
 Answer:
 """
 
+# Template for the Self-correction -> Grading if each of the retrieved documents is relevant to the question, in a single call (listwise)
+LISTWISE_RETRIEVAL_GRADER_TEMPLATE = """
+You are a grader assessing the relevance of a numbered list of retrieved documents to a user question.
+If a document contains keywords or semantic meaning related to the question, grade it as relevant.
+Give a binary score of 'yes' or 'no' for each document, with its number, to indicate whether it is relevant or not to the user question.
+Answer with a JSON object listing the verdicts of all the documents, in the shape of the examples.
+
+Retrieved documents:
+[1] The Eiffel Tower was constructed in 1889 for the World's Fair in Paris.
+[2] The Great Wall of China is one of the largest man-made structures in the world, stretching over 13,000 miles.
+[3] It is a popular tourist attraction and one of the most recognizable structures in Paris, built by Gustave Eiffel's company.
+User question: When was the Eiffel Tower built?
+Answer: {{"verdicts": [{{"index": 1, "binary_score": "yes"}}, {{"index": 2, "binary_score": "no"}}, {{"index": 3, "binary_score": "yes"}}]}}
+
+Retrieved documents:
+[1] The moon orbits Earth every 27.3 days.
+[2] The theory of relativity was developed by Albert Einstein in the early 20th century.
+User question: What are the main characteristics of Mars?
+Answer: {{"verdicts": [{{"index": 1, "binary_score": "no"}}, {{"index": 2, "binary_score": "no"}}]}}
+
+Retrieved documents:
+{documents}
+User question: {question}
+Answer:
+"""
+
 # Template for question router -> it routes to either vector store or web search based on the question topic
 QUESTION_ROUTER_TEMPLATE = """
 You are an expert at routing a user question to a vectorstore or websearch.
@@ -0,0 +1,315 @@
+"""
+Module implementing the persistent embedding store.
+
+The EmbeddingStore keeps the vectors computed by an embedding model on disk,
+keyed by the hash of their content, so that a rebuild of the index, a migration
+or a switch of Vector Store backend reads the vectors instead of re-encoding the corpus.
+Each model has its own folder holding:
+* vectors.bin: the vectors as a float16 or float32 row-major matrix, read through a memory map.
+* index.bin: append-only records (32-byte sha256 digest of the content, 8-byte row number).
+* meta.json: model name, dimension and dtype of the vectors.
+
+Rows are appended before their index records, under an exclusive file lock, so that
+several processes can share the store (readers map the file read-only, without copying
+it, and pick up the records appended since their last read).
+"""
+
+# Import packages and modules
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import struct
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+RECORD = struct.Struct("<32sQ")  # sha256 digest, row number
+
+
+# Define classes
+class EmbeddingStore:
+    """On-disk, content-addressed and memory-mapped store of the vectors of a model."""
+
+    def __init__(
+        self: Self,
+        root: str,
+        model_name: str,
+        dtype: str = "float16",
+        read_only: bool = False,
+    ) -> None:
+        """
+        Initialize the store (the dimension is set by the first vectors stored).
+
+        :param root: folder of the store, shared by all models
+        :type root: str
+        :param model_name: name of the embedding model (part of the key)
+        :type model_name: str
+        :param dtype: storage type of the vectors, 'float16' or 'float32'
+        :type dtype: str
+        :param read_only: whether the store is only read (e.g., shared by serving processes)
+        :type read_only: bool
+        """
+        self.model_name = model_name
+        self.read_only = read_only
+        self.path = os.path.join(root, re.sub(r"[^\w.-]+", "_", model_name))
+        self.dtype = np.dtype(dtype)
+        self.dim: int | None = None
+        self._rows: dict[bytes, int] = {}
+        self._index_offset = 0
+        self._matrix: np.ndarray | None = None
+        self._lock = threading.Lock()
+        if not read_only:
+            os.makedirs(self.path, exist_ok=True)
+        self._load_meta()
+        self.refresh()
+
+    def __len__(self: Self) -> int:
+        """
+        Number of stored vectors.
+
+        :return: number of vectors
+        :rtype: int
+        """
+        return len(self._rows)
+
+    def __contains__(self: Self, text: str) -> bool:
+        """
+        Check if the vector of a text is stored.
+
+        :param text: content of the vector
+        :type text: str
+        :return: True if stored
+        :rtype: bool
+        """
+        return content_digest(text) in self._rows
+
+    def get(
+        self: Self,
+        texts: list[str],
+    ) -> list[list[float] | None]:
+        """
+        Get the stored vectors of texts.
+
+        :param texts: contents of the vectors
+        :type texts: list[str]
+        :return: vectors (as float32 values), None for the texts not stored
+        :rtype: list[list[float] | None]
+        """
+        digests = [content_digest(text) for text in texts]
+        with self._lock:
+            if any(digest not in self._rows for digest in digests):
+                self._refresh()  # vectors appended by other processes
+            rows = [self._rows.get(digest) for digest in digests]
+            found = [row for row in rows if row is not None]
+            if not found:
+                return [None] * len(texts)
+            matrix = self._matrix_rows(found)
+        vectors = iter(matrix.astype(np.float32).tolist())
+        return [next(vectors) if row is not None else None for row in rows]
+
+    def put(
+        self: Self,
+        texts: list[str],
+        vectors: list[list[float]] | np.ndarray,
+    ) -> int:
+        """
+        Append the vectors of texts that are not stored yet.
+
+        :param texts: contents of the vectors
+        :type texts: list[str]
+        :param vectors: vectors of the texts
+        :type vectors: list[list[float]] | np.ndarray
+        :return: number of appended vectors
+        :rtype: int
+        """
+        if self.read_only:
+            raise PermissionError(f"Embedding store {self.path} is opened read-only.")
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        if not len(texts):
+            return 0
+        with self._lock, self._file_lock():
+            self._refresh()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._save_meta()
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}.")
+            new: dict[bytes, int] = {}
+            for position, text in enumerate(texts):
+                digest = content_digest(text)
+                if digest not in self._rows:
+                    new.setdefault(digest, position)
+            if not new:
+                return 0
+
+            vectors_path = os.path.join(self.path, "vectors.bin")
+            row_bytes = self.dim * self.dtype.itemsize
+            size = os.path.getsize(vectors_path) if os.path.isfile(vectors_path) else 0
+            if size % row_bytes:
+                size -= size % row_bytes  # drop the partial row of an interrupted writer
+                os.truncate(vectors_path, size)
+            first_row = size // row_bytes
+            with open(vectors_path, "ab") as file:
+                file.write(np.ascontiguousarray(vectors[list(new.values())]).tobytes())
+            records = b"".join(RECORD.pack(digest, first_row + number) for number, digest in enumerate(new))
+            with open(os.path.join(self.path, "index.bin"), "ab") as file:
+                file.write(records)  # after the rows, so that a record always points to a complete row
+            self._refresh()
+        logger.info(f"Stored {len(new)} vectors in {self.path} ({len(self)} in total).")
+
+        return len(new)
+
+    def refresh(self: Self) -> None:
+        """Read the index records appended since the last refresh."""
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self: Self) -> None:
+        """Read the index records appended since the last refresh (the caller holds the lock)."""
+        index_path = os.path.join(self.path, "index.bin")
+        if not os.path.isfile(index_path):
+            return
+        with open(index_path, "rb") as file:
+            file.seek(self._index_offset)
+            data = file.read()
+        complete = len(data) - len(data) % RECORD.size  # ignore a partial record being written
+        for digest, row in RECORD.iter_unpack(data[:complete]):
+            self._rows[digest] = row
+        self._index_offset += complete
+        if self.dim is None:
+            self._load_meta()
+
+    def _matrix_rows(
+        self: Self,
+        rows: list[int],
+    ) -> np.ndarray:
+        """
+        Read rows of the vectors matrix, remapping the file if it grew.
+
+        :param rows: row numbers
+        :type rows: list[int]
+        :return: vectors (len(rows), dim)
+        :rtype: np.ndarray
+        """
+        if self._matrix is None or max(rows) >= len(self._matrix):
+            vectors_path = os.path.join(self.path, "vectors.bin")
+            n_rows = os.path.getsize(vectors_path) // (self.dim * self.dtype.itemsize)
+            self._matrix = np.memmap(vectors_path, dtype=self.dtype, mode="r", shape=(n_rows, self.dim))
+        return self._matrix[rows]
+
+    def _load_meta(self: Self) -> None:
+        """Load the dimension of the vectors, checking the dtype of the store."""
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.isfile(meta_path):
+            return
+        with open(meta_path) as file:
+            meta = json.load(file)
+        if np.dtype(meta["dtype"]) != self.dtype:
+            raise ValueError(f"Embedding store {self.path} holds {meta['dtype']} vectors, not {self.dtype}.")
+        self.dim = meta["dim"]
+
+    def _save_meta(self: Self) -> None:
+        """Save the model name, dimension and dtype of the vectors."""
+        with open(os.path.join(self.path, "meta.json"), "w") as file:
+            json.dump({"model_name": self.model_name, "dim": self.dim, "dtype": self.dtype.name}, file)
+
+    @contextmanager
+    def _file_lock(self: Self) -> Iterator[None]:
+        """
+        Hold the exclusive lock of the writers (across processes).
+
+        :return: context holding the lock
+        :rtype: Iterator[None]
+        """
+        with open(os.path.join(self.path, ".lock"), "w") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+class StoredEmbeddings(Embeddings):
+    """Embeddings wrapper reading the document vectors from the embedding store, encoding only the missing ones."""
+
+    def __init__(
+        self: Self,
+        embedding: Embeddings,
+        store: EmbeddingStore,
+    ) -> None:
+        """
+        Initialize the stored embeddings.
+
+        :param embedding: underlying embedding model
+        :type embedding: Embeddings
+        :param store: embedding store of the model
+        :type store: EmbeddingStore
+        """
+        self.embedding = embedding
+        self.store = store
+        self.stats = {"hits": 0, "misses": 0}
+
+    def embed_documents(
+        self: Self,
+        texts: list[str],
+    ) -> list[list[float]]:
+        """
+        Embed documents, encoding only the ones missing from the store in a single batch.
+
+        :param texts: documents to embed
+        :type texts: list[str]
+        :return: documents vectors
+        :rtype: list[list[float]]
+        """
+        vectors = self.store.get(texts)
+        misses = [position for position, vector in enumerate(vectors) if vector is None]
+        if misses:
+            missed_texts = list(dict.fromkeys(texts[position] for position in misses))
+            missed_vectors = np.asarray(self.embedding.embed_documents(missed_texts))
+            missed_vectors = missed_vectors.astype(self.store.dtype)  # same precision whether read or just encoded
+            encoded = dict(zip(missed_texts, missed_vectors.astype(np.float32).tolist()))
+            for position in misses:
+                vectors[position] = encoded[texts[position]]
+            if not self.store.read_only:
+                self.store.put(missed_texts, missed_vectors)
+        self.stats["hits"] += len(texts) - len(misses)
+        self.stats["misses"] += len(misses)
+        return vectors
+
+    def embed_query(
+        self: Self,
+        text: str,
+    ) -> list[float]:
+        """
+        Embed a query (queries are not stored).
+
+        :param text: query to embed
+        :type text: str
+        :return: query vector
+        :rtype: list[float]
+        """
+        return self.embedding.embed_query(text)
+
+
+# Define functions
+def content_digest(
+    text: str,
+) -> bytes:
+    """
+    Digest of a content, key of its vector in the store.
+
+    :param text: content of the vector
+    :type text: str
+    :return: sha256 digest
+    :rtype: bytes
+    """
+    return hashlib.sha256(text.encode("utf-8")).digest()
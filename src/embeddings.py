@@ -0,0 +1,209 @@
+"""
+Module containing the Embeddings wrappers used by the retriever.
+
+The main class is CachedEmbeddings that wraps an embedding model
+with a bounded LRU cache keyed by normalized text and model name,
+so repeated questions (or retries in the Graph loop) are not re-embedded.
+The build_hf_embeddings factory builds the underlying model (fp32 PyTorch or int8 ONNX Runtime).
+"""
+
+# Import packages and modules
+
+import atexit
+import re
+import unicodedata
+
+from langchain_core.embeddings import Embeddings
+from typing_extensions import Self
+
+from src.constants import EMBEDDING_MODEL, ONNX_BACKEND
+from src.utils.cache import LRUCache, hash_key
+from src.utils.executors import run_in_executor
+from src.utils.logging import logger
+
+
+# Define classes
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper caching the vectors of queries and documents."""
+
+    def __init__(
+        self: Self,
+        embedding: Embeddings,
+        model_name: str,
+        max_size: int = 10_000,
+        ttl: float | None = None,
+        persist_path: str | None = None,
+    ) -> None:
+        """
+        Initialize the cached embeddings.
+
+        :param embedding: underlying embedding model
+        :type embedding: Embeddings
+        :param model_name: name of the embedding model (part of the cache key)
+        :type model_name: str
+        :param max_size: maximum number of cached vectors
+        :type max_size: int
+        :param ttl: time-to-live of each vector in seconds (None means no expiration)
+        :type ttl: float | None
+        :param persist_path: JSON file where the cache is persisted at exit (None means in-memory only)
+        :type persist_path: str | None
+        """
+        self.embedding = embedding
+        self.model_name = model_name
+        self.persist_path = persist_path
+        self.cache = LRUCache(max_size=max_size, ttl=ttl)
+        if persist_path is not None:
+            loaded = self.cache.load(persist_path)
+            logger.info(f"Loaded {loaded} cached embeddings from {persist_path}.")
+            atexit.register(self.persist)
+
+    def embed_query(
+        self: Self,
+        text: str,
+    ) -> list[float]:
+        """
+        Embed a query, using the cached vector if available.
+
+        :param text: query to embed
+        :type text: str
+        :return: query vector
+        :rtype: list[float]
+        """
+        key = self._key(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embedding.embed_query(text)
+            self.cache.set(key, vector)
+        return vector
+
+    def embed_documents(
+        self: Self,
+        texts: list[str],
+    ) -> list[list[float]]:
+        """
+        Embed documents, encoding only the cache misses in a single batch.
+
+        :param texts: documents to embed
+        :type texts: list[str]
+        :return: documents vectors
+        :rtype: list[list[float]]
+        """
+        keys = [self._key(text) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        misses = [position for position, vector in enumerate(vectors) if vector is None]
+        if misses:
+            missed_vectors = self.embedding.embed_documents([texts[position] for position in misses])
+            for position, vector in zip(misses, missed_vectors):
+                vectors[position] = vector
+                self.cache.set(keys[position], vector)
+        return vectors
+
+    async def aembed_query(
+        self: Self,
+        text: str,
+    ) -> list[float]:
+        """
+        Embed a query asynchronously, running the model in the bounded inference pool on a cache miss.
+
+        :param text: query to embed
+        :type text: str
+        :return: query vector
+        :rtype: list[float]
+        """
+        key = self._key(text)
+        vector = self.cache.get(key)
+        if vector is None:  # looked up once, so that a miss is counted once
+            vector = await run_in_executor("inference", self.embedding.embed_query, text)
+            self.cache.set(key, vector)
+        return vector
+
+    async def aembed_documents(
+        self: Self,
+        texts: list[str],
+    ) -> list[list[float]]:
+        """
+        Embed documents asynchronously, running the model in the bounded inference pool.
+
+        :param texts: documents to embed
+        :type texts: list[str]
+        :return: documents vectors
+        :rtype: list[list[float]]
+        """
+        return await run_in_executor("inference", self.embed_documents, texts)
+
+    def stats(self: Self) -> dict[str, float]:
+        """
+        Get the cache statistics.
+
+        :return: size, hits, misses, evictions and hit rate of the cache
+        :rtype: dict[str, float]
+        """
+        return self.cache.stats()
+
+    def persist(self: Self) -> None:
+        """Persist the cache on disk (if a persistence path is set)."""
+        if self.persist_path is None:
+            return
+        self.cache.save(self.persist_path)
+        logger.info(f"Persisted {len(self.cache)} cached embeddings to {self.persist_path}.")
+
+    def _key(
+        self: Self,
+        text: str,
+    ) -> str:
+        """
+        Build the cache key of a text.
+
+        :param text: text to embed
+        :type text: str
+        :return: cache key
+        :rtype: str
+        """
+        return hash_key(self.model_name, normalize_text(text))
+
+
+# Define functions
+def build_hf_embeddings(
+    show_progress: bool = False,
+) -> Embeddings:
+    """
+    Build the HuggingFace embedding model (fp32 PyTorch or int8 ONNX Runtime).
+
+    :param show_progress: whether to show the progress bar of the encoding
+    :type show_progress: bool
+    :return: embedding model
+    :rtype: Embeddings
+    """
+    if ONNX_BACKEND.get("enabled"):
+        from src.onnx_models import build_onnx_embeddings
+
+        return build_onnx_embeddings(
+            model_name=EMBEDDING_MODEL,
+            cache_dir=ONNX_BACKEND.get("cache_dir"),
+            quantization=ONNX_BACKEND.get("quantization"),
+            encode_kwargs={"normalize_embeddings": False},
+            show_progress=show_progress,
+        )  # int8 ONNX Runtime
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"normalize_embeddings": False},
+        show_progress=show_progress,
+        multi_process=False,
+    )
+
+
+def normalize_text(
+    text: str,
+) -> str:
+    """
+    Normalize a text to be used as cache key (unicode form and whitespaces).
+
+    :param text: text to normalize
+    :type text: str
+    :return: normalized text
+    :rtype: str
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
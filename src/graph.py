@@ -18,29 +18,38 @@ The main frameworks used are:
 # Import packages and modules
 
 import warnings
+from typing import Any
+
 from dotenv import load_dotenv
+from langchain_core.runnables import RunnableLambda
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import (
     StateGraph,
     END,
 )
+from src.answer_cache import SemanticAnswerCache
 from src.constants import (
+    ANSWER_CACHE,
     GENERATE,
     GRADE_DOCUMENTS,
     RETRIEVE,
     WEBSEARCH,
     CONFIDENCE_THRESHOLD,
+    KB_VERSION_PATH,
     MAX_ITERATIONS,
 )
 from src.nodes import (
     generation_node,
     grader_node,
     retriever_node,
+    aretriever_node,
     agent_search_node,
 )
 from src.chains.hallucination_grader import hallucination_grader
 from src.chains.answer_grader import answer_grader
 from src.chains.router import question_router
+from src.registry import registry
+from src.utils.executors import run_in_executor
 from src.state import GraphState
 from src.utils.logging import logger
 
@@ -160,7 +169,9 @@ def route_question(
 workflow = StateGraph(GraphState)  # graph with custom state
 
 # Define Nodes
-workflow.add_node(RETRIEVE, retriever_node)
+workflow.add_node(
+    RETRIEVE, RunnableLambda(retriever_node, afunc=aretriever_node)
+)  # async retrieval when the Graph is run with ainvoke
 workflow.add_node(GRADE_DOCUMENTS, grader_node)
 workflow.add_node(GENERATE, generation_node)
 workflow.add_node(
@@ -206,6 +217,94 @@ memory = MemorySaver()
 # Compile Graph
 graph = workflow.compile(checkpointer=memory)
 
+
+# Define semantic answer cache
+def build_answer_cache() -> SemanticAnswerCache:
+    """
+    Build the semantic answer cache (sharing the retriever embedding model).
+
+    :return: semantic answer cache
+    :rtype: SemanticAnswerCache
+    """
+    return SemanticAnswerCache(
+        embedding=registry.get("embedding_model"),
+        threshold=ANSWER_CACHE.get("threshold"),
+        max_size=ANSWER_CACHE.get("max_size"),
+        ttl=ANSWER_CACHE.get("ttl"),
+        version_path=KB_VERSION_PATH,
+    )
+
+
+registry.register("answer_cache", build_answer_cache, warmup=ANSWER_CACHE.get("enabled"))
+answer_cache: SemanticAnswerCache = registry.lazy("answer_cache")
+
+
+def is_cacheable(
+    state: dict[str, Any],
+) -> bool:
+    """
+    Function telling if the final state of the Graph can be cached.
+
+    Answers that hit the maximum iterations were not validated by the self-reflection unit.
+
+    :param state: final state of the graph
+    :type state: dict[str, Any]
+    :return: True if the answer can be served to similar questions
+    :rtype: bool
+    """
+    return bool(state.get("generation")) and state.get("iterations", 0) <= MAX_ITERATIONS
+
+
+def invoke_graph(
+    inputs: dict[str, Any],
+    config: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    Function running the Graph behind the semantic answer cache (if enabled).
+
+    :param inputs: input state of the graph (with the question)
+    :type inputs: dict[str, Any]
+    :param config: config of the run (e.g., thread id of the memory)
+    :type config: dict[str, Any]
+    :return: final state of the graph
+    :rtype: dict[str, Any]
+    """
+    if not ANSWER_CACHE.get("enabled"):
+        return graph.invoke(inputs, config)
+    return answer_cache.get_or_invoke(
+        question=inputs["question"],
+        invoke=lambda: graph.invoke(inputs, config),
+        cacheable=is_cacheable,
+    )
+
+
+async def ainvoke_graph(
+    inputs: dict[str, Any],
+    config: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    Function running the Graph asynchronously behind the semantic answer cache (if enabled).
+
+    Concurrent runs in the same process overlap their retrieval I/O.
+
+    :param inputs: input state of the graph (with the question)
+    :type inputs: dict[str, Any]
+    :param config: config of the run (e.g., thread id of the memory)
+    :type config: dict[str, Any]
+    :return: final state of the graph
+    :rtype: dict[str, Any]
+    """
+    if not ANSWER_CACHE.get("enabled"):
+        return await graph.ainvoke(inputs, config)
+    version = answer_cache.version()
+    result = await run_in_executor("inference", answer_cache.lookup, inputs["question"])
+    if result is not None:
+        return result
+    result = await graph.ainvoke(inputs, config)
+    if is_cacheable(result):
+        await run_in_executor("inference", answer_cache.update, inputs["question"], result, version)
+    return result
+
 # Save Graph DAG
 #if not os.path.isfile("assests/graph.png"):
 #    logger.info(f"Saving Graph DAG to {'assests/graph.png'}")
@@ -0,0 +1,68 @@
+"""
+Package dedicated to the ingestion stages.
+
+The main modules are:
+* chunking: semantic chunking that embeds the chunks from the sentence windows it already encoded.
+* dedup: MinHash/LSH elimination of the near-duplicate chunks before their embedding.
+* fetch: concurrent, polite and cached HTTP fetch stage.
+* incremental: content-hash chunk ids and manifest driving delta upserts and deletes.
+* parallel: embedding on a pool of worker processes.
+* pipeline: streaming, bounded-memory and resumable fetch → clean → chunk → embed → upsert pipeline.
+* sources: web, sitemap, local directory and JSON Lines sources of documents.
+"""
+
+from .chunking import SemanticChunkEmbedder
+from .dedup import MinHashDeduplicator
+from .fetch import (
+    ConcurrentFetcher,
+    HTTPCache,
+    parse_html,
+)
+from .incremental import (
+    assign_chunk_ids,
+    chunk_id,
+    content_hash,
+    IngestionManifest,
+    plan_delta,
+)
+from .parallel import (
+    default_workers,
+    ProcessPoolEmbeddings,
+)
+from .pipeline import (
+    background,
+    clean_text,
+    StreamingIngestionPipeline,
+)
+from .sources import (
+    DirectorySource,
+    DocumentSource,
+    JSONLSource,
+    SitemapSource,
+    WebSource,
+)
+
+# Make ingestion stages importable from the package
+
+__all__ = [
+    "assign_chunk_ids",
+    "background",
+    "chunk_id",
+    "clean_text",
+    "ConcurrentFetcher",
+    "content_hash",
+    "default_workers",
+    "DirectorySource",
+    "DocumentSource",
+    "HTTPCache",
+    "IngestionManifest",
+    "JSONLSource",
+    "MinHashDeduplicator",
+    "parse_html",
+    "plan_delta",
+    "ProcessPoolEmbeddings",
+    "SemanticChunkEmbedder",
+    "SitemapSource",
+    "StreamingIngestionPipeline",
+    "WebSource",
+]
@@ -0,0 +1,163 @@
+"""
+Module implementing the chunk-and-embed stage of the ingestion.
+
+SemanticChunker embeds a window of sentences around each sentence to find the
+breakpoints between chunks, and the chunks were then embedded a second time when
+added to the Vector Store. The SemanticChunkEmbedder does both passes at once:
+* the sentence windows of a whole batch of documents are encoded in one batched call.
+* the breakpoints are computed with vectorized cosine distances, exactly as SemanticChunker does.
+* the chunks are encoded in one batched call across the documents on the same warm model,
+  or (opt-in) their vectors are mean-pooled from the window vectors of their sentences (no second pass).
+The ingestion pipeline only splits (and pools) with split_and_pool, its embed stage encoding
+the chunks that remain once the near-duplicates are dropped.
+"""
+
+# Import packages and modules
+
+import re
+from typing import Literal
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_experimental.text_splitter import combine_sentences, SemanticChunker
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+
+# Define classes
+class SemanticChunkEmbedder(SemanticChunker):
+    """Semantic chunker returning the chunk vectors along with the chunks."""
+
+    def __init__(
+        self: Self,
+        embeddings: Embeddings,
+        pooling: Literal["mean", "encode"] = "encode",
+        **kwargs: dict,
+    ) -> None:
+        """
+        Initialize the chunker.
+
+        :param embeddings: embedding model of both the sentence windows and the chunks
+        :type embeddings: Embeddings
+        :param pooling: 'encode' to encode the chunks, 'mean' to average the window vectors of the chunk sentences
+        :type pooling: Literal["mean", "encode"]
+        :param kwargs: arguments of SemanticChunker (breakpoint_threshold_type, min_chunk_size, ...)
+        :type kwargs: dict
+        """
+        super().__init__(embeddings=embeddings, **kwargs)
+        if pooling not in ("mean", "encode"):
+            raise ValueError(f"Unknown pooling '{pooling}', expected 'mean' or 'encode'.")
+        self.pooling = pooling
+
+    def split_and_embed(
+        self: Self,
+        documents: list[Document],
+    ) -> tuple[list[Document], list[list[float]]]:
+        """
+        Split the documents into semantic chunks and embed the chunks.
+
+        :param documents: documents to split
+        :type documents: list[Document]
+        :return: chunks (with the metadata of their document) and their vectors
+        :rtype: tuple[list[Document], list[list[float]]]
+        """
+        chunks, vectors = self.split_and_pool(documents)
+        if self.pooling == "encode" and chunks:
+            return chunks, self.embeddings.embed_documents([chunk.page_content for chunk in chunks])
+        return chunks, vectors
+
+    def split_and_pool(
+        self: Self,
+        documents: list[Document],
+    ) -> tuple[list[Document], list[list[float]]]:
+        """
+        Split the documents into semantic chunks, mean-pooling their vectors if the pooling is 'mean'.
+
+        With the 'encode' pooling, the chunks are left to be encoded by the caller
+        (e.g., after the near-duplicates are dropped).
+
+        :param documents: documents to split
+        :type documents: list[Document]
+        :return: chunks (with the metadata of their document) and their pooled vectors (empty with the 'encode' pooling)
+        :rtype: tuple[list[Document], list[list[float]]]
+        """
+        sentences = [re.split(self.sentence_split_regex, doc.page_content) for doc in documents]
+        windows: list[str] = []
+        for doc_sentences in sentences:
+            combined = combine_sentences([{"sentence": text, "index": i} for i, text in enumerate(doc_sentences)], self.buffer_size)
+            windows.extend(sentence["combined_sentence"] for sentence in combined)
+        # One batched call for the windows of all the documents
+        window_vectors = np.asarray(self.embeddings.embed_documents(windows), dtype=np.float64)
+
+        chunks: list[Document] = []
+        vectors: list[np.ndarray] = []
+        offset = 0
+        for document, doc_sentences in zip(documents, sentences):
+            doc_vectors = window_vectors[offset : offset + len(doc_sentences)]
+            offset += len(doc_sentences)
+            for start, end in self.chunk_bounds(doc_sentences, doc_vectors):
+                chunks.append(Document(page_content=" ".join(doc_sentences[start:end]), metadata=dict(document.metadata)))
+                vectors.append(doc_vectors[start:end].mean(axis=0))
+
+        logger.info(f"Split {len(documents)} documents into {len(chunks)} chunks from {len(window_vectors)} window vectors.")
+        if self.pooling == "encode":
+            return chunks, []
+
+        return chunks, [vector.tolist() for vector in vectors]
+
+    def chunk_bounds(
+        self: Self,
+        sentences: list[str],
+        window_vectors: np.ndarray,
+    ) -> list[tuple[int, int]]:
+        """
+        Find the sentence ranges of the chunks of a document, as SemanticChunker.split_text does.
+
+        :param sentences: sentences of the document
+        :type sentences: list[str]
+        :param window_vectors: vectors of the sentence windows (n_sentences, d)
+        :type window_vectors: np.ndarray
+        :return: (start, end) sentence indices of each chunk
+        :rtype: list[tuple[int, int]]
+        """
+        if len(sentences) == 1 or (self.breakpoint_threshold_type == "gradient" and len(sentences) == 2):
+            return [(i, i + 1) for i in range(len(sentences))]
+
+        distances = list(cosine_distances(window_vectors))
+        if self.number_of_chunks is not None:
+            threshold, breakpoint_array = self._threshold_from_clusters(distances), distances
+        else:
+            threshold, breakpoint_array = self._calculate_breakpoint_threshold(distances)
+
+        bounds = []
+        start = 0
+        for index in (i for i, distance in enumerate(breakpoint_array) if distance > threshold):
+            if self.min_chunk_size is not None and len(" ".join(sentences[start : index + 1])) < self.min_chunk_size:
+                continue  # merged with the next chunk
+            bounds.append((start, index + 1))
+            start = index + 1
+        if start < len(sentences):
+            bounds.append((start, len(sentences)))
+
+        return bounds
+
+
+# Define functions
+def cosine_distances(
+    vectors: np.ndarray,
+) -> np.ndarray:
+    """
+    Cosine distances between consecutive vectors.
+
+    :param vectors: vectors (n, d)
+    :type vectors: np.ndarray
+    :return: distances (n - 1,), with a zero vector at distance 1 of any vector
+    :rtype: np.ndarray
+    """
+    norms = np.linalg.norm(vectors, axis=1)
+    similarities = np.einsum("ij,ij->i", vectors[:-1], vectors[1:])
+    denominators = norms[:-1] * norms[1:]
+    similarities = np.divide(similarities, denominators, out=np.zeros_like(similarities), where=denominators > 0)
+    return 1.0 - similarities
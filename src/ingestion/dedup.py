@@ -0,0 +1,182 @@
+"""
+Module implementing the near-duplicate chunk elimination of the ingestion.
+
+Scraped pages repeat boilerplate (navigation, footers, citations), which the chunker
+turns into near-identical chunks that would all be embedded, stored and retrieved.
+The MinHashDeduplicator drops them between the chunk and the embed stages:
+* each chunk is reduced to the MinHash signature of its word shingles.
+* Locality-Sensitive Hashing (LSH) bands the signatures, so that only the chunks sharing
+  a band with a kept chunk are compared (no quadratic scan of the corpus).
+* a candidate whose estimated Jaccard similarity with a kept chunk reaches the threshold is dropped,
+  and recorded (with the chunk it duplicates) in the report of the run.
+
+The kept chunks are remembered across the batches of a run, not across runs: on an incremental
+refresh, the chunks of the changed pages are only compared with each other.
+"""
+
+# Import packages and modules
+
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from langchain_core.documents import Document
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+# Define classes
+class MinHashDeduplicator:
+    """Near-duplicate chunk filter based on MinHash signatures and LSH banding."""
+
+    def __init__(
+        self: Self,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        seed: int = 1,
+    ) -> None:
+        """
+        Initialize the deduplicator.
+
+        :param threshold: Jaccard similarity of the word shingles from which a chunk is a duplicate
+        :type threshold: float
+        :param num_perm: number of hash permutations of the signatures (accuracy vs speed)
+        :type num_perm: int
+        :param shingle_size: number of words of a shingle
+        :type shingle_size: int
+        :param seed: seed of the hash permutations
+        :type seed: int
+        """
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"Expected a threshold in (0, 1], got {threshold}.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = generator.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._buckets: list[dict[bytes, list[int]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures: list[np.ndarray] = []
+        self._kept: list[tuple[str, str]] = []  # (source, id) of the kept chunks
+        self.stats = {"checked": 0, "dropped": 0}
+        self.dropped: list[dict] = []
+
+    def signature(
+        self: Self,
+        text: str,
+    ) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+
+        :param text: text of the chunk
+        :type text: str
+        :return: signature (num_perm,)
+        :rtype: np.ndarray
+        """
+        words = re.findall(r"\w+", text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {" ".join(words[start : start + size]) for start in range(max(1, len(words) - size + 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        # Universal hashing (a * h + b) mod p of the shingles for each permutation, wrapping on overflow
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+    def filter(
+        self: Self,
+        chunks: list[Document],
+    ) -> list[Document]:
+        """
+        Drop the chunks near-duplicating a chunk kept so far (in this call or a previous one).
+
+        :param chunks: chunks to filter
+        :type chunks: list[Document]
+        :return: kept chunks, in their order
+        :rtype: list[Document]
+        """
+        kept = []
+        for chunk in chunks:
+            signature = self.signature(chunk.page_content)
+            keys = [signature[band * self.rows : (band + 1) * self.rows].tobytes() for band in range(self.bands)]
+            candidates = {position for band, key in enumerate(keys) for position in self._buckets[band].get(key, ())}
+            duplicate, similarity = None, 0.0
+            for position in sorted(candidates):
+                estimate = float(np.mean(self._signatures[position] == signature))
+                if estimate >= self.threshold and estimate > similarity:
+                    duplicate, similarity = position, estimate
+            self.stats["checked"] += 1
+            if duplicate is not None:
+                source, id_ = self._kept[duplicate]
+                self.stats["dropped"] += 1
+                self.dropped.append(
+                    {
+                        "source": chunk.metadata.get("source", ""),
+                        "id": chunk.id,
+                        "duplicate_of": {"source": source, "id": id_},
+                        "similarity": round(similarity, 3),
+                        "text": chunk.page_content[:200],
+                    }
+                )
+                continue
+            position = len(self._signatures)
+            self._signatures.append(signature)
+            self._kept.append((chunk.metadata.get("source", ""), chunk.id))
+            for band, key in enumerate(keys):
+                self._buckets[band][key].append(position)
+            kept.append(chunk)
+
+        return kept
+
+    def report(self: Self) -> dict:
+        """
+        Report of the dropped chunks.
+
+        :return: settings, statistics and dropped chunks (with the kept chunk they duplicate)
+        :rtype: dict
+        """
+        report = {
+            "threshold": self.threshold,
+            "num_perm": self.num_perm,
+            "shingle_size": self.shingle_size,
+            **self.stats,
+            "dropped_chunks": self.dropped,
+        }
+        logger.info(f"Dropped {self.stats['dropped']} near-duplicate chunks out of {self.stats['checked']}.")
+
+        return report
+
+
+# Define functions
+def lsh_params(
+    threshold: float,
+    num_perm: int,
+    recall: float = 0.95,
+) -> tuple[int, int]:
+    """
+    Choose the LSH banding of the signatures.
+
+    Two chunks of similarity s share a band with probability 1 - (1 - s^rows)^bands: the banding
+    with the most rows per band (fewest candidates to verify) still pairing the chunks at the
+    threshold with the given probability is chosen.
+
+    :param threshold: similarity threshold
+    :type threshold: float
+    :param num_perm: number of hash permutations of the signatures
+    :type num_perm: int
+    :param recall: minimum probability of comparing two chunks at the threshold
+    :type recall: float
+    :return: number of bands and rows per band
+    :rtype: tuple[int, int]
+    """
+    bandings = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+    return max(
+        (banding for banding in bandings if 1 - (1 - threshold ** banding[1]) ** banding[0] >= recall),
+        key=lambda banding: banding[1],
+        default=(num_perm, 1),
+    )
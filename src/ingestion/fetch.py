@@ -0,0 +1,382 @@
+"""
+Module implementing the concurrent fetch stage of the ingestion.
+
+The ConcurrentFetcher downloads pages on a bounded thread pool with:
+* per-host politeness: a cap on the concurrent requests and a minimum interval between requests to the same host.
+* retries with exponential backoff on connection errors, 429 and 5xx responses (honoring Retry-After).
+* an on-disk HTTP cache: pages are revalidated with ETag/Last-Modified and a 304 reuses the cached body.
+
+Pages are parsed into Documents the same way WebBaseLoader does (text and source/title/description/language metadata).
+"""
+
+# Import packages and modules
+
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from langchain_core.documents import Document
+from requests.adapters import HTTPAdapter
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+# Define classes
+class HTTPCache:
+    """On-disk cache of HTTP responses with their validators (ETag and Last-Modified)."""
+
+    def __init__(
+        self: Self,
+        cache_dir: str,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param cache_dir: directory where the responses are stored
+        :type cache_dir: str
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(
+        self: Self,
+        url: str,
+    ) -> tuple[dict, str] | None:
+        """
+        Get the cached response of a URL.
+
+        :param url: URL of the page
+        :type url: str
+        :return: validators and body of the cached response, None on a miss
+        :rtype: tuple[dict, str] | None
+        """
+        meta_path, body_path = self._paths(url)
+        if not (os.path.isfile(meta_path) and os.path.isfile(body_path)):
+            return None
+        with open(meta_path) as file:
+            meta = json.load(file)
+        with open(body_path, encoding="utf-8") as file:
+            return meta, file.read()
+
+    def set(
+        self: Self,
+        url: str,
+        body: str,
+        headers: dict,
+    ) -> None:
+        """
+        Store the response of a URL (only if it carries a validator).
+
+        :param url: URL of the page
+        :type url: str
+        :param body: body of the response
+        :type body: str
+        :param headers: headers of the response
+        :type headers: dict
+        """
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        if meta["etag"] is None and meta["last_modified"] is None:
+            return
+        meta_path, body_path = self._paths(url)
+        for path, content in ((body_path, body), (meta_path, json.dumps(meta))):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                file.write(content)
+            os.replace(tmp_path, path)  # atomic, concurrent writers never leave partial files
+
+    def _paths(
+        self: Self,
+        url: str,
+    ) -> tuple[str, str]:
+        """
+        Paths of the validators and body files of a URL.
+
+        :param url: URL of the page
+        :type url: str
+        :return: validators and body paths
+        :rtype: tuple[str, str]
+        """
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json"), os.path.join(self.cache_dir, f"{name}.html")
+
+
+class ConcurrentFetcher:
+    """Bounded, polite and cached concurrent HTTP fetcher."""
+
+    def __init__(
+        self: Self,
+        max_workers: int = 16,
+        per_host_limit: int = 4,
+        min_interval: float = 0.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 30.0,
+        cache_dir: str | None = None,
+        headers: dict | None = None,
+    ) -> None:
+        """
+        Initialize the fetcher.
+
+        :param max_workers: number of concurrent requests overall
+        :type max_workers: int
+        :param per_host_limit: number of concurrent requests to the same host
+        :type per_host_limit: int
+        :param min_interval: minimum interval in seconds between two requests to the same host
+        :type min_interval: float
+        :param retries: number of retries of a failed request
+        :type retries: int
+        :param backoff: base delay in seconds of the exponential backoff between retries
+        :type backoff: float
+        :param timeout: timeout in seconds of each request
+        :type timeout: float
+        :param cache_dir: directory of the HTTP cache, None to disable it
+        :type cache_dir: str | None
+        :param headers: headers sent with each request
+        :type headers: dict | None
+        """
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.min_interval = min_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = HTTPCache(cache_dir) if cache_dir else None
+        self.headers = headers or {"User-Agent": os.getenv("USER_AGENT", "advanced-rag-ingestion")}
+        self.stats = {"fetched": 0, "not_modified": 0, "retries": 0, "failed": 0}
+        self._hosts: dict[str, tuple[threading.BoundedSemaphore, list[float]]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def fetch(
+        self: Self,
+        url: str,
+    ) -> str:
+        """
+        Fetch a page, revalidating the cached copy if any.
+
+        :param url: URL of the page
+        :type url: str
+        :return: body of the page
+        :rtype: str
+        """
+        cached = self.cache.get(url) if self.cache is not None else None
+        headers = dict(self.headers)
+        if cached is not None:
+            meta, _ = cached
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self._request(url, headers)
+        if response.status_code == 304 and cached is not None:
+            self._count("not_modified")
+            return cached[1]
+        response.raise_for_status()
+        if response.encoding is None or response.encoding.lower() == "iso-8859-1":
+            response.encoding = response.apparent_encoding  # as WebBaseLoader autoset_encoding
+        body = response.text
+        if self.cache is not None:
+            self.cache.set(url, body, response.headers)
+        self._count("fetched")
+
+        return body
+
+    def fetch_all(
+        self: Self,
+        urls: Iterable[str],
+    ) -> Iterator[tuple[str, str | None]]:
+        """
+        Fetch pages concurrently, yielding them as they complete.
+
+        At most twice max_workers requests are pending, so that a slow consumer holds back
+        the fetch instead of accumulating the bodies in memory.
+        Failures are logged and yielded with a None body, so that one bad URL does not stop the ingestion.
+
+        :param urls: URLs of the pages
+        :type urls: Iterable[str]
+        :return: iterator of (URL, body) pairs in completion order
+        :rtype: Iterator[tuple[str, str | None]]
+        """
+        urls = iter(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch") as executor:
+            futures = {}
+            while True:
+                for url in itertools.islice(urls, 2 * self.max_workers - len(futures)):
+                    futures[executor.submit(self.fetch, url)] = url
+                if not futures:
+                    return
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    try:
+                        yield url, future.result()
+                    except Exception as exc:
+                        self._count("failed")
+                        logger.error(f"Failed to fetch {url}: {exc}")
+                        yield url, None
+
+    def load(
+        self: Self,
+        urls: Iterable[str],
+    ) -> list[Document]:
+        """
+        Fetch and parse pages concurrently into Documents (in the order of the URLs).
+
+        :param urls: URLs of the pages
+        :type urls: Iterable[str]
+        :return: one Document per fetched page
+        :rtype: list[Document]
+        """
+        urls = list(dict.fromkeys(urls))
+        bodies = dict(self.fetch_all(urls))
+        documents = [parse_html(url, bodies[url]) for url in urls if bodies.get(url) is not None]
+        logger.info(f"Loaded {len(documents)}/{len(urls)} pages ({self.stats}).")
+
+        return documents
+
+    def _request(
+        self: Self,
+        url: str,
+        headers: dict,
+    ) -> requests.Response:
+        """
+        Send a GET request with per-host politeness and retries.
+
+        :param url: URL of the page
+        :type url: str
+        :param headers: headers of the request
+        :type headers: dict
+        :return: response (the last one if all the retries failed on a retriable status)
+        :rtype: requests.Response
+        """
+        semaphore, last_request = self._host(urlparse(url).netloc)
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * 2**attempt
+            with semaphore:
+                self._wait_turn(last_request)
+                try:
+                    response = self._session().get(url, headers=headers, timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout) as exc:
+                    if attempt == self.retries:
+                        raise
+                    logger.warning(f"Request to {url} failed ({exc}), retrying in {delay:.2f}s...")
+                    response = None
+            if response is not None:
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else delay
+                logger.warning(f"Request to {url} returned {response.status_code}, retrying in {delay:.2f}s...")
+            self._count("retries")
+            time.sleep(delay)
+
+        return response
+
+    def _host(
+        self: Self,
+        host: str,
+    ) -> tuple[threading.BoundedSemaphore, list[float]]:
+        """
+        Get the concurrency limiter and the last request time of a host.
+
+        :param host: host of the URL
+        :type host: str
+        :return: semaphore of the host and a mutable holder of its last request time
+        :rtype: tuple[threading.BoundedSemaphore, list[float]]
+        """
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (threading.BoundedSemaphore(self.per_host_limit), [0.0])
+            return self._hosts[host]
+
+    def _wait_turn(
+        self: Self,
+        last_request: list[float],
+    ) -> None:
+        """
+        Sleep until the minimum interval since the last request to the host has elapsed.
+
+        :param last_request: mutable holder of the last request time of the host
+        :type last_request: list[float]
+        """
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            turn = max(now, last_request[0] + self.min_interval)
+            last_request[0] = turn  # book the slot before sleeping
+        time.sleep(turn - now)
+
+    def _session(self: Self) -> requests.Session:
+        """
+        Get the HTTP session of the current thread (keep-alive connections are reused).
+
+        :return: session of the thread
+        :rtype: requests.Session
+        """
+        if not hasattr(self._local, "session"):
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.per_host_limit, pool_maxsize=self.per_host_limit)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._local.session = session
+        return self._local.session
+
+    def _count(
+        self: Self,
+        name: str,
+    ) -> None:
+        """
+        Increment a counter of the fetcher statistics.
+
+        :param name: name of the counter
+        :type name: str
+        """
+        with self._lock:
+            self.stats[name] += 1
+
+
+# Define functions
+def parse_html(
+    url: str,
+    html: str,
+    parser: str = "html.parser",
+) -> Document:
+    """
+    Parse a page into a Document, as WebBaseLoader does.
+
+    :param url: URL of the page
+    :type url: str
+    :param html: body of the page
+    :type html: str
+    :param parser: BeautifulSoup parser
+    :type parser: str
+    :return: text of the page with source, title, description and language metadata
+    :rtype: Document
+    """
+    soup = BeautifulSoup(html, parser)
+    metadata = {"source": url}
+    if title := soup.find("title"):
+        metadata["title"] = title.get_text()
+    if description := soup.find("meta", attrs={"name": "description"}):
+        metadata["description"] = description.get("content", "No description found.")
+    if html_tag := soup.find("html"):
+        metadata["language"] = html_tag.get("lang", "No language found.")
+
+    return Document(page_content=soup.get_text(), metadata=metadata)
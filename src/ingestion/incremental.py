@@ -0,0 +1,211 @@
+"""
+Module implementing the incremental ingestion.
+
+Chunks get deterministic ids derived from their source and content hash,
+and a local manifest records, for each source, the hash of the page and
+the ids of its indexed chunks. A refresh then:
+* skips the pages whose content did not change (no chunking, no embedding).
+* embeds and upserts only the chunks that are new.
+* deletes the chunks that disappeared from a changed page or a removed source.
+"""
+
+# Import packages and modules
+
+import hashlib
+import json
+import os
+from collections.abc import Collection
+
+from langchain_core.documents import Document
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+
+# Define classes
+class IngestionManifest:
+    """Record of the indexed sources, their content hash and their chunk ids."""
+
+    def __init__(
+        self: Self,
+        index: str,
+        sources: dict[str, dict] | None = None,
+    ) -> None:
+        """
+        Initialize the manifest.
+
+        :param index: identity of the index the manifest describes (e.g., 'pinecone:my-index')
+        :type index: str
+        :param sources: mapping from source to {"hash": ..., "chunk_ids": [...]} (and "duplicate_of": {dropped id: kept id})
+        :type sources: dict[str, dict] | None
+        """
+        self.index = index
+        self.sources = sources or {}
+
+    @classmethod
+    def load(
+        cls: type["IngestionManifest"],
+        path: str,
+        index: str,
+    ) -> "IngestionManifest":
+        """
+        Load the manifest of an index (an empty one if missing or describing another index).
+
+        :param path: JSON file of the manifest
+        :type path: str
+        :param index: identity of the index
+        :type index: str
+        :return: manifest
+        :rtype: IngestionManifest
+        """
+        if not os.path.isfile(path):
+            return cls(index=index)
+        with open(path) as file:
+            data = json.load(file)
+        if data.get("index") != index:
+            logger.warning(f"Manifest {path} describes index '{data.get('index')}', starting from an empty one.")
+            return cls(index=index)
+        return cls(index=index, sources=data.get("sources"))
+
+    def save(
+        self: Self,
+        path: str,
+    ) -> None:
+        """
+        Persist the manifest (atomically).
+
+        :param path: JSON file of the manifest
+        :type path: str
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"index": self.index, "sources": self.sources}, file)
+        os.replace(tmp_path, path)
+
+    def is_unchanged(
+        self: Self,
+        document: Document,
+    ) -> bool:
+        """
+        Check whether a page was already indexed with the same content.
+
+        :param document: fetched page
+        :type document: Document
+        :return: True if the page content did not change
+        :rtype: bool
+        """
+        entry = self.sources.get(document.metadata.get("source", ""))
+        return entry is not None and entry.get("hash") == content_hash(document.page_content)
+
+    def chunk_ids(
+        self: Self,
+        source: str,
+    ) -> list[str]:
+        """
+        Ids of the indexed chunks of a source.
+
+        :param source: source of the chunks
+        :type source: str
+        :return: chunk ids
+        :rtype: list[str]
+        """
+        return self.sources.get(source, {}).get("chunk_ids", [])
+
+
+# Define functions
+def content_hash(
+    text: str,
+) -> str:
+    """
+    Hash of a text content.
+
+    :param text: text to hash
+    :type text: str
+    :return: sha256 hex digest
+    :rtype: str
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(
+    source: str,
+    text: str,
+) -> str:
+    """
+    Deterministic id of a chunk from its source and content.
+
+    :param source: source of the chunk
+    :type source: str
+    :param text: content of the chunk
+    :type text: str
+    :return: chunk id
+    :rtype: str
+    """
+    return hashlib.sha256(f"{source}\n{content_hash(text)}".encode("utf-8")).hexdigest()[:32]
+
+
+def assign_chunk_ids(
+    chunks: list[Document],
+) -> list[Document]:
+    """
+    Set the deterministic id of the chunks (in place).
+
+    Identical chunks within the same source are collapsed into one.
+
+    :param chunks: chunks to identify
+    :type chunks: list[Document]
+    :return: unique chunks with their id set
+    :rtype: list[Document]
+    """
+    unique: dict[str, Document] = {}
+    for chunk in chunks:
+        chunk.id = chunk_id(chunk.metadata.get("source", ""), chunk.page_content)
+        unique.setdefault(chunk.id, chunk)
+    return list(unique.values())
+
+
+def plan_delta(
+    manifest: IngestionManifest,
+    documents: list[Document],
+    chunks: list[Document],
+    sources: Collection[str] | None = None,
+) -> tuple[list[Document], list[str]]:
+    """
+    Compute the chunks to upsert and the ids to delete, and update the manifest accordingly.
+
+    :param manifest: manifest of the index (updated in place)
+    :type manifest: IngestionManifest
+    :param documents: changed pages that were chunked
+    :type documents: list[Document]
+    :param chunks: chunks of the changed pages, with their id set
+    :type chunks: list[Document]
+    :param sources: all the configured sources, the indexed ones not listed are removed (None keeps them)
+    :type sources: Collection[str] | None
+    :return: chunks to embed and upsert, ids of the chunks to delete
+    :rtype: tuple[list[Document], list[str]]
+    """
+    chunks_by_source: dict[str, list[Document]] = {}
+    for chunk in chunks:
+        chunks_by_source.setdefault(chunk.metadata.get("source", ""), []).append(chunk)
+
+    to_upsert: list[Document] = []
+    to_delete: list[str] = []
+    for document in documents:
+        source = document.metadata.get("source", "")
+        previous_ids = set(manifest.chunk_ids(source))
+        source_chunks = chunks_by_source.get(source, [])
+        current_ids = [chunk.id for chunk in source_chunks]
+        to_upsert.extend(chunk for chunk in source_chunks if chunk.id not in previous_ids)
+        to_delete.extend(sorted(previous_ids.difference(current_ids)))
+        manifest.sources[source] = {"hash": content_hash(document.page_content), "chunk_ids": current_ids}
+
+    if sources is not None:
+        for source in sorted(set(manifest.sources).difference(sources)):
+            to_delete.extend(manifest.chunk_ids(source))
+            del manifest.sources[source]
+
+    logger.info(f"Ingestion delta: {len(to_upsert)} chunks to upsert, {len(to_delete)} chunks to delete.")
+    return to_upsert, to_delete
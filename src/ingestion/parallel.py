@@ -0,0 +1,197 @@
+"""
+Module implementing the multi-process embedding of the ingestion.
+
+The ProcessPoolEmbeddings spreads the encoding over a pool of worker processes,
+each holding its own copy of the model (built once, when the worker starts) and
+using its share of the cores, so that the encoding throughput scales with the
+number of cores instead of being bound to the intra-op threads of one process.
+Batches are dispatched to the workers as they become free and the vectors are
+returned in the order of the texts.
+"""
+
+# Import packages and modules
+
+import multiprocessing
+import os
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+from typing_extensions import Self
+
+from src.constants import EMBED_WORKERS
+from src.utils.logging import logger
+
+_worker_model: Embeddings | None = None
+
+
+# Define classes
+class ProcessPoolEmbeddings(Embeddings):
+    """Embeddings computed on a pool of worker processes."""
+
+    def __init__(
+        self: Self,
+        factory: Callable[[], Embeddings],
+        workers: int | None = None,
+        batch_size: int = 32,
+    ) -> None:
+        """
+        Initialize the pool (started on first use).
+
+        :param factory: picklable function building the embedding model in each worker
+        :type factory: Callable[[], Embeddings]
+        :param workers: number of worker processes, defaults to default_workers() (1 encodes in-process)
+        :type workers: int | None
+        :param batch_size: number of texts sent to a worker at once
+        :type batch_size: int
+        """
+        self.factory = factory
+        self.workers = workers or default_workers()
+        self.batch_size = batch_size
+        self._executor: ProcessPoolExecutor | None = None
+        self._model: Embeddings | None = None
+
+    def embed_documents(
+        self: Self,
+        texts: list[str],
+    ) -> list[list[float]]:
+        """
+        Embed documents, spreading their batches over the workers.
+
+        :param texts: documents to embed
+        :type texts: list[str]
+        :return: documents vectors (in the order of the texts)
+        :rtype: list[list[float]]
+        """
+        if self.workers == 1:
+            return self._local_model().embed_documents(texts)
+        batches = [texts[start : start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        return [vector for vectors in self._pool().map(_embed_documents, batches) for vector in vectors]
+
+    def embed_query(
+        self: Self,
+        text: str,
+    ) -> list[float]:
+        """
+        Embed a query.
+
+        :param text: query to embed
+        :type text: str
+        :return: query vector
+        :rtype: list[float]
+        """
+        if self.workers == 1:
+            return self._local_model().embed_query(text)
+        return self._pool().submit(_embed_query, text).result()
+
+    def close(self: Self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self: Self) -> Self:
+        """
+        Enter the context of the pool.
+
+        :return: the embeddings
+        :rtype: ProcessPoolEmbeddings
+        """
+        return self
+
+    def __exit__(self: Self, *args: object) -> None:
+        """Stop the worker processes when leaving the context."""
+        self.close()
+
+    def _pool(self: Self) -> ProcessPoolExecutor:
+        """
+        Get the pool of workers, starting it on first use.
+
+        :return: pool of workers
+        :rtype: ProcessPoolExecutor
+        """
+        if self._executor is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            logger.info(f"Starting {self.workers} embedding workers with {threads} threads each...")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),  # no fork of the threads of the pipeline
+                initializer=_init_worker,
+                initargs=(self.factory, threads),
+            )
+        return self._executor
+
+    def _local_model(self: Self) -> Embeddings:
+        """
+        Get the in-process model (single worker), building it on first use.
+
+        :return: embedding model
+        :rtype: Embeddings
+        """
+        if self._model is None:
+            self._model = self.factory()
+        return self._model
+
+
+# Define functions
+def default_workers() -> int:
+    """
+    Default number of embedding processes: the number of cores, capped by EMBED_WORKERS.
+
+    Each worker holds its own copy of the model, so the memory grows with the workers.
+
+    :return: number of worker processes
+    :rtype: int
+    """
+    return min(EMBED_WORKERS, os.cpu_count() or 1)
+
+
+def _init_worker(
+    factory: Callable[[], Embeddings],
+    threads: int,
+) -> None:
+    """
+    Build the model of a worker, limited to its share of the cores.
+
+    :param factory: function building the embedding model
+    :type factory: Callable[[], Embeddings]
+    :param threads: number of intra-op threads of the worker
+    :type threads: int
+    """
+    global _worker_model
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = factory()
+
+
+def _embed_documents(
+    texts: list[str],
+) -> list[list[float]]:
+    """
+    Embed documents in a worker.
+
+    :param texts: documents to embed
+    :type texts: list[str]
+    :return: documents vectors
+    :rtype: list[list[float]]
+    """
+    return _worker_model.embed_documents(texts)
+
+
+def _embed_query(
+    text: str,
+) -> list[float]:
+    """
+    Embed a query in a worker.
+
+    :param text: query to embed
+    :type text: str
+    :return: query vector
+    :rtype: list[float]
+    """
+    return _worker_model.embed_query(text)
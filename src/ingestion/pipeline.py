@@ -0,0 +1,552 @@
+"""
+Module implementing the streaming ingestion pipeline.
+
+Documents are streamed from their sources (web pages, sitemaps, local files and
+JSON Lines dumps) and flow through the stages fetch → clean → chunk → embed → upsert in batches
+(of configurable size per stage). Each stage runs in its own thread and hands its
+batches to the next one through a bounded queue, so that the stages overlap in time
+and a slow stage holds back the upstream ones (backpressure): the memory is bounded
+by the queue sizes, not by the size of the corpus.
+
+The manifest of the incremental ingestion doubles as the checkpoint: a page is recorded
+once all its chunks are upserted, and the manifest is saved every few upsert batches,
+so that an interrupted run resumes by skipping the pages already indexed. A page whose
+near-duplicate chunks were dropped records the chunks they duplicate: when one of these is
+deleted, the page is invalidated so that its dropped chunks are indexed again (on the next run
+if the page was already skipped by this one).
+"""
+
+# Import packages and modules
+
+import queue
+import re
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from typing_extensions import Self
+
+from src.ingestion.dedup import MinHashDeduplicator
+from src.ingestion.fetch import ConcurrentFetcher
+from src.ingestion.incremental import assign_chunk_ids, IngestionManifest, plan_delta
+from src.ingestion.sources import DocumentSource, WebSource
+from src.utils.logging import logger
+from src.vectorstores import (
+    LocalVectorStore,
+    remove_from_sparse_encoder,
+    save_sparse_encoder,
+    tag_chunks,
+    update_sparse_encoder,
+    upsert_embeddings,
+)
+
+
+# Define classes
+class StreamingIngestionPipeline:
+    """Staged, bounded-memory and resumable ingestion pipeline."""
+
+    def __init__(
+        self: Self,
+        fetcher: ConcurrentFetcher,
+        text_splitter: Any,
+        embedding: Embeddings,
+        vectorstore: VectorStore,
+        manifest: IngestionManifest,
+        manifest_path: str,
+        topic_keywords: dict[str, list[str]],
+        sparse_encoder: Any | None = None,
+        sparse_encoder_path: str | None = None,
+        deduplicator: MinHashDeduplicator | None = None,
+        chunk_batch_size: int = 4,
+        embed_batch_size: int = 64,
+        upsert_batch_size: int = 100,
+        queue_size: int = 2,
+        checkpoint_interval: int = 10,
+    ) -> None:
+        """
+        Initialize the pipeline.
+
+        :param fetcher: fetcher of the pages given by URL
+        :type fetcher: ConcurrentFetcher
+        :param text_splitter: splitter of the pages into chunks (e.g., SemanticChunker)
+        :type text_splitter: TextSplitter
+        :param embedding: embedding model of the chunks
+        :type embedding: Embeddings
+        :param vectorstore: Vector Store the chunks are upserted into
+        :type vectorstore: VectorStore
+        :param manifest: manifest of the index (updated as the pages are indexed)
+        :type manifest: IngestionManifest
+        :param manifest_path: JSON file where the manifest is checkpointed
+        :type manifest_path: str
+        :param topic_keywords: keywords of each topic, to tag the chunks
+        :type topic_keywords: dict[str, list[str]]
+        :param sparse_encoder: BM25 encoder for hybrid search, fitted on the chunks as they stream, None for dense only
+        :type sparse_encoder: BM25Encoder | None
+        :param sparse_encoder_path: JSON file where the BM25 parameters are checkpointed
+        :type sparse_encoder_path: str | None
+        :param deduplicator: filter of the near-duplicate chunks before their embedding, None to keep them all
+        :type deduplicator: MinHashDeduplicator | None
+        :param chunk_batch_size: number of pages chunked together
+        :type chunk_batch_size: int
+        :param embed_batch_size: number of chunks embedded together
+        :type embed_batch_size: int
+        :param upsert_batch_size: number of vectors per upsert request
+        :type upsert_batch_size: int
+        :param queue_size: number of batches buffered between two stages
+        :type queue_size: int
+        :param checkpoint_interval: number of upsert batches between two checkpoints
+        :type checkpoint_interval: int
+        """
+        self.fetcher = fetcher
+        self.text_splitter = text_splitter
+        self.embedding = embedding
+        self.vectorstore = vectorstore
+        self.manifest = manifest
+        self.manifest_path = manifest_path
+        self.topic_keywords = topic_keywords
+        self.sparse_encoder = sparse_encoder
+        self.sparse_encoder_path = sparse_encoder_path
+        self._sparse_lock = threading.Lock()  # the embed stage updates the statistics the checkpoint persists
+        self.deduplicator = deduplicator
+        self._dependents: dict[str, set[str]] = {}  # kept chunk id -> pages of its dropped near-duplicates
+        for source, entry in manifest.sources.items():
+            self._add_dependents(source, entry)
+        self.chunk_batch_size = chunk_batch_size
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = upsert_batch_size
+        self.queue_size = queue_size
+        self.checkpoint_interval = checkpoint_interval
+        self.stats = {"pages": 0, "skipped_pages": 0, "chunks": 0, "upserted": 0, "deleted": 0}
+        self.timings: dict[str, list[float]] = {"fetch": [], "clean": [], "chunk": [], "dedup": [], "embed": [], "upsert": []}
+
+    def run(
+        self: Self,
+        sources: Iterable[str | DocumentSource],
+    ) -> dict[str, int]:
+        """
+        Ingest the documents, deleting the chunks of the indexed documents that are no longer listed.
+
+        :param sources: sources of all the documents of the knowledge base (URLs are fetched as web pages)
+        :type sources: Iterable[str | DocumentSource]
+        :return: statistics of the run (pages, skipped pages, chunks, upserted and deleted vectors)
+        :rtype: dict[str, int]
+        """
+        sources = list(sources)
+        urls = list(dict.fromkeys(source for source in sources if isinstance(source, str)))
+        sources = [source for source in sources if not isinstance(source, str)]
+        if urls:
+            sources.insert(0, WebSource(urls, self.fetcher))
+        seen: set[str] = set()
+        pages = background(self._clean(self._fetch(sources, seen)), self.queue_size, name="fetch")
+        batches = background(self._chunk(pages), self.queue_size, name="chunk")
+        batches = background(self._embed(batches), self.queue_size, name="embed")
+        for number, batch in enumerate(batches, start=1):
+            self._upsert(batch)
+            if number % self.checkpoint_interval == 0:
+                self.checkpoint()
+
+        if all(source.complete for source in sources):
+            _, removed_ids = plan_delta(self.manifest, [], [], sources=seen)  # the fetch stage is done
+            self._delete(removed_ids)
+        else:
+            logger.warning("Some sources could not be listed, the documents no longer listed are kept.")
+        self.checkpoint()
+        logger.info(f"Ingestion pipeline done: {self.stats}.")
+
+        return self.stats
+
+    def checkpoint(self: Self) -> None:
+        """Persist the local index (if any), the BM25 parameters (if any) and the manifest of the pages indexed so far."""
+        if isinstance(self.vectorstore, LocalVectorStore):
+            self.vectorstore.persist()
+        if self.sparse_encoder is not None and self.sparse_encoder_path is not None:
+            with self._sparse_lock:
+                if self.sparse_encoder.n_docs:
+                    save_sparse_encoder(self.sparse_encoder, self.sparse_encoder_path)
+        self.manifest.save(self.manifest_path)
+
+    def _fetch(
+        self: Self,
+        sources: list[DocumentSource],
+        seen: set[str],
+    ) -> Iterator[Document]:
+        """
+        Fetch stage: stream the documents of the sources.
+
+        :param sources: sources of the documents
+        :type sources: list[DocumentSource]
+        :param seen: set filled with the ids of the listed documents, even those that failed
+        :type seen: set[str]
+        :return: iterator of the fetched documents (in completion order)
+        :rtype: Iterator[Document]
+        """
+        for source in sources:
+            start = time.perf_counter()
+            for source_id, document in source.stream():
+                self.timings["fetch"].append(time.perf_counter() - start)  # fetch (or read) and parse of one document
+                seen.add(source_id)
+                if document is not None:
+                    yield document
+                start = time.perf_counter()
+
+    def _clean(
+        self: Self,
+        pages: Iterable[Document],
+    ) -> Iterator[list[Document]]:
+        """
+        Clean stage: normalize the text and drop the empty and already indexed pages.
+
+        :param pages: fetched pages
+        :type pages: Iterable[Document]
+        :return: iterator of batches of pages to chunk
+        :rtype: Iterator[list[Document]]
+        """
+        batch: list[Document] = []
+        for page in pages:
+            start = time.perf_counter()
+            page.page_content = clean_text(page.page_content)
+            self.stats["pages"] += 1
+            if not page.page_content or self.manifest.is_unchanged(page):
+                self.stats["skipped_pages"] += 1
+            else:
+                batch.append(page)
+            self.timings["clean"].append(time.perf_counter() - start)
+            if len(batch) == self.chunk_batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _chunk(
+        self: Self,
+        batches: Iterable[list[Document]],
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Chunk stage: split the pages, tag and identify the chunks, drop the near-duplicates and plan their delta.
+
+        The chunks are regrouped into batches of embed_batch_size chunks; each batch carries
+        the ids to delete and the manifest entries of the pages whose last chunk it holds,
+        and the chunk vectors when the splitter pooled them.
+
+        :param batches: batches of pages
+        :type batches: Iterable[list[Document]]
+        :return: iterator of batches with 'chunks', 'embeddings', 'deletes' and 'entries' keys
+        :rtype: Iterator[dict[str, Any]]
+        """
+        chunks: list[Document] = []
+        vectors: dict[str, list[float]] = {}
+        deletes: list[str] = []
+        entries: list[tuple[int, str, dict]] = []  # (number of buffered chunks when the page is complete, source, entry)
+        for pages in batches:
+            start = time.perf_counter()
+            page_chunks, page_vectors = self.split(pages)
+            elapsed = time.perf_counter() - start
+            duplicates: list[dict] = []
+            if self.deduplicator is not None:
+                # On the chunk texts, before any chunk is encoded
+                start = time.perf_counter()
+                dropped = len(self.deduplicator.dropped)
+                page_chunks = self.deduplicator.filter(page_chunks)
+                duplicates = self.deduplicator.dropped[dropped:]
+                self.timings["dedup"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            sources = [page.metadata.get("source", "") for page in pages]
+            delta = IngestionManifest(
+                index=self.manifest.index,
+                sources={source: self.manifest.sources[source] for source in sources if source in self.manifest.sources},
+            )
+            to_upsert, to_delete = plan_delta(delta, pages, page_chunks)
+            for duplicate in duplicates:  # dropped chunk id -> kept chunk id, to invalidate the page if the latter is deleted
+                delta.sources[duplicate["source"]].setdefault("duplicate_of", {})[duplicate["id"]] = duplicate["duplicate_of"]["id"]
+            deletes.extend(to_delete)
+            vectors.update((chunk.id, page_vectors[chunk.id]) for chunk in to_upsert if chunk.id in page_vectors)
+            for source in sources:
+                chunks.extend(chunk for chunk in to_upsert if chunk.metadata.get("source", "") == source)
+                entries.append((len(chunks), source, delta.sources[source]))
+            self.timings["chunk"].append(elapsed + time.perf_counter() - start)  # dedup excluded
+            while len(chunks) >= self.embed_batch_size:
+                yield self._take(chunks, vectors, deletes, entries, self.embed_batch_size)
+                deletes = []
+        if chunks or deletes or entries:
+            yield self._take(chunks, vectors, deletes, entries, len(chunks))
+
+    def split(
+        self: Self,
+        pages: list[Document],
+    ) -> tuple[list[Document], dict[str, list[float]]]:
+        """
+        Split pages into tagged chunks with their deterministic id.
+
+        A splitter pooling the chunk vectors from what it encoded to split (SemanticChunkEmbedder with
+        the 'mean' pooling) also returns these vectors, which the embed stage then reuses;
+        the other chunks are encoded by the embed stage, after the near-duplicates are dropped.
+
+        :param pages: pages to split
+        :type pages: list[Document]
+        :return: chunks of the pages, vectors of the chunks by id (empty if not computed by the splitter)
+        :rtype: tuple[list[Document], dict[str, list[float]]]
+        """
+        if hasattr(self.text_splitter, "split_and_pool"):
+            chunks, vectors = self.text_splitter.split_and_pool(pages)
+        else:
+            chunks, vectors = self.text_splitter.split_documents(pages), []
+        chunks = tag_chunks(chunks, topic_keywords=self.topic_keywords)
+        unique_chunks = assign_chunk_ids(chunks)  # sets the id of every chunk, duplicates included
+        return unique_chunks, {chunk.id: vector for chunk, vector in zip(chunks, vectors)}
+
+    def _embed(
+        self: Self,
+        batches: Iterable[dict[str, Any]],
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Embed stage: compute the dense vectors missing from the chunk stage (and the sparse vectors,
+        after accounting for the chunks of the batch in the BM25 statistics).
+
+        :param batches: batches of chunks
+        :type batches: Iterable[dict[str, Any]]
+        :return: iterator of the batches with 'embeddings' and 'sparse_vectors' keys
+        :rtype: Iterator[dict[str, Any]]
+        """
+        for batch in batches:
+            start = time.perf_counter()
+            texts = [chunk.page_content for chunk in batch["chunks"]]
+            missing = [position for position, vector in enumerate(batch["embeddings"]) if vector is None]
+            if missing:
+                for position, vector in zip(missing, self.embedding.embed_documents([texts[position] for position in missing])):
+                    batch["embeddings"][position] = vector
+            batch["sparse_vectors"] = None
+            if self.sparse_encoder is not None and texts:
+                with self._sparse_lock:
+                    update_sparse_encoder(self.sparse_encoder, texts)
+                    if self.sparse_encoder.n_docs:
+                        batch["sparse_vectors"] = self.sparse_encoder.encode_documents(texts)
+            self.timings["embed"].append(time.perf_counter() - start)
+            yield batch
+
+    def _upsert(
+        self: Self,
+        batch: dict[str, Any],
+    ) -> None:
+        """
+        Upsert stage: delete the stale chunks, upsert the new ones and record the completed pages.
+
+        :param batch: embedded batch of chunks
+        :type batch: dict[str, Any]
+        """
+        start = time.perf_counter()
+        self._delete(batch["deletes"])
+        if batch["chunks"]:
+            upsert_embeddings(
+                self.vectorstore,
+                batch["chunks"],
+                embeddings=batch["embeddings"],
+                ids=[chunk.id for chunk in batch["chunks"]],
+                sparse_vectors=batch["sparse_vectors"],
+                batch_size=self.upsert_batch_size,
+            )
+            self.stats["chunks"] += len(batch["chunks"])
+            self.stats["upserted"] += len(batch["chunks"])
+        for source, entry in batch["entries"]:
+            self.manifest.sources[source] = entry
+            self._add_dependents(source, entry)
+        self.timings["upsert"].append(time.perf_counter() - start)
+
+    def _delete(
+        self: Self,
+        ids: list[str],
+    ) -> None:
+        """
+        Delete vectors from the Vector Store (and their chunks from the BM25 statistics, if any).
+
+        :param ids: ids of the vectors to delete
+        :type ids: list[str]
+        """
+        for start in range(0, len(ids), self.upsert_batch_size):
+            batch = ids[start : start + self.upsert_batch_size]
+            if self.sparse_encoder is not None:
+                self._remove_sparse(batch)
+            self.vectorstore.delete(ids=batch)
+        self.stats["deleted"] += len(ids)
+        self._invalidate_dependents(ids)
+
+    def _add_dependents(
+        self: Self,
+        source: str,
+        entry: dict,
+    ) -> None:
+        """
+        Index a page by the kept chunks its dropped near-duplicates depend on.
+
+        :param source: source of the page
+        :type source: str
+        :param entry: manifest entry of the page
+        :type entry: dict
+        """
+        for kept_id in entry.get("duplicate_of", {}).values():
+            self._dependents.setdefault(kept_id, set()).add(source)
+
+    def _invalidate_dependents(
+        self: Self,
+        ids: list[str],
+    ) -> None:
+        """
+        Invalidate the pages whose dropped near-duplicates depend on deleted chunks, so that they are chunked again.
+
+        :param ids: ids of the deleted chunks
+        :type ids: list[str]
+        """
+        deleted = set(ids)
+        sources = set().union(*(self._dependents.pop(id_, ()) for id_ in deleted))
+        invalidated = 0
+        for source in sorted(sources):
+            entry = self.manifest.sources.get(source)
+            if entry is not None and not deleted.isdisjoint(entry.get("duplicate_of", {}).values()):
+                self.manifest.sources[source] = {**entry, "hash": None}  # no longer unchanged, its chunk ids are kept
+                invalidated += 1
+        if invalidated:
+            logger.info(f"Invalidated {invalidated} pages whose near-duplicate chunks depend on deleted chunks.")
+
+    def _remove_sparse(
+        self: Self,
+        ids: list[str],
+    ) -> None:
+        """
+        Remove the chunks about to be deleted from the BM25 statistics.
+
+        :param ids: ids of the deleted chunks
+        :type ids: list[str]
+        """
+        try:
+            texts = [document.page_content for document in self.vectorstore.get_by_ids(ids)]
+        except NotImplementedError:
+            logger.warning("The Vector Store cannot get the deleted chunks, run a full ingestion to refit the BM25 statistics.")
+            return
+        with self._sparse_lock:
+            remove_from_sparse_encoder(self.sparse_encoder, texts)
+
+    @staticmethod
+    def _take(
+        chunks: list[Document],
+        vectors: dict[str, list[float]],
+        deletes: list[str],
+        entries: list[tuple[int, str, dict]],
+        size: int,
+    ) -> dict[str, Any]:
+        """
+        Take the first chunks of the buffer (in place) as a batch, with their vectors and the pages they complete.
+
+        :param chunks: buffered chunks
+        :type chunks: list[Document]
+        :param vectors: vectors of the buffered chunks computed by the splitter, by id
+        :type vectors: dict[str, list[float]]
+        :param deletes: ids to delete with the batch
+        :type deletes: list[str]
+        :param entries: manifest entries of the buffered pages
+        :type entries: list[tuple[int, str, dict]]
+        :param size: number of chunks of the batch
+        :type size: int
+        :return: batch with 'chunks', 'embeddings' (None when missing), 'deletes' and 'entries' keys
+        :rtype: dict[str, Any]
+        """
+        batch_chunks = chunks[:size]
+        del chunks[:size]
+        embeddings = [vectors.pop(chunk.id, None) for chunk in batch_chunks]
+        completed = [(source, entry) for position, source, entry in entries if position <= size]
+        entries[:] = [(position - size, source, entry) for position, source, entry in entries if position > size]
+        return {"chunks": batch_chunks, "embeddings": embeddings, "deletes": deletes, "entries": completed}
+
+
+class _StageError:
+    """Exception raised by a stage, forwarded to the consumer."""
+
+    def __init__(
+        self: Self,
+        error: BaseException,
+    ) -> None:
+        """
+        Initialize the wrapper.
+
+        :param error: exception raised by the stage
+        :type error: BaseException
+        """
+        self.error = error
+
+
+_DONE = object()
+
+
+# Define functions
+def clean_text(
+    text: str,
+) -> str:
+    """
+    Normalize the text of a page: strip the lines and collapse the blank ones and the inner spaces.
+
+    :param text: raw text of the page
+    :type text: str
+    :return: cleaned text
+    :rtype: str
+    """
+    lines = (re.sub(r"[ \t\xa0]+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def background(
+    iterable: Iterable,
+    maxsize: int,
+    name: str = "stage",
+) -> Iterator:
+    """
+    Run an iterable in a background thread, buffering its items in a bounded queue.
+
+    The producer blocks when the queue is full (backpressure), its exceptions are raised
+    in the consumer, and it stops when the consumer stops iterating.
+
+    :param iterable: items of the stage (e.g., a generator consuming the previous stage)
+    :type iterable: Iterable
+    :param maxsize: maximum number of buffered items
+    :type maxsize: int
+    :param name: name of the thread
+    :type name: str
+    :return: iterator over the items
+    :rtype: Iterator
+    """
+    items: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as exc:
+            put(_StageError(exc))
+            return
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()  # stop the upstream stages too
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, name=f"ingestion-{name}", daemon=True)
+    thread.start()
+    try:
+        while (item := items.get()) is not _DONE:
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,340 @@
+"""
+Module implementing the source adapters of the ingestion.
+
+Each adapter streams the documents of a source as (source id, Document) pairs,
+the Document being None when a document could not be read (its indexed chunks
+are then kept rather than deleted). The adapters are:
+* WebSource: pages fetched by the ConcurrentFetcher.
+* SitemapSource: pages listed by a sitemap (nested sitemap indexes are expanded).
+* DirectorySource: HTML, Markdown, text and PDF files of a local tree.
+* JSONLSource: records of a JSON Lines dump.
+
+Local files are read through read-only memory maps, so that large files and dumps
+are streamed at disk speed without being loaded in memory.
+"""
+
+# Import packages and modules
+
+import fnmatch
+import io
+import json
+import mmap
+import os
+import re
+import xml.etree.ElementTree as ElementTree
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+from langchain_core.documents import Document
+from typing_extensions import Self
+
+from src.ingestion.fetch import ConcurrentFetcher, parse_html
+from src.ingestion.incremental import content_hash
+from src.utils.logging import logger
+
+DIRECTORY_PATTERNS = ("*.html", "*.htm", "*.md", "*.markdown", "*.txt", "*.pdf")
+
+
+# Define classes
+class DocumentSource(ABC):
+    """Source of documents streamed to the ingestion pipeline."""
+
+    complete: bool = True  # False when part of the listing failed, the unlisted documents being then kept
+
+
+    @abstractmethod
+    def stream(self: Self) -> Iterator[tuple[str, Document | None]]:
+        """
+        Stream the documents of the source.
+
+        :return: iterator of (source id, document) pairs, the document being None when it could not be read
+        :rtype: Iterator[tuple[str, Document | None]]
+        """
+
+
+class WebSource(DocumentSource):
+    """Web pages fetched concurrently."""
+
+    def __init__(
+        self: Self,
+        urls: Iterable[str],
+        fetcher: ConcurrentFetcher,
+    ) -> None:
+        """
+        Initialize the source.
+
+        :param urls: URLs of the pages
+        :type urls: Iterable[str]
+        :param fetcher: fetcher of the pages
+        :type fetcher: ConcurrentFetcher
+        """
+        self.urls = urls
+        self.fetcher = fetcher
+
+    def stream(self: Self) -> Iterator[tuple[str, Document | None]]:
+        """
+        Stream the pages as they are fetched.
+
+        :return: iterator of (URL, page) pairs, the page being None when the fetch failed
+        :rtype: Iterator[tuple[str, Document | None]]
+        """
+        for url, body in self.fetcher.fetch_all(self.urls):
+            yield url, parse_html(url, body) if body is not None else None
+
+
+class SitemapSource(DocumentSource):
+    """Web pages listed by a sitemap."""
+
+    def __init__(
+        self: Self,
+        sitemap_url: str,
+        fetcher: ConcurrentFetcher,
+        include: str | None = None,
+    ) -> None:
+        """
+        Initialize the source.
+
+        :param sitemap_url: URL of the sitemap (or sitemap index)
+        :type sitemap_url: str
+        :param fetcher: fetcher of the sitemaps and the pages
+        :type fetcher: ConcurrentFetcher
+        :param include: regular expression the page URLs must match, None for all
+        :type include: str | None
+        """
+        self.sitemap_url = sitemap_url
+        self.fetcher = fetcher
+        self.include = re.compile(include) if include else None
+
+    def urls(self: Self) -> Iterator[str]:
+        """
+        Expand the sitemap into the URLs of its pages, skipping the sitemaps that cannot be fetched or parsed.
+
+        :return: iterator of the page URLs
+        :rtype: Iterator[str]
+        """
+        pending, seen = [self.sitemap_url], set()
+        while pending:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen:
+                continue
+            seen.add(sitemap_url)
+            try:
+                root = ElementTree.fromstring(self.fetcher.fetch(sitemap_url).encode("utf-8"))
+            except Exception as exc:
+                # Skip the sitemap, keeping the indexed pages it may list
+                logger.error(f"Failed to read the sitemap {sitemap_url}: {exc}")
+                self.complete = False
+                continue
+            locations = [loc.text.strip() for loc in root.iterfind("{*}*/{*}loc") if loc.text]
+            if root.tag.endswith("sitemapindex"):
+                pending.extend(locations)
+                continue
+            for url in locations:
+                if self.include is None or self.include.search(url):
+                    yield url
+
+    def stream(self: Self) -> Iterator[tuple[str, Document | None]]:
+        """
+        Stream the pages of the sitemap as they are fetched.
+
+        :return: iterator of (URL, page) pairs, the page being None when the fetch failed
+        :rtype: Iterator[tuple[str, Document | None]]
+        """
+        yield from WebSource(self.urls(), self.fetcher).stream()
+
+
+class DirectorySource(DocumentSource):
+    """HTML, Markdown, text and PDF files of a local tree."""
+
+    def __init__(
+        self: Self,
+        root: str,
+        patterns: Iterable[str] = DIRECTORY_PATTERNS,
+    ) -> None:
+        """
+        Initialize the source.
+
+        :param root: root folder of the tree
+        :type root: str
+        :param patterns: glob patterns of the file names to ingest
+        :type patterns: Iterable[str]
+        """
+        self.root = root
+        self.patterns = tuple(patterns)
+
+    def paths(self: Self) -> Iterator[str]:
+        """
+        Walk the tree (in a deterministic order) for the files to ingest.
+
+        A missing root (e.g., unmounted or mistyped) marks the source incomplete, so that its indexed files are kept.
+
+        :return: iterator of the file paths
+        :rtype: Iterator[str]
+        """
+        if not os.path.isdir(self.root):
+            logger.error(f"Directory {self.root} does not exist, its indexed files are kept.")
+            self.complete = False
+            return
+        for directory, subdirectories, file_names in os.walk(self.root):
+            subdirectories.sort()
+            for file_name in sorted(file_names):
+                if any(fnmatch.fnmatch(file_name.lower(), pattern) for pattern in self.patterns):
+                    yield os.path.join(directory, file_name)
+
+    def stream(self: Self) -> Iterator[tuple[str, Document | None]]:
+        """
+        Stream the files of the tree.
+
+        :return: iterator of (path, document) pairs, the document being None when the file could not be read
+        :rtype: Iterator[tuple[str, Document | None]]
+        """
+        for path in self.paths():
+            try:
+                yield path, load_file(path)
+            except Exception as exc:
+                logger.error(f"Failed to read {path}: {exc}")
+                yield path, None
+
+
+class JSONLSource(DocumentSource):
+    """Records of a JSON Lines dump, one document per line."""
+
+    def __init__(
+        self: Self,
+        path: str,
+        text_field: str = "text",
+        id_field: str | None = "id",
+        metadata_fields: Iterable[str] | None = None,
+    ) -> None:
+        """
+        Initialize the source.
+
+        :param path: JSON Lines file
+        :type path: str
+        :param text_field: field holding the text of a record
+        :type text_field: str
+        :param id_field: field holding the id of a record, the hash of its text is used if missing
+        :type id_field: str | None
+        :param metadata_fields: fields kept as metadata, None for all the scalar fields
+        :type metadata_fields: Iterable[str] | None
+        """
+        self.path = path
+        self.text_field = text_field
+        self.id_field = id_field
+        self.metadata_fields = tuple(metadata_fields) if metadata_fields is not None else None
+
+    def stream(self: Self) -> Iterator[tuple[str, Document | None]]:
+        """
+        Stream the records of the dump.
+
+        :return: iterator of (record id, document) pairs, the document being None for an invalid record
+        :rtype: Iterator[tuple[str, Document | None]]
+        """
+        with mapped(self.path) as data:
+            for line_number, line in enumerate(iter(data.readline, b""), start=1):
+                if not line.strip():
+                    continue
+                # Ids stable when records are inserted or removed above, the raw line hashed for an invalid record
+                source = f"{self.path}:{content_hash(line.decode('utf-8', errors='replace').strip())[:16]}"
+                try:
+                    record = json.loads(line)
+                    if self.id_field and record.get(self.id_field) is not None:
+                        source = str(record[self.id_field])
+                    elif isinstance(record.get(self.text_field), str):
+                        source = f"{self.path}:{content_hash(record[self.text_field])[:16]}"
+                    yield source, self._to_document(source, record)
+                except (ValueError, KeyError, AttributeError) as exc:
+                    logger.error(f"Invalid record at {self.path}:{line_number}: {exc}")
+                    yield source, None
+
+    def _to_document(
+        self: Self,
+        source: str,
+        record: dict,
+    ) -> Document:
+        """
+        Convert a record into a document.
+
+        :param source: id of the record
+        :type source: str
+        :param record: record of the dump
+        :type record: dict
+        :return: document
+        :rtype: Document
+        """
+        fields = self.metadata_fields if self.metadata_fields is not None else record.keys()
+        metadata = {
+            field: record[field]
+            for field in fields
+            if field not in (self.text_field, self.id_field) and isinstance(record.get(field), (str, int, float, bool))
+        }
+        return Document(page_content=record[self.text_field], metadata={**metadata, "source": source})
+
+
+# Define functions
+@contextmanager
+def mapped(
+    path: str,
+) -> Iterator[mmap.mmap | io.BytesIO]:
+    """
+    Map a file read-only in memory.
+
+    :param path: file to map
+    :type path: str
+    :return: context holding the memory map (an empty buffer for an empty file)
+    :rtype: Iterator[mmap.mmap | io.BytesIO]
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield io.BytesIO()  # empty files cannot be mapped
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def load_file(
+    path: str,
+) -> Document:
+    """
+    Load a local HTML, Markdown, text or PDF file into a document.
+
+    :param path: file to load
+    :type path: str
+    :return: text of the file with source and title metadata
+    :rtype: Document
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        return load_pdf(path)
+    with mapped(path) as data:
+        text = data.read().decode("utf-8", errors="replace")
+    if extension in (".html", ".htm"):
+        return parse_html(path, text)
+    title = os.path.splitext(os.path.basename(path))[0]
+    if extension in (".md", ".markdown") and (heading := re.search(r"^#\s+(.+)$", text, flags=re.MULTILINE)):
+        title = heading.group(1).strip()
+    return Document(page_content=text, metadata={"source": path, "title": title})
+
+
+def load_pdf(
+    path: str,
+) -> Document:
+    """
+    Load the text of a PDF file (requires the 'pdf' extra).
+
+    :param path: PDF file
+    :type path: str
+    :return: text of the pages with source and title metadata
+    :rtype: Document
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError as exc:
+        raise ImportError("Reading PDF files requires pypdf, install the extra with `uv sync --extra pdf`.") from exc
+
+    with mapped(path) as data:
+        reader = PdfReader(data)  # the memory map is a seekable stream
+        text = "\n".join(page.extract_text() or "" for page in reader.pages)
+        title = (reader.metadata or {}).get("/Title") or os.path.splitext(os.path.basename(path))[0]
+    return Document(page_content=text, metadata={"source": path, "title": str(title)})
@@ -2,7 +2,7 @@
 
 from .generate import generation_node
 from .grade_documents import grader_node
-from .retrieve_documents import retriever_node
+from .retrieve_documents import aretriever_node, retriever_node
 from .web_search import agent_search_node
 
 # Make nodes importable from the package
@@ -11,5 +11,6 @@ __all__ = [
     "generation_node",
     "grader_node",
     "retriever_node",
+    "aretriever_node",
     "agent_search_node",
 ]
\ No newline at end of file
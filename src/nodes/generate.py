@@ -7,16 +7,29 @@ from langchain_ollama import ChatOllama
 
 from src.state import GraphState
 from src.chains.generation import generation_chain
+from src.registry import registry
 from src.utils.logging import logger
 
 warnings.filterwarnings("ignore")
 
+
 # Define contextual compressor
-llm = ChatOllama(
-    model="mistral",
-    temperature=0.0,
-)
-compressor = LLMChainExtractor.from_llm(llm)
+def build_compressor() -> LLMChainExtractor:
+    """
+    Build the LLM based contextual compressor.
+
+    :return: compressor extracting the relevant parts of the documents
+    :rtype: LLMChainExtractor
+    """
+    llm = ChatOllama(
+        model="mistral",
+        temperature=0.0,
+    )
+    return LLMChainExtractor.from_llm(llm)
+
+
+registry.register("compressor", build_compressor)
+compressor: LLMChainExtractor = registry.lazy("compressor")
 
 
 # Define the Generation node
@@ -1,28 +1,302 @@
 """Module containing the Document Grader node."""
 
 # Import packages and modules
+import math
 import warnings
+from concurrent.futures import FIRST_COMPLETED, Future, wait
 
 from langchain_core.documents import Document
 
+from src.constants import CONFIDENCE_THRESHOLD, EARLY_EXIT_GRADING, GRADING_MODE, RERANKER_GRADING
 from src.state import GraphState
-from src.chains.retrieval_grader import retrieval_grader
+from src.chains.retrieval_grader import GradeDocumentsList, listwise_retrieval_grader, retrieval_grader
+from src.utils.executors import submit
 from src.utils.logging import logger
 
 warnings.filterwarnings("ignore")
 
 
+# Define helper functions
+def grading_outcome(
+    relevant: int,
+    irrelevant: int,
+    total: int,
+) -> str | None:
+    """
+    Function telling if the outcome of decide_to_generate is determined by the verdicts so far.
+
+    :param relevant: number of documents graded as relevant
+    :type relevant: int
+    :param irrelevant: number of documents graded as not relevant
+    :type irrelevant: int
+    :param total: number of retrieved documents
+    :type total: int
+    :return: 'correct' or 'not_correct' if determined whatever the remaining verdicts, None otherwise
+    :rtype: str | None
+    """
+    if not total:
+        return "not_correct"  # no documents, a confidence score of 0
+    if round(relevant / total, 4) > CONFIDENCE_THRESHOLD:
+        return "correct"  # even if all the remaining documents are not relevant
+    if round((total - irrelevant) / total, 4) <= CONFIDENCE_THRESHOLD:
+        return "not_correct"  # even if all the remaining documents are relevant
+    return None
+
+
+def calls_to_decide(
+    relevant: int,
+    irrelevant: int,
+    total: int,
+) -> int:
+    """
+    Function computing the minimum number of additional verdicts that could determine the outcome.
+
+    :param relevant: number of documents graded as relevant
+    :type relevant: int
+    :param irrelevant: number of documents graded as not relevant
+    :type irrelevant: int
+    :param total: number of retrieved documents
+    :type total: int
+    :return: number of grader calls worth issuing
+    :rtype: int
+    """
+    remaining = total - relevant - irrelevant
+    for calls in range(1, remaining + 1):
+        if grading_outcome(relevant + calls, irrelevant, total) or grading_outcome(relevant, irrelevant + calls, total):
+            return calls
+    return remaining
+
+
+def grade(
+    question: str,
+    document: Document,
+) -> Future:
+    """
+    Function submitting the grading of a document to the bounded 'grader' thread pool.
+
+    :param question: question asked by the user
+    :type question: str
+    :param document: document to grade
+    :type document: Document
+    :return: future of the verdict of the retrieval grader
+    :rtype: Future
+    """
+    return submit(
+        "grader",
+        retrieval_grader.invoke,
+        {
+            "question": question,
+            "document": document.page_content,
+        },
+    )
+
+
+def is_relevant(
+    score: any,
+    position: int,
+    total: int,
+) -> bool:
+    """
+    Function reading (and logging) the verdict of the retrieval grader.
+
+    :param score: output of the retrieval grader
+    :type score: GradeDocuments
+    :param position: position of the document (from 1)
+    :type position: int
+    :param total: number of retrieved documents
+    :type total: int
+    :return: True if the document is relevant
+    :rtype: bool
+    """
+    if score.binary_score.lower() == "yes":
+        logger.info(f"Document {position}/{total} is relevant.")
+        return True
+    logger.info(f"Document {position}/{total} is not relevant.")
+    return False
+
+
+def grade_all(
+    question: str,
+    documents: list[Document],
+) -> dict[int, bool]:
+    """
+    Function grading all the documents concurrently.
+
+    :param question: question asked by the user
+    :type question: str
+    :param documents: retrieved documents
+    :type documents: list[Document]
+    :return: relevance of each document by position
+    :rtype: dict[int, bool]
+    """
+    futures = [grade(question, document) for document in documents]  # the node latency approaches a single call
+    return {
+        position: is_relevant(future.result(), position + 1, len(documents))
+        for position, future in enumerate(futures)
+    }
+
+
+def grade_until_decided(
+    question: str,
+    documents: list[Document],
+) -> dict[int, bool]:
+    """
+    Function grading only as many documents as needed to determine the outcome of decide_to_generate.
+
+    Only the calls that could still determine the outcome are in flight (e.g., 3 out of 5 documents
+    with a threshold of 0.5), more are issued as verdicts come back, and none once it is determined.
+
+    :param question: question asked by the user
+    :type question: str
+    :param documents: retrieved documents
+    :type documents: list[Document]
+    :return: relevance of each graded document by position
+    :rtype: dict[int, bool]
+    """
+    verdicts: dict[int, bool] = {}
+    in_flight: dict[Future, int] = {}
+    next_position = 0
+    while True:
+        relevant = sum(verdicts.values())
+        if grading_outcome(relevant, len(verdicts) - relevant, len(documents)) is not None:
+            break
+        calls = calls_to_decide(relevant, len(verdicts) - relevant, len(documents)) - len(in_flight)
+        for position in range(next_position, min(next_position + max(calls, 0), len(documents))):
+            in_flight[grade(question, documents[position])] = position
+            next_position = position + 1
+        if not in_flight:
+            break
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            position = in_flight.pop(future)
+            verdicts[position] = is_relevant(future.result(), position + 1, len(documents))
+    for future in in_flight:
+        future.cancel()  # not started yet, the ones running are left to complete
+
+    return verdicts
+
+
+def grade_listwise(
+    question: str,
+    documents: list[Document],
+) -> dict[int, bool]:
+    """
+    Function grading all the documents in a single call of the listwise retrieval grader.
+
+    If the output fails to parse, all the documents are graded one by one, and if it misses
+    some documents, the missing ones are graded one by one.
+
+    :param question: question asked by the user
+    :type question: str
+    :param documents: retrieved documents
+    :type documents: list[Document]
+    :return: relevance of each document by position
+    :rtype: dict[int, bool]
+    """
+    try:
+        grades = listwise_retrieval_grader.invoke(
+            {
+                "question": question,
+                "documents": [document.page_content for document in documents],
+            }
+        )
+    except Exception as exc:
+        logger.warning(f"Listwise grading failed ({exc}), grading the documents one by one.")
+        return grade_all(question, documents)
+    if not isinstance(grades, GradeDocumentsList):  # None when the output does not match the schema
+        logger.warning("Listwise grading output does not match the schema, grading the documents one by one.")
+        return grade_all(question, documents)
+
+    verdicts: dict[int, bool] = {}
+    for verdict in grades.verdicts:
+        position = verdict.index - 1
+        if 0 <= position < len(documents) and position not in verdicts:
+            verdicts[position] = is_relevant(verdict, verdict.index, len(documents))
+    missing = [position for position in range(len(documents)) if position not in verdicts]
+    if missing:
+        logger.warning(f"Listwise grading missed {len(missing)} documents, grading them one by one.")
+        futures = {position: grade(question, documents[position]) for position in missing}
+        verdicts.update(
+            (position, is_relevant(future.result(), position + 1, len(documents))) for position, future in futures.items()
+        )
+
+    return verdicts
+
+
+def calibrate(
+    score: float,
+) -> float:
+    """
+    Function calibrating a reranker score (sigmoid of the cross-encoder logit) into a probability of relevance.
+
+    :param score: reranker score in [0, 1]
+    :type score: float
+    :return: calibrated score, sigmoid(scale * logit + bias)
+    :rtype: float
+    """
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    logit = math.log(score / (1 - score))
+    return 1 / (1 + math.exp(-(RERANKER_GRADING.get("scale") * logit + RERANKER_GRADING.get("bias"))))
+
+
+def grade_with_reranker(
+    question: str,
+    documents: list[Document],
+) -> dict[int, bool]:
+    """
+    Function grading the documents from their calibrated reranker scores.
+
+    Only the documents in the uncertain band of scores (or without a reranker score,
+    e.g., web search results) are graded concurrently by the retrieval grader.
+
+    :param question: question asked by the user
+    :type question: str
+    :param documents: retrieved documents (with their 'relevance_score' metadata)
+    :type documents: list[Document]
+    :return: relevance of each document by position
+    :rtype: dict[int, bool]
+    """
+    verdicts: dict[int, bool] = {}
+    uncertain: list[int] = []
+    for position, document in enumerate(documents):
+        score = document.metadata.get("relevance_score")
+        if score is None:
+            uncertain.append(position)
+            continue
+        calibrated = calibrate(score)
+        if RERANKER_GRADING.get("irrelevant_below") < calibrated < RERANKER_GRADING.get("relevant_above"):
+            uncertain.append(position)
+            continue
+        verdicts[position] = calibrated >= RERANKER_GRADING.get("relevant_above")
+        logger.info(
+            f"Document {position + 1}/{len(documents)} is {'' if verdicts[position] else 'not '}relevant "
+            f"(reranker score {calibrated:.2f})."
+        )
+    if uncertain:
+        logger.info(f"Grading {len(uncertain)} documents with uncertain reranker scores with the LLM.")
+        futures = {position: grade(question, documents[position]) for position in uncertain}
+        verdicts.update(
+            (position, is_relevant(future.result(), position + 1, len(documents))) for position, future in futures.items()
+        )
+
+    return verdicts
+
+
 # Define the document grader Node
 def grader_node(state: GraphState) -> dict[str, any]:
     """
     Function defining the documents grader node.
-    It iterates over all the retrieved documents and grades them using the retrieval grader chain.
-    If the document is relevant, it is added to the filtered documents list.
-    If the document is not relevant, it is added to the filtered documents list and the web search flag is set to True.
+    It grades the retrieved documents concurrently using the retrieval grader chain
+    (bounded by the 'grader' thread pool), and keeps the relevant ones in their order.
+    With the 'listwise' GRADING_MODE, all the documents are graded in a single LLM call instead.
+    With the 'reranker' GRADING_MODE, the calibrated reranker scores grade the documents, and the LLM
+    only the ones in the uncertain band of RERANKER_GRADING.
+    With EARLY_EXIT_GRADING, it stops grading once the confidence score is known to be above
+    (or not) the CONFIDENCE_THRESHOLD, whatever the remaining verdicts, and flags the grading as truncated.
 
     :param state: state of the Graph
     :type state: GraphState
-    :return: dictionary containing the question and the documents retrieved
+    :return: dictionary containing the question, the relevant documents, the confidence score and the truncation flag
     :rtype: dict[str, any]
     """
 
@@ -33,23 +307,30 @@ def grader_node(state: GraphState) -> dict[str, any]:
         if isinstance(state.get("documents"), list)
         else [state.get("documents")]
     )
+    if not documents:
+        logger.info("No documents to grade, hence a confidence score of 0.")
+        return {
+            "question": question,
+            "documents": [],
+            "confidence_score": 0.0,
+            "grading_truncated": False,
+        }
 
-    filtered_docs: list[Document] = []  # documents that are relevant to the question
-
-    for document in documents:
-        score: str = retrieval_grader.invoke(
-            {
-                "question": question,
-                "document": document.page_content,
-            }
-        )
+    if GRADING_MODE == "listwise":
+        verdicts = grade_listwise(question, documents)
+    elif GRADING_MODE == "reranker":
+        verdicts = grade_with_reranker(question, documents)
+    elif EARLY_EXIT_GRADING:
+        verdicts = grade_until_decided(question, documents)
+    else:
+        verdicts = grade_all(question, documents)
+    filtered_docs: list[Document] = [
+        documents[position] for position in sorted(verdicts) if verdicts[position]
+    ]  # documents that are relevant to the question
+    grading_truncated = len(verdicts) < len(documents)
+    if grading_truncated:
+        logger.info(f"Graded {len(verdicts)} out of {len(documents)} documents, the remaining ones cannot change the decision.")
 
-        if score.binary_score.lower() == "yes":
-            logger.info("Document is relevant.")
-            filtered_docs.append(document)
-        elif score.binary_score.lower() == "no":
-            logger.info("Document is not relevant.")
-            continue
     confidence_score = round(len(filtered_docs) / len(documents), 4)
     logger.info(
         f"Graded {len(filtered_docs)} documents as relevant with a confidence score of {confidence_score:.2%}"
@@ -59,4 +340,5 @@ def grader_node(state: GraphState) -> dict[str, any]:
         "question": question,
         "documents": filtered_docs,
         "confidence_score": confidence_score,
+        "grading_truncated": grading_truncated,
     }
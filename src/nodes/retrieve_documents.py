@@ -36,3 +36,26 @@ def retriever_node(
         "question": state.get("question"),
         "documents": documents,
     }
+
+
+async def aretriever_node(
+    state: GraphState,
+) -> dict[str, str | list[Document] | Document]:
+    """
+    Function defining the async Retriever node (used when the Graph is run with ainvoke).
+
+    :param state: state of the Graph
+    :type state: GraphState
+    :return: dictionary containing the question and the documents retrieved
+    :rtype: dict[str, str | list[Document] | Document]
+    """
+    logger.info("Performing async retrieval...")
+
+    documents = await retriever.ainvoke(
+        state.get("question"),
+    )
+    logger.info(f"Retrieved {len(documents)} documents.")
+    return {
+        "question": state.get("question"),
+        "documents": documents,
+    }
@@ -5,15 +5,19 @@ from langchain.schema import Document
 from langchain_community.tools.tavily_search import TavilySearchResults
 from src.state import GraphState
 from src.chains.tool_agent import tool_agent_executor
+from src.registry import registry
 from src.utils.logging import logger
 import warnings
 
 warnings.filterwarnings("ignore")
 load_dotenv("local/.env")
 
-web_search_tool = TavilySearchResults(
-    max_results=3,
+registry.register(
+    "web_search_tool",
+    lambda: TavilySearchResults(max_results=3),
+    warmup=False,  # only used by the deterministic web_search_node
 )
+web_search_tool: TavilySearchResults = registry.lazy("web_search_tool")
 
 # Define Web Search Node
 def web_search_node(
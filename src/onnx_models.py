@@ -0,0 +1,231 @@
+"""
+Module containing the quantized ONNX inference backend for the embedding and reranker models.
+
+The models are exported once to ONNX, dynamically quantized to int8
+and cached on disk, then served through the same interfaces used by the
+PyTorch models (LangChain Embeddings and cross-encoders).
+
+It requires the optional dependencies: `uv sync --extra onnx`.
+"""
+
+# Import packages and modules
+
+import glob
+import os
+from typing import Any
+
+import numpy as np
+from langchain_community.cross_encoders import BaseCrossEncoder
+from langchain_core.embeddings import Embeddings
+from pydantic import BaseModel, ConfigDict
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+QUANTIZED_CROSS_ENCODER_FILE_NAME = "model_quantized.onnx"
+
+
+# Define classes
+class ONNXCrossEncoder(BaseModel, BaseCrossEncoder):
+    """Cross-encoder served by ONNX Runtime from a quantized export."""
+
+    model_path: str
+    """Directory holding the quantized ONNX model and its tokenizer."""
+    batch_size: int = 32
+    """Number of pairs scored per forward pass."""
+    max_length: int = 512
+    """Maximum number of tokens of each pair."""
+    client: Any = None
+    tokenizer: Any = None
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        extra="forbid",
+        protected_namespaces=(),
+    )
+
+    def __init__(
+        self: Self,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Load the quantized model and its tokenizer.
+
+        :param kwargs: fields of the cross-encoder
+        """
+        super().__init__(**kwargs)
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        from transformers import AutoTokenizer
+
+        self.client = ORTModelForSequenceClassification.from_pretrained(
+            self.model_path,
+            file_name=QUANTIZED_CROSS_ENCODER_FILE_NAME,
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+
+    def score(
+        self: Self,
+        text_pairs: list[tuple[str, str]],
+    ) -> list[float]:
+        """
+        Score the (query, document) pairs, as HuggingFaceCrossEncoder does (sigmoid of the logit).
+
+        :param text_pairs: pairs to score
+        :type text_pairs: list[tuple[str, str]]
+        :return: score of each pair
+        :rtype: list[float]
+        """
+        scores: list[float] = []
+        for start in range(0, len(text_pairs), self.batch_size):
+            batch = text_pairs[start : start + self.batch_size]
+            features = self.tokenizer(
+                [query for query, _ in batch],
+                [document for _, document in batch],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            logits = np.asarray(self.client(**features).logits)
+            logits = logits[:, 1] if logits.shape[1] > 1 else logits[:, 0]  # relevant class logit
+            scores.extend((1.0 / (1.0 + np.exp(-logits))).tolist())
+
+        return scores
+
+
+# Define functions
+def _export_dir(
+    model_name: str,
+    cache_dir: str,
+) -> str:
+    """
+    Directory where the export of a model is cached.
+
+    :param model_name: HuggingFace name of the model
+    :type model_name: str
+    :param cache_dir: root directory of the exports
+    :type cache_dir: str
+    :return: export directory of the model
+    :rtype: str
+    """
+    return os.path.join(cache_dir, model_name.replace("/", "--"))
+
+
+def export_quantized_embeddings(
+    model_name: str,
+    cache_dir: str,
+    quantization: str = "avx2",
+) -> tuple[str, str]:
+    """
+    Export the embedding model to a quantized ONNX model (once, then reuse the cached export).
+
+    :param model_name: HuggingFace name of the embedding model
+    :type model_name: str
+    :param cache_dir: root directory of the exports
+    :type cache_dir: str
+    :param quantization: target instruction set ('arm64', 'avx2', 'avx512' or 'avx512_vnni')
+    :type quantization: str
+    :return: export directory and relative path of the quantized ONNX file
+    :rtype: tuple[str, str]
+    """
+    export_dir = _export_dir(model_name, cache_dir)
+    # The quantized file is named model_qint8_<quantization>.onnx (model_quint8_ for avx2)
+    pattern = os.path.join(export_dir, "onnx", f"model_*int8_{quantization}.onnx")
+    if not glob.glob(pattern):
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+        logger.info(f"Exporting {model_name} to quantized ONNX in {export_dir}...")
+        model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+        model.save_pretrained(export_dir)
+        export_dynamic_quantized_onnx_model(model, quantization, export_dir)
+
+    return export_dir, os.path.relpath(glob.glob(pattern)[0], export_dir)
+
+
+def export_quantized_cross_encoder(
+    model_name: str,
+    cache_dir: str,
+    quantization: str = "avx2",
+) -> str:
+    """
+    Export the cross-encoder to a quantized ONNX model (once, then reuse the cached export).
+
+    :param model_name: HuggingFace name of the cross-encoder
+    :type model_name: str
+    :param cache_dir: root directory of the exports
+    :type cache_dir: str
+    :param quantization: target instruction set ('arm64', 'avx2', 'avx512' or 'avx512_vnni')
+    :type quantization: str
+    :return: export directory holding the quantized ONNX model
+    :rtype: str
+    """
+    export_dir = _export_dir(model_name, cache_dir)
+    if not os.path.isfile(os.path.join(export_dir, QUANTIZED_CROSS_ENCODER_FILE_NAME)):
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        logger.info(f"Exporting {model_name} to quantized ONNX in {export_dir}...")
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(export_dir)
+        quantization_config = getattr(AutoQuantizationConfig, quantization)(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(model).quantize(
+            quantization_config=quantization_config,
+            save_dir=export_dir,
+        )
+
+    return export_dir
+
+
+def build_onnx_embeddings(
+    model_name: str,
+    cache_dir: str,
+    quantization: str = "avx2",
+    **kwargs: Any,
+) -> Embeddings:
+    """
+    Build HuggingFace embeddings served by the quantized ONNX export of the model.
+
+    :param model_name: HuggingFace name of the embedding model
+    :type model_name: str
+    :param cache_dir: root directory of the exports
+    :type cache_dir: str
+    :param quantization: target instruction set ('arm64', 'avx2', 'avx512' or 'avx512_vnni')
+    :type quantization: str
+    :param kwargs: extra arguments of HuggingFaceEmbeddings (e.g., encode_kwargs)
+    :return: embedding model
+    :rtype: Embeddings
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    export_dir, file_name = export_quantized_embeddings(model_name, cache_dir, quantization)
+    return HuggingFaceEmbeddings(
+        model_name=export_dir,
+        model_kwargs={
+            "device": "cpu",
+            "backend": "onnx",
+            "model_kwargs": {"file_name": file_name},
+        },
+        **kwargs,
+    )
+
+
+def build_onnx_cross_encoder(
+    model_name: str,
+    cache_dir: str,
+    quantization: str = "avx2",
+) -> ONNXCrossEncoder:
+    """
+    Build a cross-encoder served by the quantized ONNX export of the model.
+
+    :param model_name: HuggingFace name of the cross-encoder
+    :type model_name: str
+    :param cache_dir: root directory of the exports
+    :type cache_dir: str
+    :param quantization: target instruction set ('arm64', 'avx2', 'avx512' or 'avx512_vnni')
+    :type quantization: str
+    :return: cross-encoder
+    :rtype: ONNXCrossEncoder
+    """
+    return ONNXCrossEncoder(model_path=export_quantized_cross_encoder(model_name, cache_dir, quantization))
@@ -0,0 +1,263 @@
+"""
+Module containing the registry of the heavy components (models, clients and chains).
+
+Components are registered with a factory and built lazily on first use,
+so importing the Graph does not load models nor connect to external services.
+The registry can be warmed up (optionally in a background thread) and exposes
+the readiness of each component.
+"""
+
+# Import packages and modules
+
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+# Define functions
+def _deferred(
+    method: str,
+) -> Callable[..., Any]:
+    """
+    Build a proxy method calling the method of the component, building it only when called.
+
+    Introspection (e.g., LangGraph looking for subgraphs in the nodes closures when compiling)
+    gets the proxy method without building the component.
+
+    :param method: name of the method of the component
+    :type method: str
+    :return: proxy method
+    :rtype: Callable[..., Any]
+    """
+    def call(self: "LazyComponent", *args: Any, **kwargs: Any) -> Any:
+        return getattr(self._registry.get(self._name), method)(*args, **kwargs)
+
+    call.__name__ = method
+    return call
+
+
+# Define classes
+class ComponentRegistry:
+    """Registry building components lazily and at most once."""
+
+    def __init__(self: Self) -> None:
+        """Initialize an empty registry."""
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._warmup: dict[str, bool] = {}
+        self._components: dict[str, Any] = {}
+        self._status: dict[str, str] = {}
+        self._locks: dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+        self._warmup_thread: threading.Thread | None = None
+
+    def register(
+        self: Self,
+        name: str,
+        factory: Callable[[], Any],
+        warmup: bool = True,
+    ) -> None:
+        """
+        Register the factory of a component.
+
+        :param name: name of the component
+        :type name: str
+        :param factory: function building the component
+        :type factory: Callable[[], Any]
+        :param warmup: whether the component is built during warm-up
+        :type warmup: bool
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._warmup[name] = warmup
+            self._status.setdefault(name, PENDING)
+            self._locks.setdefault(name, threading.RLock())
+
+    def get(
+        self: Self,
+        name: str,
+    ) -> Any:
+        """
+        Get a component, building it on first use.
+
+        :param name: name of the component
+        :type name: str
+        :return: built component
+        :rtype: Any
+        """
+        if name in self._components:
+            return self._components[name]
+        if name not in self._factories:
+            raise KeyError(f"Component '{name}' is not registered.")
+        with self._locks[name]:
+            if name not in self._components:  # another thread may have built it meanwhile
+                self._status[name] = LOADING
+                start = time.perf_counter()
+                try:
+                    component = self._factories[name]()
+                except Exception:
+                    self._status[name] = FAILED
+                    logger.exception(f"Failed to build component '{name}'.")
+                    raise
+                self._components[name] = component
+                self._status[name] = READY
+                logger.info(f"Built component '{name}' in {time.perf_counter() - start:.2f}s.")
+        return self._components[name]
+
+    def lazy(
+        self: Self,
+        name: str,
+    ) -> "LazyComponent":
+        """
+        Get a proxy of a component that is built on first attribute access.
+
+        :param name: name of the component
+        :type name: str
+        :return: lazy proxy of the component
+        :rtype: LazyComponent
+        """
+        return LazyComponent(name=name, registry=self)
+
+    def status(self: Self) -> dict[str, str]:
+        """
+        Get the status of each component.
+
+        :return: mapping from component name to 'pending', 'loading', 'ready' or 'failed'
+        :rtype: dict[str, str]
+        """
+        return dict(self._status)
+
+    def is_ready(
+        self: Self,
+        names: list[str] | None = None,
+    ) -> bool:
+        """
+        Check whether the components are built.
+
+        :param names: names of the components, defaults to the ones built during warm-up
+        :type names: list[str] | None
+        :return: True if all the components are built
+        :rtype: bool
+        """
+        names = names if names is not None else [name for name, warmup in self._warmup.items() if warmup]
+        return all(self._status.get(name) == READY for name in names)
+
+    def warmup(
+        self: Self,
+        names: list[str] | None = None,
+        background: bool = False,
+    ) -> threading.Thread | None:
+        """
+        Build the components ahead of their first use.
+
+        Calling it while a background warm-up is running (or once all components are built) is a no-op.
+
+        :param names: names of the components, defaults to the ones flagged for warm-up
+        :type names: list[str] | None
+        :param background: whether to build the components in a daemon thread
+        :type background: bool
+        :return: warm-up thread if running in background
+        :rtype: threading.Thread | None
+        """
+        names = names if names is not None else [name for name, warmup in self._warmup.items() if warmup]
+        if self.is_ready(names):
+            return None
+        if not background:
+            self._build_all(names)
+            return None
+        with self._lock:
+            if self._warmup_thread is None or not self._warmup_thread.is_alive():
+                self._warmup_thread = threading.Thread(
+                    target=self._build_all,
+                    args=(names,),
+                    name="registry-warmup",
+                    daemon=True,
+                )
+                self._warmup_thread.start()
+        return self._warmup_thread
+
+    def _build_all(
+        self: Self,
+        names: list[str],
+    ) -> None:
+        """
+        Build the given components, logging (and not raising) failures.
+
+        :param names: names of the components
+        :type names: list[str]
+        """
+        logger.info(f"Warming up {len(names)} components...")
+        for name in names:
+            try:
+                self.get(name)
+            except Exception:
+                continue  # already logged, the component will be retried on first use
+        logger.info("Warm-up completed.")
+
+
+class LazyComponent:
+    """Proxy forwarding attribute access to a component built on demand."""
+
+    __slots__ = ("_name", "_registry")
+
+    # Methods called by the nodes, resolved without building the component
+    invoke = _deferred("invoke")
+    ainvoke = _deferred("ainvoke")
+    batch = _deferred("batch")
+    abatch = _deferred("abatch")
+    stream = _deferred("stream")
+    astream = _deferred("astream")
+    compress_documents = _deferred("compress_documents")
+    acompress_documents = _deferred("acompress_documents")
+
+    def __init__(
+        self: Self,
+        name: str,
+        registry: ComponentRegistry,
+    ) -> None:
+        """
+        Initialize the proxy.
+
+        :param name: name of the component
+        :type name: str
+        :param registry: registry owning the component
+        :type registry: ComponentRegistry
+        """
+        self._name = name
+        self._registry = registry
+
+    def __getattr__(
+        self: Self,
+        attribute: str,
+    ) -> Any:
+        """
+        Forward the attribute access to the built component.
+
+        :param attribute: name of the attribute
+        :type attribute: str
+        :return: attribute of the component
+        :rtype: Any
+        """
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __repr__(self: Self) -> str:
+        """
+        Representation of the proxy.
+
+        :return: name and status of the component
+        :rtype: str
+        """
+        return f"LazyComponent(name={self._name!r}, status={self._registry.status().get(self._name)!r})"
+
+
+# Create a single registry that can be imported and used throughout the application
+registry = ComponentRegistry()
@@ -0,0 +1,248 @@
+"""
+Module containing the Rerankers used to rescore the retrieved documents.
+
+The main class is CachedCrossEncoderReranker that:
+* caches the cross-encoder scores of (query, chunk) pairs.
+* scores only the cache misses in a single batch.
+* sorts the pairs by length so that padding waste within each model batch is minimal.
+* records the score of each returned document in its 'relevance_score' metadata,
+  so that the grader can reuse it instead of asking the LLM again.
+
+The CascadeReranker chains a cheap first stage (the bi-encoder ranking coming
+from the vector search, or a small cross-encoder) pruning the candidates,
+with the large cross-encoder scoring only the survivors.
+"""
+
+# Import packages and modules
+
+import hashlib
+import operator
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+from langchain_community.cross_encoders import BaseCrossEncoder
+from pydantic import ConfigDict, Field, PrivateAttr
+from typing_extensions import Self
+
+from src.embeddings import normalize_text
+from src.utils.cache import LRUCache, hash_key
+from src.utils.executors import run_in_executor
+from src.utils.logging import logger
+
+
+# Define classes
+class CachedCrossEncoderReranker(BaseDocumentCompressor):
+    """Cross-encoder reranker with a pair scores cache and length-sorted batched scoring."""
+
+    model: BaseCrossEncoder
+    """Cross-encoder model used to score (query, document) pairs."""
+    model_name: str
+    """Name of the cross-encoder model (part of the cache key)."""
+    top_n: int = 3
+    """Number of documents to return."""
+    cache: LRUCache = Field(default_factory=LRUCache)
+    """Cache of the pair scores."""
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        extra="forbid",
+    )
+
+    def compress_documents(
+        self: Self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Callbacks | None = None,
+    ) -> Sequence[Document]:
+        """
+        Rerank the documents and keep the top_n ones.
+
+        :param documents: documents to rerank
+        :type documents: Sequence[Document]
+        :param query: query used to score the documents
+        :type query: str
+        :param callbacks: callbacks to run during the compression
+        :type callbacks: Callbacks | None
+        :return: top_n documents sorted by decreasing score (in their 'relevance_score' metadata)
+        :rtype: Sequence[Document]
+        """
+        scores = self.score_documents(documents, query)
+        docs_with_scores = sorted(zip(documents, scores), key=operator.itemgetter(1), reverse=True)
+
+        return [with_relevance_score(doc, score) for doc, score in docs_with_scores[: self.top_n]]
+
+    async def acompress_documents(
+        self: Self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Callbacks | None = None,
+    ) -> Sequence[Document]:
+        """
+        Rerank the documents asynchronously, running the model in the bounded inference pool.
+
+        :param documents: documents to rerank
+        :type documents: Sequence[Document]
+        :param query: query used to score the documents
+        :type query: str
+        :param callbacks: callbacks to run during the compression
+        :type callbacks: Callbacks | None
+        :return: top_n documents sorted by decreasing score
+        :rtype: Sequence[Document]
+        """
+        return await run_in_executor("inference", self.compress_documents, documents, query, callbacks)
+
+    def score_documents(
+        self: Self,
+        documents: Sequence[Document],
+        query: str,
+    ) -> list[float]:
+        """
+        Score the documents against the query, calling the model only on cache misses.
+
+        :param documents: documents to score
+        :type documents: Sequence[Document]
+        :param query: query used to score the documents
+        :type query: str
+        :return: scores of the documents (same order as the input)
+        :rtype: list[float]
+        """
+        query_hash = hash_key(normalize_text(query))
+        keys = [hash_key(self.model_name, query_hash, chunk_id(doc)) for doc in documents]
+        scores: list[Any] = [self.cache.get(key) for key in keys]
+        misses = [position for position, score in enumerate(scores) if score is None]
+        if misses:
+            # Sort by length so each model batch pads to similar lengths
+            misses.sort(key=lambda position: len(documents[position].page_content))
+            missed_scores = self.model.score([(query, documents[position].page_content) for position in misses])
+            for position, score in zip(misses, missed_scores):
+                scores[position] = float(score)
+                self.cache.set(keys[position], float(score))
+
+        return scores
+
+
+class CascadeReranker(BaseDocumentCompressor):
+    """Two-stage reranker: a cheap first stage prunes the candidates for the large cross-encoder."""
+
+    second_stage: CachedCrossEncoderReranker
+    """Large cross-encoder reranker scoring the survivors of the first stage."""
+    first_stage: CachedCrossEncoderReranker | None = None
+    """Small cross-encoder reranker, None to keep the bi-encoder (vector search) ranking."""
+    first_stage_top_n: int = 6
+    """Number of candidates surviving the first stage."""
+    top_n: int = 3
+    """Number of documents to return."""
+    _last_latencies: dict[str, float] = PrivateAttr(default_factory=dict)
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        extra="forbid",
+    )
+
+    @property
+    def last_latencies(self: Self) -> dict[str, float]:
+        """
+        Latency of each stage of the last reranking, in milliseconds.
+
+        :return: mapping from stage name to latency
+        :rtype: dict[str, float]
+        """
+        return dict(self._last_latencies)
+
+    def compress_documents(
+        self: Self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Callbacks | None = None,
+    ) -> Sequence[Document]:
+        """
+        Prune the documents with the first stage and rerank the survivors with the second one.
+
+        :param documents: documents to rerank (sorted by vector similarity)
+        :type documents: Sequence[Document]
+        :param query: query used to score the documents
+        :type query: str
+        :param callbacks: callbacks to run during the compression
+        :type callbacks: Callbacks | None
+        :return: top_n documents sorted by decreasing second stage score (in their 'relevance_score' metadata)
+        :rtype: Sequence[Document]
+        """
+        start = time.perf_counter()
+        if self.first_stage is None or len(documents) <= self.first_stage_top_n:
+            survivors = list(documents[: self.first_stage_top_n])  # retrieval order is the bi-encoder ranking
+        else:
+            scores = self.first_stage.score_documents(documents, query)
+            ranked = sorted(zip(documents, scores), key=operator.itemgetter(1), reverse=True)
+            survivors = [doc for doc, _ in ranked[: self.first_stage_top_n]]
+        first_stage_end = time.perf_counter()
+
+        scores = self.second_stage.score_documents(survivors, query)
+        reranked = sorted(zip(survivors, scores), key=operator.itemgetter(1), reverse=True)
+        second_stage_end = time.perf_counter()
+
+        self._last_latencies = {
+            "first_stage_ms": round((first_stage_end - start) * 1_000, 2),
+            "second_stage_ms": round((second_stage_end - first_stage_end) * 1_000, 2),
+        }
+        logger.info(
+            f"Cascade reranking kept {len(survivors)}/{len(documents)} candidates "
+            f"(first stage {self._last_latencies['first_stage_ms']} ms, "
+            f"second stage {self._last_latencies['second_stage_ms']} ms)."
+        )
+
+        return [with_relevance_score(doc, score) for doc, score in reranked[: self.top_n]]
+
+    async def acompress_documents(
+        self: Self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Callbacks | None = None,
+    ) -> Sequence[Document]:
+        """
+        Run the cascade asynchronously, running the models in the bounded inference pool.
+
+        :param documents: documents to rerank (sorted by vector similarity)
+        :type documents: Sequence[Document]
+        :param query: query used to score the documents
+        :type query: str
+        :param callbacks: callbacks to run during the compression
+        :type callbacks: Callbacks | None
+        :return: top_n documents sorted by decreasing second stage score
+        :rtype: Sequence[Document]
+        """
+        return await run_in_executor("inference", self.compress_documents, documents, query, callbacks)
+
+
+# Define functions
+def chunk_id(
+    document: Document,
+) -> str:
+    """
+    Identity of a chunk, either its id or a hash of its content.
+
+    :param document: chunk
+    :type document: Document
+    :return: chunk identity
+    :rtype: str
+    """
+    return document.id or document.metadata.get("id") or hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()
+
+
+def with_relevance_score(
+    document: Document,
+    score: float,
+) -> Document:
+    """
+    Copy of a document carrying its reranker score in the 'relevance_score' metadata.
+
+    :param document: reranked document (left unchanged, it may be shared with a cache)
+    :type document: Document
+    :param score: reranker score of the document
+    :type score: float
+    :return: document with the score in its metadata
+    :rtype: Document
+    """
+    return document.model_copy(update={"metadata": {**document.metadata, "relevance_score": score}})
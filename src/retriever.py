@@ -1,54 +1,167 @@
-"""Module containing the Retriever used to perform similarity search."""
+"""
+Module containing the Retriever used to perform similarity search.
 
-# Import packages and modules
+The embedding model, the Vector Store, the reranker and the retriever
+are registered in the components registry and built lazily on first use.
+"""
 
-import os
+# Import packages and modules
 
-from langchain_pinecone import PineconeVectorStore
-from pinecone import Pinecone
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.cross_encoders import BaseCrossEncoder
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
 from langchain.retrievers import ContextualCompressionRetriever
-from langchain.retrievers.document_compressors import CrossEncoderReranker
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
 from dotenv import load_dotenv
 import warnings
 from src.constants import (
+    BM25_PARAMS_PATH,
+    EMBEDDING_CACHE,
     EMBEDDING_MODEL,
-    SIMILARITY,
+    METADATA_FILTER,
+    ONNX_BACKEND,
+    RETRIEVAL_SEARCH,
+    RERANK_CASCADE,
+    RERANKER_CACHE,
     RERANKER_MODEL,
     TOP_K,
+    TOPIC_KEYWORDS,
+)
+from src.embeddings import build_hf_embeddings, CachedEmbeddings
+from src.registry import registry
+from src.reranker import (
+    CachedCrossEncoderReranker,
+    CascadeReranker,
+)
+from src.utils.cache import LRUCache
+from src.vectorstores import (
+    build_vectorstore,
+    HybridSearchRetriever,
+    load_sparse_encoder,
+    MetadataFilterRetriever,
 )
 
 warnings.filterwarnings("ignore")
 load_dotenv("local/.env")
 
-# Setup retriever
-hf_embedding_model = HuggingFaceEmbeddings(
-    model_name=EMBEDDING_MODEL,
-    model_kwargs={"device": "cpu"},
-    encode_kwargs={"normalize_embeddings": False},
-    show_progress=True,
-    multi_process=False,
-)
 
-pc = Pinecone(
-    api_key=os.getenv("PINECONE_API_KEY"),
-    ssl_verify=False,
-)
+# Define factories
+def build_embedding_model() -> Embeddings:
+    """
+    Build the cached HuggingFace embedding model (fp32 PyTorch or int8 ONNX Runtime).
 
-index = pc.Index(os.getenv("INDEX_NAME"))
+    :return: embedding model wrapped by the embeddings cache
+    :rtype: Embeddings
+    """
+    return CachedEmbeddings(
+        embedding=build_hf_embeddings(show_progress=not ONNX_BACKEND.get("enabled")),
+        model_name=EMBEDDING_MODEL,
+        **EMBEDDING_CACHE,
+    )  # avoid re-embedding repeated questions
 
-base_retriever = PineconeVectorStore(
-    index=index,
-    embedding=hf_embedding_model,  # embedding model to be used
-).as_retriever(
-    **SIMILARITY,  # SIMILARITY (plain vector search) or MMR (vector search with MMR post processor)
-)
 
-# Setup Document Compressor for reranking
-model = HuggingFaceCrossEncoder(model_name=RERANKER_MODEL)
-compressor = CrossEncoderReranker(model=model, top_n=TOP_K)
-retriever = ContextualCompressionRetriever(
-    base_compressor=compressor,
-    base_retriever=base_retriever,
-)
+def build_cross_encoder(
+    model_name: str,
+) -> BaseCrossEncoder:
+    """
+    Build a cross-encoder (fp32 PyTorch or int8 ONNX Runtime).
+
+    :param model_name: HuggingFace name of the cross-encoder
+    :type model_name: str
+    :return: cross-encoder
+    :rtype: BaseCrossEncoder
+    """
+    if ONNX_BACKEND.get("enabled"):
+        from src.onnx_models import build_onnx_cross_encoder
+
+        return build_onnx_cross_encoder(
+            model_name=model_name,
+            cache_dir=ONNX_BACKEND.get("cache_dir"),
+            quantization=ONNX_BACKEND.get("quantization"),
+        )
+    from langchain_community.cross_encoders import HuggingFaceCrossEncoder
+
+    return HuggingFaceCrossEncoder(model_name=model_name)
+
+
+def build_reranker() -> CachedCrossEncoderReranker | CascadeReranker:
+    """
+    Build the cross-encoder reranker, optionally as a two-stage cascade.
+
+    :return: reranker keeping the TOP_K documents
+    :rtype: CachedCrossEncoderReranker | CascadeReranker
+    """
+    reranker = CachedCrossEncoderReranker(
+        model=build_cross_encoder(RERANKER_MODEL),
+        model_name=RERANKER_MODEL,
+        top_n=TOP_K,
+        cache=LRUCache(**RERANKER_CACHE),
+    )  # scores only unseen (query, chunk) pairs
+    if not RERANK_CASCADE.get("enabled"):
+        return reranker
+
+    first_stage_model = RERANK_CASCADE.get("first_stage_model")
+    first_stage = (
+        CachedCrossEncoderReranker(
+            model=build_cross_encoder(first_stage_model),
+            model_name=first_stage_model,
+            cache=LRUCache(**RERANKER_CACHE),
+        )
+        if first_stage_model
+        else None
+    )
+    return CascadeReranker(
+        first_stage=first_stage,
+        second_stage=reranker,
+        first_stage_top_n=max(RERANK_CASCADE.get("first_stage_top_n"), TOP_K),
+        top_n=TOP_K,
+    )
+
+
+def build_retriever() -> BaseRetriever:
+    """
+    Build the retriever (vector search, optionally pre-filtered by topic, followed by reranking).
+
+    :return: retriever
+    :rtype: BaseRetriever
+    """
+    vectorstore: VectorStore = registry.get("vectorstore")
+    if RETRIEVAL_SEARCH.get("search_type") == "hybrid":
+        base_retriever = HybridSearchRetriever(
+            vectorstore=vectorstore,
+            sparse_encoder=registry.get("sparse_encoder"),
+            **RETRIEVAL_SEARCH.get("search_kwargs"),
+        )  # dense + BM25 sparse search
+    else:
+        base_retriever = vectorstore.as_retriever(
+            **RETRIEVAL_SEARCH,  # SIMILARITY (plain vector search) or MMR (vector search with MMR post processor)
+        )
+    if METADATA_FILTER.get("enabled"):
+        base_retriever = MetadataFilterRetriever(
+            base_retriever=base_retriever,
+            topic_keywords=TOPIC_KEYWORDS,
+            min_hits=METADATA_FILTER.get("min_hits"),
+        )  # search only the chunks of the question topics (or the caller filter)
+    return ContextualCompressionRetriever(
+        base_compressor=registry.get("reranker"),
+        base_retriever=base_retriever,
+    )
+
+
+# Register components
+registry.register("embedding_model", build_embedding_model)
+registry.register(
+    "vectorstore",
+    lambda: build_vectorstore(embedding=registry.get("embedding_model")),
+)  # Pinecone or local in-process index, depending on VECTOR_STORE_BACKEND
+registry.register(
+    "sparse_encoder",
+    lambda: load_sparse_encoder(BM25_PARAMS_PATH),
+    warmup=RETRIEVAL_SEARCH.get("search_type") == "hybrid",
+)  # BM25 encoder fitted at ingestion time
+registry.register("reranker", build_reranker)
+registry.register("retriever", build_retriever)
+
+# Setup retriever
+embedding_model: Embeddings = registry.lazy("embedding_model")
+retriever: ContextualCompressionRetriever = registry.lazy("retriever")
@@ -18,6 +18,8 @@ class GraphState(TypedDict):
     :type documents: list[str]
     :param confidence_score: confidence score of the retrieved documents
     :type confidence_score: float
+    :param grading_truncated: whether the grading stopped before grading all the documents (early exit)
+    :type grading_truncated: bool
     :pram iterations: number of generations iterations
     :type iterations: int
     """
@@ -26,4 +28,5 @@ class GraphState(TypedDict):
     generation: str
     documents: list[str]
     confidence_score: float
+    grading_truncated: bool
     iterations: int
@@ -26,6 +26,18 @@ def scenario(function_name: str) -> list[dict[str, any]]:
                 "expected_output": "no",
             },
         ]
+    elif function_name == "listwise_retrieval_grader":
+        return [
+            # Relevant and irrelevant documents graded in one call
+            {
+                "question": "agent memory",
+                "documents": [
+                    Document(page_content="Agent memory allows an agent to store information about its environment and use it to make decisions."),
+                    Document(page_content="Linear algebra is a branch of mathematics that studies vectors, matrices, and linear transformations."),
+                ],
+                "expected_output": ["yes", "no"],
+            },
+        ]
     elif function_name == "generation_chain":
         return [
             {
@@ -6,8 +6,10 @@ from dotenv import load_dotenv
 from langchain_core.documents import Document
 
 from src.chains.retrieval_grader import (
+    listwise_retrieval_grader,
     retrieval_grader,
     GradeDocuments,
+    GradeDocumentsList,
 )
 from src.chains.generation import generation_chain
 from src.retriever import retriever
@@ -35,6 +37,19 @@ def test_retrieval_grader(scenario: dict[str, str]) -> None:
     assert res.binary_score == scenario.get("expected_output")
 
 
+@pytest.mark.parametrize("scenario", scenario("listwise_retrieval_grader"))
+def test_listwise_retrieval_grader(scenario: dict[str, any]) -> None:
+    """Test the listwise retrieval grader chain."""
+    res: GradeDocumentsList = listwise_retrieval_grader.invoke(
+        {
+            "question": scenario.get("question"),
+            "documents": [document.page_content for document in scenario.get("documents")],
+        }
+    )
+    verdicts = {verdict.index: verdict.binary_score for verdict in res.verdicts}
+    assert [verdicts.get(index) for index in range(1, len(scenario.get("documents")) + 1)] == scenario.get("expected_output")
+
+
 def test_retriever() -> None:
     """Test retriever component."""
     question = "agent memory"
@@ -2,10 +2,16 @@
 
 # Import packages and modules
 
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from langchain_core.documents import Document
-from src.chains.retrieval_grader import GradeDocuments
+from src.chains.retrieval_grader import DocumentVerdict, GradeDocuments, GradeDocumentsList
 from src.chains.router import RouteQuery
 from src.chains.hallucination_grader import GradeHallucination
 from src.chains.answer_grader import GradeAnswer
@@ -37,6 +43,40 @@ def state() -> callable:
                     "question": "User input question.",
                     "documents": [Document(page_content="This is the content of a document.", metadata={})],
                 }
+            case "grader_node_empty":
+                state: GraphState = {
+                    "question": "User input question.",
+                    "documents": [],
+                }
+            case "grader_node_many":
+                state: GraphState = {
+                    "question": "User input question.",
+                    "documents": [
+                        Document(page_content=f"This is the content of a {relevance} document {number}.", metadata={})
+                        for number, relevance in enumerate(["relevant", "irrelevant", "relevant", "relevant", "irrelevant"])
+                    ],
+                }
+            case "grader_node_scored":
+                state: GraphState = {
+                    "question": "User input question.",
+                    "documents": [
+                        Document(
+                            page_content=f"This is the content of a {relevance} document {number}.",
+                            metadata={} if score is None else {"relevance_score": score},
+                        )
+                        for number, (relevance, score) in enumerate(
+                            [("relevant", 0.95), ("irrelevant", 0.05), ("relevant", 0.5), ("relevant", None), ("irrelevant", 0.6)]
+                        )
+                    ],
+                }
+            case "grader_node_all_relevant" | "grader_node_all_irrelevant":
+                state: GraphState = {
+                    "question": "User input question.",
+                    "documents": [
+                        Document(page_content=f"This is the content of a {node.split('_')[-1]} document {number}.", metadata={})
+                        for number in range(5)
+                    ],
+                }
             case "retriever_node":
                 state: GraphState = {
                     "question": "User input question.",
@@ -103,8 +143,32 @@ def mocked_chain() -> callable:
                 mocked_chain.invoke.return_value = GradeDocuments(binary_score="yes")
             case "grader_node_no":
                 mocked_chain.invoke.return_value = GradeDocuments(binary_score="no")
+            case "grader_node_slow":
+                lock = threading.Lock()
+                mocked_chain.active, mocked_chain.peak_concurrency = 0, 0
+                def _grade(inputs: dict[str, str]) -> GradeDocuments:
+                    """Grade a document after the latency of an LLM call, counting the concurrent calls."""
+                    with lock:
+                        mocked_chain.active += 1
+                        mocked_chain.peak_concurrency = max(mocked_chain.peak_concurrency, mocked_chain.active)
+                    time.sleep(0.2)
+                    with lock:
+                        mocked_chain.active -= 1
+                    return GradeDocuments(binary_score="no" if "irrelevant" in inputs["document"] else "yes")
+                mocked_chain.invoke.side_effect = _grade
+            case "listwise_grader":
+                mocked_chain.invoke.return_value = GradeDocumentsList(
+                    verdicts=[DocumentVerdict(index=index, binary_score=score) for index, score in enumerate("yes no yes yes no".split(), start=1)]
+                )
+            case "listwise_grader_partial":
+                mocked_chain.invoke.return_value = GradeDocumentsList(
+                    verdicts=[DocumentVerdict(index=index, binary_score="yes") for index in (1, 1, 3, 7)]
+                )
+            case "listwise_grader_invalid":
+                mocked_chain.invoke.return_value = None
             case "retriever_node":
                 mocked_chain.invoke.return_value = [Document(page_content="This is the content of a document.", metadata={})]
+                mocked_chain.ainvoke = AsyncMock(return_value=mocked_chain.invoke.return_value)
             case "agent_search_node":
                 mocked_chain.invoke.return_value = {
                     "output": "This is the output of the agent search.",
@@ -123,4 +187,77 @@ def mocked_chain() -> callable:
                 mocked_chain.invoke.return_value = GradeAnswer(binary_score="no")
         
         return mocked_chain
-    return _mock_chain
\ No newline at end of file
+    return _mock_chain
+
+@pytest.fixture(scope="function")
+def http_server() -> Iterator[dict[str, any]]:
+    """Fixture serving HTML pages over a local HTTP server (with ETag, flaky and missing pages, and sitemaps)."""
+    stats = {"requests": Counter(), "not_modified": 0, "active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        """Handler of the local HTTP server."""
+
+        def do_GET(self) -> None:
+            """Serve the pages, counting the requests and the concurrent ones."""
+            with lock:
+                stats["requests"][self.path] += 1
+                stats["active"] += 1
+                stats["max_active"] = max(stats["max_active"], stats["active"])
+                count = stats["requests"][self.path]
+            try:
+                time.sleep(0.05)  # latency of the request
+                if self.path == "/missing":
+                    self.send_response(404)
+                    self.end_headers()
+                elif self.path == "/flaky" and count == 1:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                elif self.path.endswith(".xml"):
+                    # Sitemap index listing a sitemap of three pages
+                    base = f"http://{self.headers.get('Host')}"
+                    if self.path == "/sitemap_index.xml":
+                        tag, locations = "sitemapindex", ["/sitemap.xml"]
+                    else:
+                        tag, locations = "urlset", ["/docs/a", "/docs/b", "/blog/c"]
+                    entry = "sitemap" if tag == "sitemapindex" else "url"
+                    body = (
+                        f'<?xml version="1.0" encoding="UTF-8"?><{tag} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                        + "".join(f"<{entry}><loc>{base}{location}</loc></{entry}>" for location in locations)
+                        + f"</{tag}>"
+                    ).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/xml")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                elif self.headers.get("If-None-Match") == '"v1"':
+                    with lock:
+                        stats["not_modified"] += 1
+                    self.send_response(304)
+                    self.end_headers()
+                else:
+                    body = (
+                        f'<html lang="en"><head><title>Page {self.path}</title></head>'
+                        f"<body><p>Content of {self.path}.</p></body></html>"
+                    ).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.send_header("ETag", '"v1"')
+                    self.end_headers()
+                    self.wfile.write(body)
+            finally:
+                with lock:
+                    stats["active"] -= 1
+
+        def log_message(self, *args: any) -> None:
+            """Silence the access logs."""
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield {"url": f"http://127.0.0.1:{server.server_address[1]}", "stats": stats}
+    server.shutdown()
+    server.server_close()
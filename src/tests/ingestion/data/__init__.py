@@ -0,0 +1,193 @@
+# Import packages and modules
+from langchain_core.documents import Document
+
+
+# Define scenarios
+def scenario(function_name: str) -> list[dict[str, any]]:
+    """
+    Function to return the scenario for the given function.
+
+    :param function_name: name of the function
+    :type function_name: str
+    :return: scenario for the given function
+    :rtype: list[dict[str, any]]
+    """
+    if function_name == "concurrent_fetcher":
+        return [
+            # Pages fetched concurrently under the per-host limit, flaky page retried, missing page skipped
+            {
+                "paths": [f"/page/{number}" for number in range(8)] + ["/flaky", "/missing"],
+                "config": {"max_workers": 8, "per_host_limit": 3, "retries": 2, "backoff": 0.0},
+                "expected_documents": 9,
+                "expected_max_active": 3,
+                "expected_stats": {"fetched": 9, "not_modified": 0, "retries": 1, "failed": 1},
+                "expected_second_run_stats": {"fetched": 0, "not_modified": 9, "retries": 0, "failed": 1},
+            },
+        ]
+    elif function_name == "incremental_ingestion":
+        return [
+            # Unchanged page skipped, changed page partially re-indexed, removed page deleted, new page added
+            {
+                "first_pages": {
+                    "a": "Agent memory.\n\nAgent planning.",
+                    "b": "Few-shot prompting.\n\nChain of thought.",
+                    "c": "Adversarial attacks.",
+                },
+                "second_pages": {
+                    "a": "Agent memory.\n\nAgent planning.",
+                    "b": "Few-shot prompting.\n\nTree of thoughts.",
+                    "d": "Linear algebra.",
+                },
+                "expected_first_upserts": 5,
+                "expected_second_upserts": 2,  # "Tree of thoughts." and "Linear algebra."
+                "expected_second_deletes": 2,  # "Chain of thought." and "Adversarial attacks."
+                "expected_contents": [
+                    "Agent memory.",
+                    "Agent planning.",
+                    "Few-shot prompting.",
+                    "Linear algebra.",
+                    "Tree of thoughts.",
+                ],
+            },
+        ]
+    elif function_name == "streaming_pipeline":
+        return [
+            # One chunk per page, interrupted at the second embedding batch, missing page skipped
+            {
+                "paths": [f"/page/{number}" for number in range(6)] + ["/missing"],
+                "config": {"chunk_batch_size": 2, "embed_batch_size": 3, "queue_size": 1, "checkpoint_interval": 1},
+                "failing_embed_call": 2,
+                "expected_stats": {"pages": 6, "skipped_pages": 0, "chunks": 6, "upserted": 6, "deleted": 0},
+                "expected_rerun_stats": {"pages": 6, "skipped_pages": 6, "chunks": 0, "upserted": 0, "deleted": 0},
+                "removed_paths": ["/page/4", "/page/5"],
+                "expected_removed_stats": {"pages": 4, "skipped_pages": 4, "chunks": 0, "upserted": 0, "deleted": 2},
+            },
+        ]
+    elif function_name == "background":
+        return [
+            # Slow consumer holds back the producer
+            {"n_items": 20, "maxsize": 2, "raise_at": None},
+            # Producer error raised in the consumer
+            {"n_items": 20, "maxsize": 2, "raise_at": 5},
+        ]
+    elif function_name == "semantic_chunk_embedder":
+        texts = [
+            "Agents plan their actions. They reflect on past steps. Memory stores what they observed. "
+            "Tools extend what agents can do. Prompting guides the model. Few-shot examples help it.",
+            "Adversarial attacks craft inputs. Jailbreaks bypass the safety rules. Defenses filter the prompts.",
+            "A single sentence.",
+        ]
+        documents = [Document(page_content=text, metadata={"source": f"doc-{i}"}) for i, text in enumerate(texts)]
+        return [
+            # Chunk vectors mean-pooled from the sentence windows
+            {
+                "documents": documents,
+                "config": {"breakpoint_threshold_type": "percentile", "breakpoint_threshold_amount": 50, "pooling": "mean"},
+                "expected_embed_calls": 1,
+            },
+            # Chunks encoded again in one batched call
+            {
+                "documents": documents,
+                "config": {"breakpoint_threshold_type": "percentile", "breakpoint_threshold_amount": 50, "pooling": "encode"},
+                "expected_embed_calls": 2,
+            },
+            # Small chunks merged, chunks encoded by default
+            {
+                "documents": documents,
+                "config": {"breakpoint_threshold_type": "percentile", "breakpoint_threshold_amount": 50, "min_chunk_size": 60},
+                "expected_embed_calls": 2,
+            },
+        ]
+    elif function_name == "process_pool_embeddings":
+        texts = [f"Sentence number {number}." for number in range(50)]
+        return [
+            # Batches spread over two worker processes
+            {"texts": texts, "workers": 2, "batch_size": 8},
+            # Single worker encodes in-process
+            {"texts": texts, "workers": 1, "batch_size": 8},
+        ]
+    elif function_name == "document_sources":
+        return [
+            # Local files and JSON Lines records ingested offline, removed file and record deleted on the rerun
+            {
+                "files": {
+                    "guide.md": "# Agent guide\nAgents plan their actions.",
+                    "notes/attacks.txt": "Adversarial attacks craft inputs.",
+                    "notes/page.html": '<html><head><title>Prompting</title></head><body><p>Few-shot prompting.</p></body></html>',
+                    "notes/empty.txt": "",
+                    "image.png": "not a document",
+                },
+                "records": [
+                    {"text": "Record without id."},
+                    "not json",
+                    {"id": "r1", "text": "Chain of thought prompting.", "author": "lilian", "tags": ["cot"]},
+                ],
+                "expected_titles": {"guide.md": "Agent guide", "notes/attacks.txt": "attacks", "notes/page.html": "Prompting"},
+                "expected_stats": {"pages": 6, "skipped_pages": 1, "chunks": 5, "upserted": 5, "deleted": 0},
+                "removed": ["notes/attacks.txt", "r1"],
+                "expected_removed_stats": {"pages": 4, "skipped_pages": 4, "chunks": 0, "upserted": 0, "deleted": 2},
+            },
+        ]
+    elif function_name == "sitemap_source":
+        return [
+            # Sitemap index expanded into the pages of its sitemap
+            {"sitemap": "/sitemap_index.xml", "include": None, "expected_paths": ["/docs/a", "/docs/b", "/blog/c"], "expected_complete": True},
+            # Pages filtered by a regular expression
+            {"sitemap": "/sitemap.xml", "include": r"/docs/", "expected_paths": ["/docs/a", "/docs/b"], "expected_complete": True},
+            # Missing sitemap skipped, the source reported incomplete
+            {"sitemap": "/missing", "include": None, "expected_paths": [], "expected_complete": False},
+        ]
+    elif function_name == "directory_source_missing":
+        return [
+            # Missing root: the indexed files kept, nothing deleted
+            {
+                "files": {"guide.md": "# Agent guide\nAgents plan their actions.", "notes/attacks.txt": "Adversarial attacks craft inputs."},
+                "expected_stats": {"pages": 0, "skipped_pages": 0, "chunks": 0, "upserted": 0, "deleted": 0},
+                "expected_kept": 2,
+            },
+        ]
+    elif function_name == "minhash_deduplicator":
+        footer = (
+            "Cited as Weng Lilian Lil Log. If you found this post useful please share it with your colleagues and subscribe "
+            "to the newsletter to receive the next posts about large language models agents prompting and adversarial attacks every month."
+        )
+        chunks = [
+            Document(page_content="Agents plan their actions and decompose a task into subgoals.", metadata={"source": "a"}, id="a-0"),
+            Document(page_content=footer, metadata={"source": "a"}, id="a-1"),
+            Document(page_content="Few-shot prompting shows examples of the task to the model.", metadata={"source": "b"}, id="b-0"),
+            Document(page_content=footer.replace("every month", "every week"), metadata={"source": "b"}, id="b-1"),
+            Document(page_content=footer, metadata={"source": "c"}, id="c-1"),
+        ]
+        return [
+            # Near-duplicate (one word changed) and exact duplicate footers dropped
+            {"chunks": chunks, "threshold": 0.85, "expected_ids": ["a-0", "a-1", "b-0"], "expected_duplicates_of": ["a-1", "a-1"]},
+            # Near-duplicate kept under a stricter threshold
+            {"chunks": chunks, "threshold": 0.99, "expected_ids": ["a-0", "a-1", "b-0", "b-1"], "expected_duplicates_of": ["a-1"]},
+        ]
+    elif function_name == "pipeline_dedup":
+        footer = (
+            "Cited as Weng Lilian Lil Log. If you found this post useful please share it with your colleagues and subscribe "
+            "to the newsletter to receive the next posts about large language models agents prompting and adversarial attacks."
+        )
+        files = {
+            f"post-{number}.txt": f"{topic}\n\n{footer}"
+            for number, topic in enumerate(["Agent memory.", "Chain of thought.", "Adversarial attacks."])
+        }
+        return [
+            # Footer repeated by every page embedded and stored once
+            {
+                "files": files,
+                "semantic": False,
+                "expected_stats": {"pages": 3, "skipped_pages": 0, "chunks": 4, "upserted": 4, "deleted": 0},
+                "expected_dropped": 2,
+                "expected_windows": 0,
+            },
+            # Semantic chunks deduplicated before being encoded (only the sentence windows are encoded to split)
+            {
+                "files": files,
+                "semantic": True,
+                "expected_stats": {"pages": 3, "skipped_pages": 0, "chunks": 4, "upserted": 4, "deleted": 0},
+                "expected_dropped": 2,
+                "expected_windows": 9,
+            },
+        ]
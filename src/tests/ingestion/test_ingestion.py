@@ -0,0 +1,505 @@
+# Import packages and modules
+
+import functools
+import json
+import os
+import time
+import zlib
+from collections import Counter
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_experimental.text_splitter import SemanticChunker
+from langchain_text_splitters import CharacterTextSplitter
+
+from src.ingestion import (
+    assign_chunk_ids,
+    background,
+    ConcurrentFetcher,
+    content_hash,
+    DirectorySource,
+    IngestionManifest,
+    JSONLSource,
+    MinHashDeduplicator,
+    plan_delta,
+    ProcessPoolEmbeddings,
+    SemanticChunkEmbedder,
+    SitemapSource,
+    StreamingIngestionPipeline,
+)
+from src.tests.ingestion.data import scenario
+from src.vectorstores import LocalVectorStore, update_sparse_encoder
+
+
+# Define test functions
+@pytest.mark.parametrize("scenario", scenario("concurrent_fetcher"))
+def test_concurrent_fetcher(
+    scenario: dict[str, any],
+    http_server: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test concurrent fetch with per-host limit, retries and ETag revalidation of the HTTP cache."""
+    urls = [f"{http_server.get('url')}{path}" for path in scenario.get("paths")]
+    fetcher = ConcurrentFetcher(cache_dir=str(tmp_path), **scenario.get("config"))
+    documents = fetcher.load(urls)
+
+    assert len(documents) == scenario.get("expected_documents")
+    assert [doc.metadata["source"] for doc in documents] == [url for url in urls if not url.endswith("/missing")]
+    assert documents[0].metadata["title"] == f"Page {scenario.get('paths')[0]}"
+    assert http_server.get("stats").get("max_active") == scenario.get("expected_max_active")
+    assert fetcher.stats == scenario.get("expected_stats")
+
+    second_fetcher = ConcurrentFetcher(cache_dir=str(tmp_path), **scenario.get("config"))
+    second_documents = second_fetcher.load(urls)
+    assert [doc.page_content for doc in second_documents] == [doc.page_content for doc in documents]
+    assert second_fetcher.stats == scenario.get("expected_second_run_stats")
+
+
+@pytest.mark.parametrize("scenario", scenario("incremental_ingestion"))
+def test_incremental_ingestion(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test the delta upserts and deletes of an incremental refresh driven by the manifest."""
+    vectorstore = LocalVectorStore(embedding=DeterministicFakeEmbedding(size=16))
+    manifest_path = str(tmp_path / "manifest.json")
+
+    def refresh(pages: dict[str, str]) -> tuple[list[Document], list[str]]:
+        manifest = IngestionManifest.load(manifest_path, index="local:test")
+        documents = [Document(page_content=text, metadata={"source": source}) for source, text in pages.items()]
+        documents = [doc for doc in documents if not manifest.is_unchanged(doc)]
+        chunks = [
+            Document(page_content=paragraph, metadata=dict(doc.metadata))
+            for doc in documents
+            for paragraph in doc.page_content.split("\n\n")
+        ]
+        to_upsert, to_delete = plan_delta(manifest, documents, assign_chunk_ids(chunks), sources=list(pages))
+        vectorstore.delete(ids=to_delete)
+        if to_upsert:
+            vectorstore.add_documents(to_upsert, ids=[chunk.id for chunk in to_upsert])
+        manifest.save(manifest_path)
+        return to_upsert, to_delete
+
+    first_upserts, first_deletes = refresh(scenario.get("first_pages"))
+    assert len(first_upserts) == scenario.get("expected_first_upserts")
+    assert first_deletes == []
+    assert refresh(scenario.get("first_pages")) == ([], [])  # nothing changed
+
+    second_upserts, second_deletes = refresh(scenario.get("second_pages"))
+    assert len(second_upserts) == scenario.get("expected_second_upserts")
+    assert len(second_deletes) == scenario.get("expected_second_deletes")
+    assert sorted(doc.page_content for doc in vectorstore.get_by_ids(vectorstore._ids)) == scenario.get("expected_contents")
+    assert IngestionManifest.load(manifest_path, index="local:other").sources == {}  # manifest of another index
+
+
+class CountingEmbedding(DeterministicFakeEmbedding):
+    """Fake embedding model counting its calls, and failing at a given call to interrupt the ingestion."""
+
+    fail_at: int = 0
+    calls: int = 0
+    embedded: int = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed the texts, raising at the failing call."""
+        self.calls += 1
+        self.embedded += len(texts)
+        if self.calls == self.fail_at:
+            raise RuntimeError("Embedding failed.")
+        return super().embed_documents(texts)
+
+
+@pytest.mark.parametrize("scenario", scenario("streaming_pipeline"))
+def test_streaming_pipeline(
+    scenario: dict[str, any],
+    http_server: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test the streaming pipeline end to end, its resume after an interruption and its incremental reruns."""
+    urls = [f"{http_server.get('url')}{path}" for path in scenario.get("paths")]
+    manifest_path = str(tmp_path / "manifest.json")
+    persist_dir = str(tmp_path / "index")
+
+    def run(urls: list[str], embedding: DeterministicFakeEmbedding) -> tuple[dict[str, int], LocalVectorStore]:
+        if LocalVectorStore.exists(persist_dir):
+            vectorstore = LocalVectorStore.load(persist_dir, embedding=embedding)
+        else:
+            vectorstore = LocalVectorStore(embedding=embedding, persist_dir=persist_dir)
+        pipeline = StreamingIngestionPipeline(
+            fetcher=ConcurrentFetcher(cache_dir=str(tmp_path / "cache"), retries=0),
+            text_splitter=CharacterTextSplitter(separator="\n", chunk_size=1, chunk_overlap=0),
+            embedding=embedding,
+            vectorstore=vectorstore,
+            manifest=IngestionManifest.load(manifest_path, index="local:test"),
+            manifest_path=manifest_path,
+            topic_keywords={},
+            **scenario.get("config"),
+        )
+        return pipeline.run(urls), vectorstore
+
+    with pytest.raises(RuntimeError):
+        run(urls, CountingEmbedding(size=16, fail_at=scenario.get("failing_embed_call")))
+    checkpointed = IngestionManifest.load(manifest_path, index="local:test").sources
+    assert 0 < len(checkpointed) < scenario.get("expected_stats").get("pages")
+
+    stats, vectorstore = run(urls, DeterministicFakeEmbedding(size=16))  # resume
+    assert stats.get("skipped_pages") == len(checkpointed)
+    assert len(vectorstore) == scenario.get("expected_stats").get("chunks")
+    assert len(IngestionManifest.load(manifest_path, index="local:test").sources) == scenario.get("expected_stats").get("pages")
+
+    assert run(urls, DeterministicFakeEmbedding(size=16))[0] == scenario.get("expected_rerun_stats")
+
+    removed_urls = [f"{http_server.get('url')}{path}" for path in scenario.get("removed_paths")]
+    stats, vectorstore = run([url for url in urls if url not in removed_urls], DeterministicFakeEmbedding(size=16))
+    assert stats == scenario.get("expected_removed_stats")
+    assert not any(doc.metadata["source"] in removed_urls for doc in vectorstore.get_by_ids(vectorstore._ids))
+
+
+@pytest.mark.parametrize("scenario", scenario("document_sources"))
+def test_document_sources(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test the offline ingestion of local files and JSON Lines records, and the removal of the deleted ones."""
+    root = tmp_path / "corpus"
+    for name, content in scenario.get("files").items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(content)
+    dump = tmp_path / "dump.jsonl"
+
+    def write_dump(records: list[dict | str]) -> None:
+        dump.write_text("\n".join(record if isinstance(record, str) else json.dumps(record) for record in records) + "\n")
+
+    def run() -> tuple[dict[str, int], LocalVectorStore]:
+        embedding = DeterministicFakeEmbedding(size=16)
+        persist_dir = str(tmp_path / "index")
+        if LocalVectorStore.exists(persist_dir):
+            vectorstore = LocalVectorStore.load(persist_dir, embedding=embedding)
+        else:
+            vectorstore = LocalVectorStore(embedding=embedding, persist_dir=persist_dir)
+        pipeline = StreamingIngestionPipeline(
+            fetcher=ConcurrentFetcher(cache_dir=str(tmp_path / "cache")),
+            text_splitter=CharacterTextSplitter(chunk_size=1000, chunk_overlap=0),
+            embedding=embedding,
+            vectorstore=vectorstore,
+            manifest=IngestionManifest.load(str(tmp_path / "manifest.json"), index="local:test"),
+            manifest_path=str(tmp_path / "manifest.json"),
+            topic_keywords={},
+        )
+        return pipeline.run([DirectorySource(str(root)), JSONLSource(str(dump))]), vectorstore
+
+    write_dump(scenario.get("records"))
+    stats, vectorstore = run()
+    assert stats == scenario.get("expected_stats")
+    chunks = {doc.metadata["source"]: doc for doc in vectorstore.get_by_ids(vectorstore._ids)}
+    for name, title in scenario.get("expected_titles").items():
+        assert chunks[str(root / name)].metadata["title"] == title
+    assert chunks["r1"].metadata["author"] == "lilian" and "tags" not in chunks["r1"].metadata
+    assert f"{dump}:{content_hash('Record without id.')[:16]}" in chunks
+
+    removed = scenario.get("removed")
+    for name in removed:
+        if (root / name).exists():
+            (root / name).unlink()
+    write_dump([record for record in scenario.get("records") if not isinstance(record, dict) or record.get("id") not in removed])
+    stats, vectorstore = run()
+    assert stats == scenario.get("expected_removed_stats")
+    sources = {doc.metadata["source"] for doc in vectorstore.get_by_ids(vectorstore._ids)}
+    assert "r1" not in sources and not any(source.endswith(removed[0]) for source in sources)
+
+
+@pytest.mark.parametrize("scenario", scenario("sitemap_source"))
+def test_sitemap_source(
+    scenario: dict[str, any],
+    http_server: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test the expansion of a sitemap (index) into its pages."""
+    source = SitemapSource(
+        f"{http_server.get('url')}{scenario.get('sitemap')}",
+        ConcurrentFetcher(cache_dir=str(tmp_path / "cache")),
+        include=scenario.get("include"),
+    )
+    expected_urls = [f"{http_server.get('url')}{path}" for path in scenario.get("expected_paths")]
+    assert list(source.urls()) == expected_urls
+    assert source.complete == scenario.get("expected_complete")
+    documents = dict(source.stream())
+    assert sorted(documents) == sorted(expected_urls)
+    assert all(documents[url].metadata["source"] == url for url in expected_urls)
+
+
+@pytest.mark.parametrize("scenario", scenario("minhash_deduplicator"))
+def test_minhash_deduplicator(
+    scenario: dict[str, any],
+) -> None:
+    """Test that near-duplicate chunks are dropped across batches and reported with the chunk they duplicate."""
+    deduplicator = MinHashDeduplicator(threshold=scenario.get("threshold"))
+    chunks = scenario.get("chunks")
+    kept = deduplicator.filter(chunks[:2]) + deduplicator.filter(chunks[2:])  # remembered across batches
+    assert [chunk.id for chunk in kept] == scenario.get("expected_ids")
+    report = deduplicator.report()
+    assert report.get("checked") == len(chunks)
+    assert report.get("dropped") == len(chunks) - len(kept)
+    assert [dropped["duplicate_of"]["id"] for dropped in report.get("dropped_chunks")] == scenario.get("expected_duplicates_of")
+    assert all(dropped["similarity"] >= scenario.get("threshold") for dropped in report.get("dropped_chunks"))
+
+
+@pytest.mark.parametrize("scenario", scenario("directory_source_missing"))
+def test_directory_source_missing(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test that a missing root directory keeps its indexed chunks instead of deleting them."""
+    root = tmp_path / "corpus"
+    for name, content in scenario.get("files").items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(content)
+
+    def run(path: str) -> tuple[dict[str, int], LocalVectorStore, DirectorySource]:
+        embedding = DeterministicFakeEmbedding(size=16)
+        persist_dir = str(tmp_path / "index")
+        if LocalVectorStore.exists(persist_dir):
+            vectorstore = LocalVectorStore.load(persist_dir, embedding=embedding)
+        else:
+            vectorstore = LocalVectorStore(embedding=embedding, persist_dir=persist_dir)
+        pipeline = StreamingIngestionPipeline(
+            fetcher=ConcurrentFetcher(),
+            text_splitter=CharacterTextSplitter(chunk_size=1000, chunk_overlap=0),
+            embedding=embedding,
+            vectorstore=vectorstore,
+            manifest=IngestionManifest.load(str(tmp_path / "manifest.json"), index="local:test"),
+            manifest_path=str(tmp_path / "manifest.json"),
+            topic_keywords={},
+        )
+        source = DirectorySource(path)
+        return pipeline.run([source]), vectorstore, source
+
+    run(str(root))
+    stats, vectorstore, source = run(str(tmp_path / "unmounted"))
+    assert stats == scenario.get("expected_stats")
+    assert not source.complete
+    assert len(vectorstore) == scenario.get("expected_kept")
+
+
+@pytest.mark.parametrize("scenario", scenario("pipeline_dedup"))
+def test_pipeline_dedup(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test that the pipeline neither embeds nor records the near-duplicate chunks, dropped before any chunk is encoded."""
+    for name, content in scenario.get("files").items():
+        (tmp_path / name).write_text(content)
+    embedding = CountingEmbedding(size=16)
+    deduplicator = MinHashDeduplicator()
+    if scenario.get("semantic"):
+        text_splitter = SemanticChunkEmbedder(embeddings=embedding, breakpoint_threshold_type="percentile", breakpoint_threshold_amount=50)
+    else:
+        text_splitter = CharacterTextSplitter(separator="\n", chunk_size=1, chunk_overlap=0)
+    pipeline = StreamingIngestionPipeline(
+        fetcher=ConcurrentFetcher(),
+        text_splitter=text_splitter,
+        embedding=embedding,
+        vectorstore=(vectorstore := LocalVectorStore(embedding=embedding, persist_dir=str(tmp_path / "index"))),
+        manifest=IngestionManifest(index="local:test"),
+        manifest_path=str(tmp_path / "manifest.json"),
+        topic_keywords={},
+        deduplicator=deduplicator,
+    )
+    assert pipeline.run([DirectorySource(str(tmp_path), patterns=["*.txt"])]) == scenario.get("expected_stats")
+    assert len(vectorstore) == embedding.embedded - scenario.get("expected_windows") == scenario.get("expected_stats").get("chunks")
+    assert deduplicator.stats.get("dropped") == scenario.get("expected_dropped")
+    recorded = [id_ for entry in pipeline.manifest.sources.values() for id_ in entry["chunk_ids"]]
+    assert sorted(recorded) == sorted(vectorstore._ids)
+
+
+@pytest.mark.parametrize("scenario", scenario("pipeline_dedup"))
+def test_pipeline_dedup_deleted(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test that the dropped near-duplicates of a deleted chunk are indexed again."""
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for name, content in scenario.get("files").items():
+        (corpus / name).write_text(content)
+    embedding = DeterministicFakeEmbedding(size=16)
+    vectorstore = LocalVectorStore(embedding=embedding, persist_dir=str(tmp_path / "index"))
+
+    def run() -> IngestionManifest:
+        pipeline = StreamingIngestionPipeline(
+            fetcher=ConcurrentFetcher(),
+            text_splitter=CharacterTextSplitter(separator="\n", chunk_size=1, chunk_overlap=0),
+            embedding=embedding,
+            vectorstore=vectorstore,
+            manifest=IngestionManifest.load(str(tmp_path / "manifest.json"), index="local:test"),
+            manifest_path=str(tmp_path / "manifest.json"),
+            topic_keywords={},
+            deduplicator=MinHashDeduplicator(),
+        )
+        pipeline.run([DirectorySource(str(corpus), patterns=["*.txt"])])
+        return pipeline.manifest
+
+    def footers() -> int:
+        return sum("Cited as" in chunk.page_content for chunk in vectorstore.get_by_ids(vectorstore._ids))
+
+    manifest = run()
+    assert footers() == 1
+    assert sum(len(entry.get("duplicate_of", {})) for entry in manifest.sources.values()) == scenario.get("expected_dropped")
+
+    name = next(name for name, entry in manifest.sources.items() if "duplicate_of" not in entry)
+    os.remove(name)  # holds the kept footer, its duplicates depend on it
+    manifest = run()
+    assert footers() == 0
+    assert all(entry["hash"] is None for entry in manifest.sources.values())  # skipped by this run, invalidated for the next
+
+    manifest = run()
+    assert footers() == 1
+    assert sorted(id_ for entry in manifest.sources.values() for id_ in entry["chunk_ids"]) == sorted(vectorstore._ids)
+
+
+class WordCountEncoder:
+    """BM25-like encoder counting lowercase words, with the statistics the pipeline fits."""
+
+    def __init__(self) -> None:
+        self.doc_freq, self.n_docs, self.avgdl = None, None, None
+
+    def _tf(self, text: str) -> tuple[list[int], list[int]]:
+        counts = Counter(zlib.crc32(word.encode()) for word in text.lower().split())
+        return list(counts), list(counts.values())
+
+    def encode_documents(self, texts: list[str]) -> list[dict]:
+        return [dict(zip(("indices", "values"), self._tf(text))) for text in texts]
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump({"n_docs": self.n_docs, "avgdl": self.avgdl}, file)
+
+
+@pytest.mark.parametrize("scenario", scenario("pipeline_dedup"))
+def test_pipeline_sparse_encoder(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test the BM25 statistics are fitted on the indexed chunks as they stream, checkpointed, and follow the deletes."""
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for name, content in scenario.get("files").items():
+        (corpus / name).write_text(content)
+    embedding = DeterministicFakeEmbedding(size=16)
+    encoder = WordCountEncoder()
+    vectorstore = LocalVectorStore(embedding=embedding, persist_dir=str(tmp_path / "index"))
+
+    def run() -> None:
+        StreamingIngestionPipeline(
+            fetcher=ConcurrentFetcher(),
+            text_splitter=CharacterTextSplitter(separator="\n", chunk_size=1, chunk_overlap=0),
+            embedding=embedding,
+            vectorstore=vectorstore,
+            manifest=IngestionManifest.load(str(tmp_path / "manifest.json"), index="local:test"),
+            manifest_path=str(tmp_path / "manifest.json"),
+            topic_keywords={},
+            sparse_encoder=encoder,
+            sparse_encoder_path=str(tmp_path / "bm25.json"),
+            deduplicator=MinHashDeduplicator(),
+            chunk_batch_size=1,
+        ).run([DirectorySource(str(corpus), patterns=["*.txt"])])
+
+    def assert_fitted_on_index() -> None:
+        chunks = vectorstore.get_by_ids(vectorstore._ids)
+        refit = WordCountEncoder()
+        update_sparse_encoder(refit, [chunk.page_content for chunk in chunks])
+        assert encoder.n_docs == refit.n_docs == len(chunks)  # chunks, not pages
+        assert encoder.avgdl == pytest.approx(refit.avgdl)
+        assert encoder.doc_freq == refit.doc_freq
+
+    run()
+    assert len(vectorstore) == scenario.get("expected_stats").get("chunks")
+    assert_fitted_on_index()
+    with open(tmp_path / "bm25.json") as file:
+        assert json.load(file) == {"n_docs": encoder.n_docs, "avgdl": encoder.avgdl}
+    assert all(vectorstore._sparse_vectors)
+
+    (corpus / sorted(scenario.get("files"))[0]).unlink()  # its chunks are deleted on the rerun
+    run()
+    assert len(vectorstore) < scenario.get("expected_stats").get("chunks")
+    assert_fitted_on_index()
+
+
+@pytest.mark.parametrize("scenario", scenario("background"))
+def test_background(
+    scenario: dict[str, any],
+) -> None:
+    """Test that a background stage is bounded by its queue and forwards its errors."""
+    produced = []
+
+    def produce():
+        for number in range(scenario.get("n_items")):
+            if number == scenario.get("raise_at"):
+                raise ValueError("Stage failed.")
+            produced.append(number)
+            yield number
+
+    consumed = []
+    if scenario.get("raise_at") is not None:
+        with pytest.raises(ValueError):
+            for item in background(produce(), maxsize=scenario.get("maxsize")):
+                consumed.append(item)
+        assert consumed == list(range(scenario.get("raise_at")))
+        return
+    for item in background(produce(), maxsize=scenario.get("maxsize")):
+        time.sleep(0.005)
+        assert len(produced) - len(consumed) <= scenario.get("maxsize") + 2  # queued items, one in hand and one pending
+        consumed.append(item)
+    assert consumed == list(range(scenario.get("n_items")))
+
+
+@pytest.mark.parametrize("scenario", scenario("semantic_chunk_embedder"))
+def test_semantic_chunk_embedder(
+    scenario: dict[str, any],
+) -> None:
+    """Test that the chunk-and-embed stage splits as SemanticChunker does, embedding in one pass."""
+    config = scenario.get("config")
+    embedding = CountingEmbedding(size=16)
+    chunker = SemanticChunkEmbedder(embeddings=embedding, **config)
+    chunks, vectors = chunker.split_and_embed(scenario.get("documents"))
+
+    reference = SemanticChunker(
+        embeddings=DeterministicFakeEmbedding(size=16),
+        **{key: value for key, value in config.items() if key != "pooling"},
+    ).split_documents(scenario.get("documents"))
+    assert [(chunk.page_content, chunk.metadata) for chunk in chunks] == [(doc.page_content, doc.metadata) for doc in reference]
+    assert embedding.calls == scenario.get("expected_embed_calls")
+    assert len(vectors) == len(chunks) and all(len(vector) == 16 for vector in vectors)
+    if config.get("pooling", "encode") == "encode":
+        assert vectors == DeterministicFakeEmbedding(size=16).embed_documents([chunk.page_content for chunk in chunks])
+
+    pipeline = StreamingIngestionPipeline(
+        fetcher=ConcurrentFetcher(),
+        text_splitter=chunker,
+        embedding=embedding,
+        vectorstore=LocalVectorStore(embedding=embedding),
+        manifest=IngestionManifest(index="local:test"),
+        manifest_path="",
+        topic_keywords={},
+    )
+    embedding.calls = 0
+    unique_chunks, chunk_vectors = pipeline.split(scenario.get("documents"))
+    if config.get("pooling") == "mean":
+        assert set(chunk_vectors) == {chunk.id for chunk in unique_chunks}  # reused by the embed stage
+    else:
+        assert chunk_vectors == {}  # chunks encoded by the embed stage, after the near-duplicates are dropped
+    assert embedding.calls == 1  # sentence windows only
+
+
+@pytest.mark.parametrize("scenario", scenario("process_pool_embeddings"))
+def test_process_pool_embeddings(
+    scenario: dict[str, any],
+) -> None:
+    """Test the embeddings computed on worker processes match the in-process ones, in order."""
+    factory = functools.partial(DeterministicFakeEmbedding, size=8)
+    with ProcessPoolEmbeddings(factory=factory, workers=scenario.get("workers"), batch_size=scenario.get("batch_size")) as embedding:
+        vectors = embedding.embed_documents(scenario.get("texts"))
+        query_vector = embedding.embed_query(scenario.get("texts")[0])
+
+    assert vectors == factory().embed_documents(scenario.get("texts"))
+    assert query_vector == factory().embed_query(scenario.get("texts")[0])
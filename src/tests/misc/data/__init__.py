@@ -20,3 +20,71 @@ def scenario(
                 "expected_output": "Agent memory is a type of memory that allows an agent to store information about its environment and use that information to make decisions. It is a type of memory that is used by artificial intelligence systems to store information about the environment and use that information to make decisions.\n\nLinear algebra is a branch of mathematics that studies vectors, matrices, and linear transformations. It is used in many areas of mathematics, including geometry, analysis, and probability. Linear algebra is also used in many applications, such as computer graphics, physics, and engineering.",
             },
         ]
+    elif function_name == "component_registry":
+        return [
+            # Foreground warm-up
+            {
+                "components": {"embedding_model": True, "web_search_tool": False},
+                "background": False,
+                "expected_status": {"embedding_model": "ready", "web_search_tool": "pending"},
+            },
+            # Background warm-up
+            {
+                "components": {"embedding_model": True, "retriever": True},
+                "background": True,
+                "expected_status": {"embedding_model": "ready", "retriever": "ready"},
+            },
+        ]
+    elif function_name == "lru_cache":
+        return [
+            # Size eviction
+            {
+                "max_size": 2,
+                "ttl": None,
+                "entries": [("a", 1), ("b", 2), ("c", 3)],
+                "lookups": ["a", "c"],
+                "expected_values": [None, 3],
+                "expected_stats": {"size": 2, "hits": 1, "misses": 1, "evictions": 1, "hit_rate": 0.5},
+            },
+            # Time-to-live eviction
+            {
+                "max_size": 2,
+                "ttl": -1.0,
+                "entries": [("a", 1)],
+                "lookups": ["a"],
+                "expected_values": [None],
+                "expected_stats": {"size": 0, "hits": 0, "misses": 1, "evictions": 1, "hit_rate": 0.0},
+            },
+        ]
+    elif function_name == "cached_chain":
+        return [
+            # Repeated inputs (documents compared by content) are graded once
+            {
+                "verdicts": {"What is agent memory?": "yes", "What is prompt injection?": "no"},
+                "inputs": [
+                    {"question": "What is agent memory?", "documents": [Document(page_content="Agent memory.")]},
+                    {"question": "What is prompt injection?", "documents": [Document(page_content="Agent memory.")]},
+                    {"question": "What is agent memory?", "documents": [Document(page_content="Agent memory.", metadata={"source": "a"})]},
+                ],
+                "expected_verdicts": ["yes", "no", "yes"],
+                "expected_calls": 2,
+            },
+        ]
+    elif function_name == "semantic_answer_cache":
+        vectors = {
+            "What is agent memory?": [1.0, 0.0, 0.0],
+            "what's the memory of an agent?": [0.99, 0.1, 0.0],
+            "What is prompt injection?": [0.0, 1.0, 0.0],
+        }
+        return [
+            # Paraphrase hits, unrelated question misses, re-ingestion invalidates
+            {
+                "vectors": vectors,
+                "threshold": 0.95,
+                "cached_question": "What is agent memory?",
+                "lookups": ["what's the memory of an agent?", "What is prompt injection?"],
+                "expected_hits": [True, False],
+                "expected_graph_calls": 2,
+                "expected_stats": {"size": 1, "hits": 1, "misses": 3, "hit_rate": 0.25, "invalidations": 1},
+            },
+        ]
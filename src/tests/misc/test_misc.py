@@ -1,6 +1,12 @@
 # Import packages and modules
 
 import pytest
+from unittest.mock import MagicMock
+from pydantic import BaseModel
+from src.answer_cache import SemanticAnswerCache, bump_kb_version
+from src.chains.cache import CachedChain
+from src.registry import ComponentRegistry
+from src.utils.cache import LRUCache, SQLiteCache
 from src.utils.misc import format_docs
 from src.tests.misc.data import scenario
 
@@ -13,3 +19,173 @@ def test_format_docs(
     """Test format_docs function."""
     output = format_docs(scenario.get("documents"))
     assert output == scenario.get("expected_output")
+
+
+@pytest.mark.parametrize("scenario", scenario("lru_cache"))
+def test_lru_cache(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test LRUCache eviction, counters and persistence."""
+    cache = LRUCache(max_size=scenario.get("max_size"), ttl=scenario.get("ttl"))
+    for key, value in scenario.get("entries"):
+        cache.set(key, value)
+    values = [cache.get(key) for key in scenario.get("lookups")]
+    assert values == scenario.get("expected_values")
+    assert cache.stats() == scenario.get("expected_stats")
+
+    cache.save(str(tmp_path / "cache.json"))
+    restored = LRUCache(max_size=scenario.get("max_size"))
+    assert restored.load(str(tmp_path / "cache.json")) == scenario.get("expected_stats").get("size")
+
+
+@pytest.mark.parametrize("scenario", scenario("lru_cache"))
+def test_sqlite_cache(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test SQLiteCache eviction, counters and persistence across connections."""
+    path = str(tmp_path / "cache.sqlite")
+    cache = SQLiteCache(path, max_size=scenario.get("max_size"), ttl=scenario.get("ttl"))
+    for key, value in scenario.get("entries"):
+        cache.set(key, value)
+    values = [cache.get(key) for key in scenario.get("lookups")]
+    assert values == scenario.get("expected_values")
+    assert cache.stats() == scenario.get("expected_stats")
+    cache.close()
+
+    restored = SQLiteCache(path, max_size=scenario.get("max_size"))
+    assert len(restored) == scenario.get("expected_stats").get("size")
+
+
+def test_sqlite_cache_shared(
+    tmp_path: str,
+) -> None:
+    """Test the running count of SQLiteCache catches up with the entries written by another connection."""
+    path = str(tmp_path / "cache.sqlite")
+    cache, other = SQLiteCache(path, max_size=4, sync_interval=2), SQLiteCache(path, max_size=100)
+    for number in range(4):
+        other.set(f"other-{number}", number)
+    cache.set("key-0", 0)
+    cache.set("key-0", 1)  # replaced, not counted twice
+    assert cache._size == 1 and len(cache) == 5
+    cache.set("key-1", 1)  # recounted, then the least recently used entries evicted
+    assert len(cache) == 4 and cache.evictions == 2
+    assert cache.get("key-1") == 1 and cache.get("other-0") is None
+
+
+@pytest.mark.parametrize("scenario", scenario("cached_chain"))
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_cached_chain(
+    scenario: dict[str, any],
+    backend: str,
+    tmp_path: str,
+) -> None:
+    """Test the grader verdicts cache hits on repeated inputs and is invalidated by a template change."""
+
+    class Verdict(BaseModel):
+        binary_score: str
+
+    chain = MagicMock()
+    chain.invoke.side_effect = lambda input, config=None: Verdict(binary_score=scenario.get("verdicts")[input["question"]])
+    cache = LRUCache() if backend == "memory" else SQLiteCache(str(tmp_path / "cache.sqlite"))
+
+    grader = CachedChain(chain, name="grader", model="model", template="v1 {question}", schema=Verdict, cache=cache)
+    verdicts = [grader.invoke(input).binary_score for input in scenario.get("inputs")]
+    assert verdicts == scenario.get("expected_verdicts")
+    assert chain.invoke.call_count == scenario.get("expected_calls")
+
+    edited = CachedChain(chain, name="grader", model="model", template="v2 {question}", schema=Verdict, cache=cache)
+    assert len(cache) == 0  # the verdicts of the previous template are deleted
+    edited.invoke(scenario.get("inputs")[0])
+    assert chain.invoke.call_count == scenario.get("expected_calls") + 1
+
+
+@pytest.mark.parametrize("scenario", scenario("component_registry"))
+def test_component_registry(
+    scenario: dict[str, any],
+) -> None:
+    """Test lazy building and warm-up of the components registry."""
+    registry = ComponentRegistry()
+    factories = {name: MagicMock(return_value=name) for name in scenario.get("components")}
+    for name, warmup in scenario.get("components").items():
+        registry.register(name, factories[name], warmup=warmup)
+    assert not registry.is_ready()
+
+    thread = registry.warmup(background=scenario.get("background"))
+    if thread is not None:
+        thread.join()
+    assert registry.status() == scenario.get("expected_status")
+    assert registry.is_ready()
+
+    lazy_component = registry.lazy("embedding_model")
+    assert lazy_component.upper() == "EMBEDDING_MODEL"
+    factories["embedding_model"].assert_called_once()
+
+
+def test_lazy_component_deferred_methods() -> None:
+    """Test the runnable methods of a lazy component are resolved without building it."""
+    registry = ComponentRegistry()
+    component = MagicMock()
+    component.invoke.return_value = "answer"
+    factory = MagicMock(return_value=component)
+    registry.register("chain", factory)
+
+    lazy_component = registry.lazy("chain")
+    invoke = lazy_component.invoke  # e.g., LangGraph inspecting the nodes closures
+    factory.assert_not_called()
+
+    assert invoke("question") == "answer"
+    factory.assert_called_once()
+    component.invoke.assert_called_once_with("question")
+
+
+@pytest.mark.parametrize("scenario", scenario("semantic_answer_cache"))
+def test_semantic_answer_cache(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test the semantic answer cache hits on paraphrases and is invalidated by re-ingestion."""
+    embedding = MagicMock()
+    embedding.embed_query.side_effect = lambda question: scenario.get("vectors")[question]
+    version_path = str(tmp_path / "kb_version.txt")
+    bump_kb_version(version_path)
+    cache = SemanticAnswerCache(embedding=embedding, threshold=scenario.get("threshold"), version_path=version_path)
+    graph = MagicMock(side_effect=lambda: {"generation": "answer"})
+
+    cache.get_or_invoke(scenario.get("cached_question"), invoke=graph)
+    hits = [cache.lookup(question) is not None for question in scenario.get("lookups")]
+    bump_kb_version(version_path)
+    cache.get_or_invoke(scenario.get("lookups")[0], invoke=graph)  # cached again on the new version
+
+    assert hits == scenario.get("expected_hits")
+    assert graph.call_count == scenario.get("expected_graph_calls")
+    stats = cache.stats()
+    stats.pop("mean_lookup_ms")
+    assert stats == scenario.get("expected_stats")
+
+
+def test_semantic_answer_cache_isolation(
+    tmp_path: str,
+) -> None:
+    """Test cached answers are copied, and answers computed across a re-ingestion are not cached."""
+    embedding = MagicMock()
+    embedding.embed_query.return_value = [1.0, 0.0]
+    version_path = str(tmp_path / "kb_version.txt")
+    bump_kb_version(version_path)
+    cache = SemanticAnswerCache(embedding=embedding, version_path=version_path)
+
+    answer = cache.get_or_invoke("What is agent memory?", invoke=lambda: {"generation": "answer", "documents": ["a"]})
+    answer["documents"].append("b")  # the caller mutates the returned state
+    cached = cache.lookup("What is agent memory?")
+    cached["generation"] = "mutated"
+    assert cache.lookup("What is agent memory?") == {"generation": "answer", "documents": ["a"]}
+
+    def reingest_while_answering() -> dict[str, any]:
+        bump_kb_version(version_path)
+        return {"generation": "stale answer"}
+
+    cache.clear()
+    assert cache.get_or_invoke("What is agent memory?", invoke=reingest_while_answering) == {"generation": "stale answer"}
+    assert len(cache) == 0
+
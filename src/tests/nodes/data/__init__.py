@@ -26,6 +26,7 @@ def scenario(function_name: str) -> dict[str, any]:
                     "question": "User input question.",
                     "documents": [Document(metadata={}, page_content="This is the content of a document.")],
                     "confidence_score": 1.0,
+                    "grading_truncated": False,
                 },
             },
             # No scenario
@@ -36,8 +37,101 @@ def scenario(function_name: str) -> dict[str, any]:
                     "question": "User input question.",
                     "documents": [],
                     "confidence_score": 0.0,
+                    "grading_truncated": False,
                 },
             },
+            # No documents scenario
+            {
+                "chain_name": "grader_node_yes",
+                "state_name": "grader_node_empty",
+                "expected_outout": {
+                    "question": "User input question.",
+                    "documents": [],
+                    "confidence_score": 0.0,
+                    "grading_truncated": False,
+                },
+            },
+        ]
+    elif function_name == "grader_node_concurrent":
+        return [
+            # Documents graded concurrently, relevant ones kept in order
+            {
+                "chain_name": "grader_node_slow",
+                "state_name": "grader_node_many",
+                "expected_sources": [0, 2, 3],
+                "expected_confidence_score": 0.6,
+                "expected_peak_concurrency": 5,  # the five grader calls in flight at once (within the 'grader' pool)
+            },
+        ]
+    elif function_name == "grader_node_early_exit":
+        return [
+            # Mixed verdicts: decided after the fourth verdict
+            {
+                "chain_name": "grader_node_slow",
+                "state_name": "grader_node_many",
+                "expected_calls": 4,
+                "expected_sources": [0, 2, 3],
+                "expected_confidence_score": 0.6,
+            },
+            # Clear-cut relevant documents: decided after the first three verdicts
+            {
+                "chain_name": "grader_node_slow",
+                "state_name": "grader_node_all_relevant",
+                "expected_calls": 3,
+                "expected_sources": [0, 1, 2],
+                "expected_confidence_score": 0.6,
+            },
+            # Clear-cut irrelevant documents: decided after the first three verdicts
+            {
+                "chain_name": "grader_node_slow",
+                "state_name": "grader_node_all_irrelevant",
+                "expected_calls": 3,
+                "expected_sources": [],
+                "expected_confidence_score": 0.0,
+            },
+        ]
+    elif function_name == "grader_node_listwise":
+        return [
+            # All the documents graded in one call
+            {
+                "listwise_chain_name": "listwise_grader",
+                "state_name": "grader_node_many",
+                "expected_pointwise_calls": 0,
+                "expected_sources": [0, 2, 3],
+            },
+            # Missing (and out of range) verdicts graded one by one
+            {
+                "listwise_chain_name": "listwise_grader_partial",
+                "state_name": "grader_node_many",
+                "expected_pointwise_calls": 3,
+                "expected_sources": [0, 2, 3],
+            },
+            # Unparsable output graded one by one
+            {
+                "listwise_chain_name": "listwise_grader_invalid",
+                "state_name": "grader_node_many",
+                "expected_pointwise_calls": 5,
+                "expected_sources": [0, 2, 3],
+            },
+        ]
+    elif function_name == "grader_node_reranker":
+        return [
+            # Only the uncertain and unscored documents are graded by the LLM
+            {
+                "reranker_grading": {"scale": 1.0, "bias": 0.0, "relevant_above": 0.8, "irrelevant_below": 0.2},
+                "state_name": "grader_node_scored",
+                "expected_llm_calls": 3,
+                "expected_sources": [0, 2, 3],
+                "expected_confidence_score": 0.6,
+            },
+            # Narrow uncertain band: the reranker scores decide more documents
+            {
+                "reranker_grading": {"scale": 1.0, "bias": 0.0, "relevant_above": 0.55, "irrelevant_below": 0.45},
+                "state_name": "grader_node_scored",
+                "expected_llm_calls": 2,
+                "expected_sources": [0, 2, 3, 4],
+                "expected_confidence_score": 0.8,
+            },
         ]
     elif function_name == "retriever_node":
         return [
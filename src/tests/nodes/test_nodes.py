@@ -1,5 +1,6 @@
 # Import packages and modules
 
+import asyncio
 import pytest
 from unittest.mock import patch, MagicMock
 from src.state import GraphState
@@ -8,6 +9,7 @@ from src.nodes import (
     generation_node,
     grader_node,
     retriever_node,
+    aretriever_node,
     agent_search_node,
 )
 from src.tests.nodes.data import scenario
@@ -41,6 +43,83 @@ def test_grader_node(
         res = grader_node(state(node=scenario.get("state_name")))
         assert res == scenario.get("expected_outout")
 
+@pytest.mark.parametrize("scenario", scenario("grader_node_concurrent"))
+def test_grader_node_concurrent(
+    state: GraphState,
+    mocked_chain: MagicMock,
+    scenario: dict[str, any],
+) -> None:
+    """Test that the grader node grades the documents concurrently and keeps their order."""
+    graph_state = state(node=scenario.get("state_name"))
+    with patch(
+        target="src.nodes.grade_documents.retrieval_grader",
+        new=mocked_chain(chain=scenario.get("chain_name")),
+    ) as retrieval_grader:
+        res = grader_node(graph_state)
+        assert retrieval_grader.peak_concurrency == scenario.get("expected_peak_concurrency")
+        assert retrieval_grader.invoke.call_count == len(graph_state["documents"])
+    assert res["documents"] == [graph_state["documents"][position] for position in scenario.get("expected_sources")]
+    assert res["confidence_score"] == scenario.get("expected_confidence_score")
+
+@pytest.mark.parametrize("scenario", scenario("grader_node_early_exit"))
+def test_grader_node_early_exit(
+    state: GraphState,
+    mocked_chain: MagicMock,
+    scenario: dict[str, any],
+) -> None:
+    """Test that the grader node stops grading once the decision to generate is determined."""
+    graph_state = state(node=scenario.get("state_name"))
+    with patch(
+        target="src.nodes.grade_documents.retrieval_grader",
+        new=mocked_chain(chain=scenario.get("chain_name")),
+    ) as retrieval_grader, patch("src.nodes.grade_documents.EARLY_EXIT_GRADING", new=True):
+        res = grader_node(graph_state)
+        assert retrieval_grader.invoke.call_count == scenario.get("expected_calls")
+    assert res["documents"] == [graph_state["documents"][position] for position in scenario.get("expected_sources")]
+    assert res["confidence_score"] == scenario.get("expected_confidence_score")
+    assert res["grading_truncated"]
+
+@pytest.mark.parametrize("scenario", scenario("grader_node_listwise"))
+def test_grader_node_listwise(
+    state: GraphState,
+    mocked_chain: MagicMock,
+    scenario: dict[str, any],
+) -> None:
+    """Test the listwise grading of the documents, and its fallback to pointwise grading."""
+    graph_state = state(node=scenario.get("state_name"))
+    with patch(
+        target="src.nodes.grade_documents.listwise_retrieval_grader",
+        new=mocked_chain(chain=scenario.get("listwise_chain_name")),
+    ) as listwise_retrieval_grader, patch(
+        target="src.nodes.grade_documents.retrieval_grader",
+        new=mocked_chain(chain="grader_node_slow"),
+    ) as retrieval_grader, patch("src.nodes.grade_documents.GRADING_MODE", new="listwise"):
+        res = grader_node(graph_state)
+        listwise_retrieval_grader.invoke.assert_called_once()
+        assert retrieval_grader.invoke.call_count == scenario.get("expected_pointwise_calls")
+    assert res["documents"] == [graph_state["documents"][position] for position in scenario.get("expected_sources")]
+    assert not res["grading_truncated"]
+
+@pytest.mark.parametrize("scenario", scenario("grader_node_reranker"))
+def test_grader_node_reranker(
+    state: GraphState,
+    mocked_chain: MagicMock,
+    scenario: dict[str, any],
+) -> None:
+    """Test the grading from the reranker scores, with the LLM grading the uncertain documents only."""
+    graph_state = state(node=scenario.get("state_name"))
+    with patch(
+        target="src.nodes.grade_documents.retrieval_grader",
+        new=mocked_chain(chain="grader_node_slow"),
+    ) as retrieval_grader, patch("src.nodes.grade_documents.GRADING_MODE", new="reranker"), patch.dict(
+        "src.nodes.grade_documents.RERANKER_GRADING", scenario.get("reranker_grading")
+    ):
+        res = grader_node(graph_state)
+        assert retrieval_grader.invoke.call_count == scenario.get("expected_llm_calls")
+    assert res["documents"] == [graph_state["documents"][position] for position in scenario.get("expected_sources")]
+    assert res["confidence_score"] == scenario.get("expected_confidence_score")
+    assert not res["grading_truncated"]
+
 @pytest.mark.parametrize("scenario", scenario("retriever_node"))
 def test_retriever_node(
     state: GraphState,
@@ -55,6 +134,21 @@ def test_retriever_node(
         res = retriever_node(state(node=scenario.get("state_name")))
         assert res == scenario.get("expected_output")
 
+@pytest.mark.parametrize("scenario", scenario("retriever_node"))
+def test_aretriever_node(
+    state: GraphState,
+    mocked_chain: MagicMock,
+    scenario: dict[str, any],
+) -> None:
+    """Test the async retriever node."""
+    with patch(
+        target="src.nodes.retrieve_documents.retriever",
+        new=mocked_chain(chain=scenario.get("chain_name")),
+    ) as retriever:
+        res = asyncio.run(aretriever_node(state(node=scenario.get("state_name"))))
+        assert res == scenario.get("expected_output")
+        retriever.invoke.assert_not_called()
+
 @pytest.mark.parametrize("scenario", scenario("agent_search_node"))
 def test_agent_search_node(
     state: GraphState,
@@ -0,0 +1,110 @@
+# Import packages and modules
+from langchain_core.documents import Document
+
+
+# Define scenarios
+def scenario(function_name: str) -> list[dict[str, any]]:
+    """
+    Function to return the scenario for the given function.
+
+    :param function_name: name of the function
+    :type function_name: str
+    :return: scenario for the given function
+    :rtype: list[dict[str, any]]
+    """
+    if function_name == "cached_embeddings":
+        return [
+            # Repeated question with different whitespaces
+            {
+                "queries": ["What is agent memory?", "  What is   agent memory? "],
+                "documents": ["What is agent memory?", "Few-shot prompting."],
+                "expected_query_calls": 1,
+                "expected_documents_batch": ["Few-shot prompting."],
+                "expected_stats": {"size": 2, "hits": 2, "misses": 2, "evictions": 0, "hit_rate": 0.5},
+            },
+        ]
+    elif function_name == "cascade_reranker":
+        documents = [Document(id=str(position), page_content="x" * (position + 1)) for position in range(6)]
+        return [
+            # Bi-encoder first stage keeps the retrieval order
+            {
+                "query": "What is agent memory?",
+                "documents": documents,
+                "first_stage": False,
+                "first_stage_top_n": 3,
+                "top_n": 2,
+                "expected_second_stage_batch_size": 3,
+                "expected_ids": ["2", "1"],
+                "expected_scores": [3.0, 2.0],  # second stage scores
+            },
+            # Small cross-encoder first stage
+            {
+                "query": "What is agent memory?",
+                "documents": documents,
+                "first_stage": True,
+                "first_stage_top_n": 3,
+                "top_n": 2,
+                "expected_second_stage_batch_size": 3,
+                "expected_ids": ["5", "4"],
+                "expected_scores": [6.0, 5.0],
+            },
+        ]
+    elif function_name == "onnx_cross_encoder":
+        return [
+            # Single logit models (e.g. bge-reranker)
+            {
+                "pairs": [("What is agent memory?", "Agent memory."), ("What is agent memory?", "Linear algebra.")],
+                "logits": [[0.0], [-2.0]],
+                "batch_size": 32,
+                "expected_batches": 1,
+                "expected_scores": [0.5, 0.11920292],
+            },
+            # Two-class models score the relevant class, pairs are scored in batches
+            {
+                "pairs": [("What is agent memory?", "Agent memory.")] * 3,
+                "logits": [[-1.0, 2.0], [-1.0, 2.0], [-1.0, 2.0]],
+                "batch_size": 2,
+                "expected_batches": 2,
+                "expected_scores": [0.88079708] * 3,
+            },
+        ]
+    elif function_name == "cached_reranker":
+        return [
+            # Second call scores only the new chunk, pairs are sorted by length
+            {
+                "query": "What is agent memory?",
+                "first_documents": [
+                    Document(id="long", page_content="Agent memory stores information about the environment over time."),
+                    Document(id="short", page_content="Linear algebra."),
+                ],
+                "second_documents": [
+                    Document(id="long", page_content="Agent memory stores information about the environment over time."),
+                    Document(id="new", page_content="Memory is short or long term."),
+                ],
+                "top_n": 1,
+                "expected_first_batch": ["Linear algebra.", "Agent memory stores information about the environment over time."],
+                "expected_second_batch": ["Memory is short or long term."],
+                "expected_top_id": "long",
+                "expected_top_score": float(len("Agent memory stores information about the environment over time.")),
+            },
+        ]
+    elif function_name == "embedding_store":
+        return [
+            # Half precision, duplicates encoded once, second batch encodes only the new text
+            {
+                "dtype": "float16",
+                "first_texts": ["Agent memory.", "Few-shot prompting.", "Agent memory."],
+                "second_texts": ["Few-shot prompting.", "Adversarial attacks."],
+                "expected_batches": [["Agent memory.", "Few-shot prompting."], ["Adversarial attacks."]],
+                "rtol": 1e-3,
+            },
+            # Full precision
+            {
+                "dtype": "float32",
+                "first_texts": ["Agent memory.", "Few-shot prompting."],
+                "second_texts": ["Agent memory."],
+                "expected_batches": [["Agent memory.", "Few-shot prompting."]],
+                "rtol": 1e-6,
+            },
+        ]
+
@@ -0,0 +1,155 @@
+# Import packages and modules
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from langchain_community.cross_encoders import BaseCrossEncoder
+
+from src.embedding_store import EmbeddingStore, StoredEmbeddings
+from src.embeddings import CachedEmbeddings
+from src.onnx_models import ONNXCrossEncoder
+from src.reranker import (
+    CachedCrossEncoderReranker,
+    CascadeReranker,
+)
+from src.tests.retriever.data import scenario
+
+
+# Define test functions
+@pytest.mark.parametrize("scenario", scenario("cached_embeddings"))
+def test_cached_embeddings(
+    scenario: dict[str, any],
+) -> None:
+    """Test the embeddings cache in front of the embedding model."""
+    embedding = MagicMock()
+    embedding.embed_query.return_value = [0.1, 0.2]
+    embedding.embed_documents.side_effect = lambda texts: [[0.3, 0.4] for _ in texts]
+    cached_embedding = CachedEmbeddings(embedding=embedding, model_name="model")
+
+    vectors = [cached_embedding.embed_query(query) for query in scenario.get("queries")]
+    cached_embedding.embed_documents(scenario.get("documents"))
+
+    assert vectors[0] == vectors[1]
+    assert embedding.embed_query.call_count == scenario.get("expected_query_calls")
+    embedding.embed_documents.assert_called_once_with(scenario.get("expected_documents_batch"))
+    assert cached_embedding.stats() == scenario.get("expected_stats")
+
+
+def test_cached_embeddings_async() -> None:
+    """Test the async query embedding counts a miss once and hits the vectors cached by the sync path."""
+    embedding = MagicMock()
+    embedding.embed_query.return_value = [0.1, 0.2]
+    cached_embedding = CachedEmbeddings(embedding=embedding, model_name="model")
+
+    vectors = [asyncio.run(cached_embedding.aembed_query("What is agent memory?")) for _ in range(2)]
+    cached_embedding.embed_query("What is agent memory?")
+
+    assert vectors == [[0.1, 0.2], [0.1, 0.2]]
+    embedding.embed_query.assert_called_once()
+    assert cached_embedding.stats() == {"size": 1, "hits": 2, "misses": 1, "evictions": 0, "hit_rate": 0.6667}
+
+
+@pytest.mark.parametrize("scenario", scenario("embedding_store"))
+def test_embedding_store(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test the embedding store encodes each content once and shares its vectors with read-only readers."""
+    def encode(texts: list[str]) -> list[list[float]]:
+        return [[len(text) / 7, -len(text) / 3, 0.5] for text in texts]
+
+    embedding = MagicMock()
+    embedding.embed_documents.side_effect = encode
+    stored_embedding = StoredEmbeddings(
+        embedding=embedding,
+        store=EmbeddingStore(root=str(tmp_path), model_name="org/model", dtype=scenario.get("dtype")),
+    )
+    reader = EmbeddingStore(root=str(tmp_path), model_name="org/model", dtype=scenario.get("dtype"), read_only=True)
+
+    first = stored_embedding.embed_documents(scenario.get("first_texts"))
+    assert reader.get(scenario.get("first_texts")) == first  # appended vectors visible to the reader
+    second = stored_embedding.embed_documents(scenario.get("second_texts"))
+
+    assert [call.args[0] for call in embedding.embed_documents.call_args_list] == scenario.get("expected_batches")
+    assert np.allclose(second, encode(scenario.get("second_texts")), rtol=scenario.get("rtol"), atol=0.0)
+    assert reader.get(scenario.get("second_texts") + ["Unknown."]) == second + [None]
+    with ThreadPoolExecutor(max_workers=8) as executor:  # concurrent refreshes read each record once
+        list(executor.map(lambda _: reader.get(["Unknown."]), range(32)))
+    assert reader._index_offset == os.path.getsize(os.path.join(reader.path, "index.bin"))
+    assert isinstance(reader._matrix, np.memmap)
+    with pytest.raises(PermissionError):
+        reader.put(["Unknown."], [[0.0, 0.0, 0.0]])
+    with pytest.raises(ValueError):
+        EmbeddingStore(root=str(tmp_path), model_name="org/model", dtype="float64" if scenario.get("dtype") == "float32" else "float32")
+
+
+@pytest.mark.parametrize("scenario", scenario("cached_reranker"))
+def test_cached_reranker(
+    scenario: dict[str, any],
+) -> None:
+    """Test the reranker scores only uncached pairs in a length-sorted batch."""
+    model = MagicMock(spec=BaseCrossEncoder)
+    model.score.side_effect = lambda pairs: [float(len(document)) for _, document in pairs]
+    reranker = CachedCrossEncoderReranker(model=model, model_name="model", top_n=scenario.get("top_n"))
+
+    first = reranker.compress_documents(scenario.get("first_documents"), scenario.get("query"))
+    second = reranker.compress_documents(scenario.get("second_documents"), scenario.get("query"))
+
+    batches = [[document for _, document in call.args[0]] for call in model.score.call_args_list]
+    assert batches == [scenario.get("expected_first_batch"), scenario.get("expected_second_batch")]
+    assert first[0].id == second[0].id == scenario.get("expected_top_id")
+    assert first[0].metadata.get("relevance_score") == scenario.get("expected_top_score")
+    assert all("relevance_score" not in document.metadata for document in scenario.get("first_documents"))
+
+
+@pytest.mark.parametrize("scenario", scenario("cascade_reranker"))
+def test_cascade_reranker(
+    scenario: dict[str, any],
+) -> None:
+    """Test the large cross-encoder only scores the first stage survivors."""
+    def _reranker() -> CachedCrossEncoderReranker:
+        model = MagicMock(spec=BaseCrossEncoder)
+        model.score.side_effect = lambda pairs: [float(len(document)) for _, document in pairs]
+        return CachedCrossEncoderReranker(model=model, model_name="model")
+
+    first_stage = _reranker() if scenario.get("first_stage") else None
+    second_stage = _reranker()
+    reranker = CascadeReranker(
+        first_stage=first_stage,
+        second_stage=second_stage,
+        first_stage_top_n=scenario.get("first_stage_top_n"),
+        top_n=scenario.get("top_n"),
+    )
+    docs = reranker.compress_documents(scenario.get("documents"), scenario.get("query"))
+
+    assert [doc.id for doc in docs] == scenario.get("expected_ids")
+    assert [doc.metadata.get("relevance_score") for doc in docs] == scenario.get("expected_scores")
+    assert len(second_stage.model.score.call_args.args[0]) == scenario.get("expected_second_stage_batch_size")
+    assert set(reranker.last_latencies) == {"first_stage_ms", "second_stage_ms"}
+
+
+@pytest.mark.parametrize("scenario", scenario("onnx_cross_encoder"))
+def test_onnx_cross_encoder(
+    scenario: dict[str, any],
+) -> None:
+    """Test the ONNX cross-encoder batches the pairs and returns the sigmoid of the relevant logit."""
+    tokenizer = MagicMock(side_effect=lambda queries, documents, **kwargs: {"n_pairs": len(queries)})
+    client = MagicMock(
+        side_effect=lambda n_pairs: MagicMock(logits=np.array(scenario.get("logits")[:n_pairs])),
+    )
+    cross_encoder = ONNXCrossEncoder.model_construct(
+        model_path="model",
+        batch_size=scenario.get("batch_size"),
+        max_length=512,
+        client=client,
+        tokenizer=tokenizer,
+    )  # skip the loading of the ONNX model
+
+    scores = cross_encoder.score(scenario.get("pairs"))
+
+    assert tokenizer.call_count == scenario.get("expected_batches")
+    assert scores == pytest.approx(scenario.get("expected_scores"))
@@ -0,0 +1,148 @@
+# Import packages and modules
+from langchain_core.documents import Document
+
+
+# Define scenarios
+def scenario(function_name: str) -> list[dict[str, any]]:
+    """
+    Function to return the scenario for the given function.
+
+    :param function_name: name of the function
+    :type function_name: str
+    :return: scenario for the given function
+    :rtype: list[dict[str, any]]
+    """
+    documents = [
+        Document(id="memory", page_content="Agent memory stores information about the environment."),
+        Document(id="prompting", page_content="Few-shot prompting gives the model examples in the prompt."),
+        Document(id="attacks", page_content="Adversarial attacks manipulate tokens to jailbreak the model."),
+        Document(id="algebra", page_content="Linear algebra studies vectors and matrices."),
+    ]
+    if function_name == "similarity_search":
+        return [
+            # Exact search
+            {
+                "documents": documents,
+                "config": {"index_type": "exact"},
+                "query": "Agent memory stores information about the environment.",
+                "k": 2,
+                "expected_first_id": "memory",
+            },
+            # Approximate search
+            {
+                "documents": documents,
+                "config": {"index_type": "ivf", "n_lists": 2, "n_probe": 2},
+                "query": "Linear algebra studies vectors and matrices.",
+                "k": 2,
+                "expected_first_id": "algebra",
+            },
+        ]
+    elif function_name == "max_marginal_relevance_search":
+        return [
+            {
+                "documents": documents,
+                "query": "Few-shot prompting gives the model examples in the prompt.",
+                "search_kwargs": {"k": 3, "fetch_k": 4, "lambda_mult": 0.6},
+                "expected_first_id": "prompting",
+            },
+        ]
+    elif function_name == "metadata_filter":
+        for document in documents:
+            document.metadata["source"] = "math" if document.id == "algebra" else "blog"
+        topic_keywords = {"memory": ["memory"], "prompting": ["prompt"], "attacks": ["attack", "jailbreak"]}
+        return [
+            # Filter inferred from the question
+            {
+                "documents": documents,
+                "topic_keywords": topic_keywords,
+                "query": "How does memory work?",
+                "filter": None,
+                "min_hits": 1,
+                "expected_topics": {"memory": "memory", "prompting": "prompting", "attacks": "attacks", "algebra": "other"},
+                "expected_ids": ["memory"],
+            },
+            # Too few filtered hits fall back to the whole index
+            {
+                "documents": documents,
+                "topic_keywords": topic_keywords,
+                "query": "How does memory work?",
+                "filter": None,
+                "min_hits": 2,
+                "expected_topics": {"memory": "memory", "prompting": "prompting", "attacks": "attacks", "algebra": "other"},
+                "expected_ids": None,  # unfiltered top-k
+            },
+            # Filter supplied by the caller
+            {
+                "documents": documents,
+                "topic_keywords": topic_keywords,
+                "query": "How does memory work?",
+                "filter": {"topic": {"$in": ["attacks", "other"]}, "source": {"$ne": "math"}},
+                "min_hits": 1,
+                "expected_topics": {"memory": "memory", "prompting": "prompting", "attacks": "attacks", "algebra": "other"},
+                "expected_ids": ["attacks"],
+            },
+        ]
+    elif function_name == "async_search":
+        queries = [
+            "Few-shot prompting gives the model examples in the prompt.",
+            "Agent memory stores information about the environment.",
+        ]
+        return [
+            # Similarity search
+            {
+                "documents": documents,
+                "queries": queries,
+                "search": {"search_type": "similarity", "search_kwargs": {"k": 2}},
+            },
+            # MMR search
+            {
+                "documents": documents,
+                "queries": queries,
+                "search": {"search_type": "mmr", "search_kwargs": {"k": 2, "fetch_k": 4, "lambda_mult": 0.6}},
+            },
+        ]
+    elif function_name == "hybrid_search":
+        sparse_vectors = [
+            {"indices": [1], "values": [1.0]},
+            {"indices": [2], "values": [1.0]},
+            {"indices": [3], "values": [1.0]},
+            {"indices": [4], "values": [1.0]},
+        ]
+        return [
+            # Pure sparse search matches the keyword
+            {
+                "documents": documents,
+                "sparse_vectors": sparse_vectors,
+                "query": "Agent memory stores information about the environment.",
+                "sparse_query": {"indices": [3], "values": [1.0]},
+                "alpha": 0.0,
+                "expected_first_id": "attacks",
+            },
+            # Pure dense search matches the semantics
+            {
+                "documents": documents,
+                "sparse_vectors": sparse_vectors,
+                "query": "Agent memory stores information about the environment.",
+                "sparse_query": {"indices": [3], "values": [1.0]},
+                "alpha": 1.0,
+                "expected_first_id": "memory",
+            },
+        ]
+    elif function_name == "maximal_marginal_relevance":
+        return [
+            # Relevance and diversity balanced
+            {"n_candidates": 50, "dimension": 16, "k": 10, "lambda_mult": 0.6},
+            # Pure relevance
+            {"n_candidates": 30, "dimension": 8, "k": 5, "lambda_mult": 1.0},
+            # More documents requested than candidates
+            {"n_candidates": 3, "dimension": 8, "k": 5, "lambda_mult": 0.5},
+        ]
+    elif function_name == "upsert_and_delete":
+        return [
+            {
+                "documents": documents,
+                "upserted": Document(id="memory", page_content="Agent memory can be short-term or long-term."),
+                "deleted_ids": ["algebra"],
+                "expected_length": 3,
+            },
+        ]
@@ -0,0 +1,201 @@
+# Import packages and modules
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+from langchain_community.vectorstores.utils import maximal_marginal_relevance as langchain_mmr
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.embeddings import CachedEmbeddings
+from src.vectorstores import (
+    add_hybrid_documents,
+    HybridSearchRetriever,
+    LocalVectorStore,
+    maximal_marginal_relevance,
+    MetadataFilterRetriever,
+    tag_chunks,
+)
+from src.tests.vectorstores.data import scenario
+from src.vectorstores import local
+
+embedding = DeterministicFakeEmbedding(size=32)
+
+
+# Define test functions
+@pytest.mark.parametrize("scenario", scenario("similarity_search"))
+def test_similarity_search(
+    scenario: dict[str, any],
+) -> None:
+    """Test exact and approximate similarity search of the local Vector Store."""
+    vectorstore = LocalVectorStore(embedding=embedding, **scenario.get("config"))
+    vectorstore.add_documents(scenario.get("documents"))
+    results = vectorstore.similarity_search_with_score(scenario.get("query"), k=scenario.get("k"))
+    assert len(results) == scenario.get("k")
+    assert results[0][0].id == scenario.get("expected_first_id")
+    assert results[0][1] >= results[1][1]
+
+
+@pytest.mark.parametrize("scenario", scenario("max_marginal_relevance_search"))
+def test_max_marginal_relevance_search(
+    scenario: dict[str, any],
+) -> None:
+    """Test MMR search of the local Vector Store via the retriever interface."""
+    vectorstore = LocalVectorStore(embedding=embedding)
+    vectorstore.add_documents(scenario.get("documents"))
+    retriever = vectorstore.as_retriever(
+        search_type="mmr",
+        search_kwargs=scenario.get("search_kwargs"),
+    )
+    docs = retriever.invoke(scenario.get("query"))
+    assert len(docs) == scenario.get("search_kwargs").get("k")
+    assert docs[0].id == scenario.get("expected_first_id")
+    assert len({doc.id for doc in docs}) == len(docs)
+
+
+@pytest.mark.parametrize("scenario", scenario("hybrid_search"))
+def test_hybrid_search(
+    scenario: dict[str, any],
+) -> None:
+    """Test the hybrid retriever over the local Vector Store."""
+    sparse_encoder = MagicMock()
+    sparse_encoder.encode_documents.return_value = scenario.get("sparse_vectors")
+    sparse_encoder.encode_queries.return_value = scenario.get("sparse_query")
+    vectorstore = LocalVectorStore(embedding=embedding)
+    add_hybrid_documents(vectorstore, scenario.get("documents"), sparse_encoder=sparse_encoder)
+
+    retriever = HybridSearchRetriever(
+        vectorstore=vectorstore,
+        sparse_encoder=sparse_encoder,
+        k=2,
+        alpha=scenario.get("alpha"),
+    )
+    docs = retriever.invoke(scenario.get("query"))
+    assert docs[0].id == scenario.get("expected_first_id")
+
+
+@pytest.mark.parametrize("scenario", scenario("maximal_marginal_relevance"))
+def test_maximal_marginal_relevance(
+    scenario: dict[str, any],
+) -> None:
+    """Test the vectorized MMR selects the same candidates as the LangChain one."""
+    rng = np.random.default_rng(0)
+    query = rng.normal(size=scenario.get("dimension")).astype(np.float32)
+    candidates = rng.normal(size=(scenario.get("n_candidates"), scenario.get("dimension"))).astype(np.float32)
+    selected = maximal_marginal_relevance(query, candidates, lambda_mult=scenario.get("lambda_mult"), k=scenario.get("k"))
+    expected = langchain_mmr(query, candidates, lambda_mult=scenario.get("lambda_mult"), k=scenario.get("k"))
+    assert selected == expected
+
+
+@pytest.mark.parametrize("scenario", scenario("upsert_and_delete"))
+def test_persistence(
+    scenario: dict[str, any],
+    tmp_path: str,
+) -> None:
+    """Test upsert, delete and persistence of the local Vector Store."""
+    vectorstore = LocalVectorStore(embedding=embedding, persist_dir=str(tmp_path))
+    vectorstore.add_documents(scenario.get("documents"))
+    vectorstore.add_documents([scenario.get("upserted")])
+    vectorstore.delete(ids=scenario.get("deleted_ids"))
+    vectorstore.persist()
+
+    loaded = LocalVectorStore.load(str(tmp_path), embedding=embedding)
+    assert len(loaded) == scenario.get("expected_length")
+    assert loaded.get_by_ids([scenario.get("upserted").id])[0].page_content == scenario.get("upserted").page_content
+    assert loaded.get_by_ids(scenario.get("deleted_ids")) == []
+
+
+@pytest.mark.parametrize("metric", ["cosine", "dotproduct"])
+def test_batch_upserts(
+    metric: str,
+) -> None:
+    """Test repeated batch upserts into the growing buffers match a single write."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    ids = [str(position) for position in range(50)]
+    single = LocalVectorStore(embedding=embedding, metric=metric)
+    single.add_embeddings(texts=ids, embeddings=vectors, ids=ids)
+    batched = LocalVectorStore(embedding=embedding, metric=metric)
+    for start in range(0, 50, 7):
+        batched.add_embeddings(texts=ids[start : start + 7], embeddings=vectors[start : start + 7], ids=ids[start : start + 7])
+
+    assert len(batched) == 50
+    assert len(batched._buffer) >= len(batched)
+    for position in range(50):
+        query = vectors[position]
+        assert batched.similarity_search_by_vector(query, k=1)[0].id == single.similarity_search_by_vector(query, k=1)[0].id
+
+    buffer, updated = batched._buffer, rng.normal(size=(3, 8)).astype(np.float32)
+    batched.add_embeddings(texts=["updated"] * 3, embeddings=updated, ids=ids[:3])  # overwritten in place
+    assert len(batched) == 50 and batched._buffer is buffer
+    assert np.allclose(batched._vectors[:3], updated) and batched._ids[:3] == ids[:3]
+    assert [doc.page_content for doc in batched.get_by_ids(ids[:3])] == ["updated"] * 3
+    assert batched.similarity_search_by_vector(updated[0], k=1)[0].id == ids[0]
+
+
+def test_ivf_concurrent_training(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test the first concurrent IVF searches train the index once."""
+    calls = []
+    kmeans = local._kmeans
+
+    def _counting_kmeans(*args: any, **kwargs: any) -> np.ndarray:
+        calls.append(1)
+        time.sleep(0.05)  # widen the window of a race between the searches
+        return kmeans(*args, **kwargs)
+
+    monkeypatch.setattr(local, "_kmeans", _counting_kmeans)
+    vectors = np.random.default_rng(0).normal(size=(64, 8)).astype(np.float32)
+    ids = [str(position) for position in range(64)]
+    vectorstore = LocalVectorStore(embedding=embedding, index_type="ivf", n_lists=4, n_probe=4)
+    vectorstore.add_embeddings(texts=ids, embeddings=vectors, ids=ids)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda query: vectorstore.similarity_search_by_vector(query, k=1)[0].id, vectors[:16]))
+
+    assert len(calls) == 1
+    assert results == ids[:16]
+
+
+@pytest.mark.parametrize("scenario", scenario("async_search"))
+def test_async_search(
+    scenario: dict[str, any],
+) -> None:
+    """Test the async search path returns the same documents as the sync one under concurrency."""
+    vectorstore = LocalVectorStore(embedding=CachedEmbeddings(embedding=embedding, model_name="model"))
+    vectorstore.add_documents(scenario.get("documents"))
+    retriever = vectorstore.as_retriever(**scenario.get("search"))
+
+    async def _run() -> list[list[any]]:
+        return await asyncio.gather(*[retriever.ainvoke(query) for query in scenario.get("queries")])
+
+    async_docs = asyncio.run(_run())
+    sync_docs = [retriever.invoke(query) for query in scenario.get("queries")]
+    assert [[doc.id for doc in docs] for docs in async_docs] == [[doc.id for doc in docs] for docs in sync_docs]
+
+
+@pytest.mark.parametrize("scenario", scenario("metadata_filter"))
+def test_metadata_filter(
+    scenario: dict[str, any],
+) -> None:
+    """Test topic tagging and the topic pre-filtered retriever with unfiltered fallback."""
+    documents = tag_chunks(scenario.get("documents"), topic_keywords=scenario.get("topic_keywords"))
+    assert {doc.id: doc.metadata["topic"] for doc in documents} == scenario.get("expected_topics")
+
+    vectorstore = LocalVectorStore(embedding=embedding)
+    vectorstore.add_documents(documents)
+    base_retriever = vectorstore.as_retriever(search_kwargs={"k": 2})
+    retriever = MetadataFilterRetriever(
+        base_retriever=base_retriever,
+        topic_keywords=scenario.get("topic_keywords"),
+        min_hits=scenario.get("min_hits"),
+    )
+    kwargs = {"filter": scenario.get("filter")} if scenario.get("filter") else {}
+    docs = retriever.invoke(scenario.get("query"), **kwargs)
+    expected_ids = scenario.get("expected_ids") or [doc.id for doc in base_retriever.invoke(scenario.get("query"))]
+    assert [doc.id for doc in docs] == expected_ids
+    assert [doc.id for doc in asyncio.run(retriever.ainvoke(scenario.get("query"), **kwargs))] == expected_ids
+
@@ -0,0 +1,445 @@
+"""
+Module containing caching utilities.
+
+The main class is LRUCache, a bounded and thread-safe
+Least Recently Used cache with optional time-to-live eviction,
+hit/miss counters and JSON persistence on disk.
+SQLiteCache offers the same interface on an SQLite database, so that
+the entries survive restarts and are shared by the processes using it.
+"""
+
+# Import packages and modules
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from typing_extensions import Self
+
+
+# Define classes
+class LRUCache:
+    """Thread-safe LRU cache with size and time-to-live eviction."""
+
+    def __init__(
+        self: Self,
+        max_size: int = 10_000,
+        ttl: float | None = None,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param max_size: maximum number of entries kept in the cache
+        :type max_size: int
+        :param ttl: time-to-live of each entry in seconds (None means no expiration)
+        :type ttl: float | None
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self: Self) -> int:
+        """
+        Number of entries in the cache.
+
+        :return: number of entries
+        :rtype: int
+        """
+        return len(self._entries)
+
+    def __contains__(self: Self, key: str) -> bool:
+        """
+        Check if a non-expired entry exists (without touching the counters).
+
+        :param key: key of the entry
+        :type key: str
+        :return: True if the entry exists
+        :rtype: bool
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_expired(entry)
+
+    def get(
+        self: Self,
+        key: str,
+        default: Any = None,
+    ) -> Any:
+        """
+        Get an entry from the cache, refreshing its recency.
+
+        :param key: key of the entry
+        :type key: str
+        :param default: value returned on a miss
+        :type default: Any
+        :return: cached value or default
+        :rtype: Any
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry):
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(
+        self: Self,
+        key: str,
+        value: Any,
+    ) -> None:
+        """
+        Set an entry in the cache, evicting the least recently used ones if full.
+
+        :param key: key of the entry
+        :type key: str
+        :param value: value to be cached
+        :type value: Any
+        """
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(
+        self: Self,
+        key: str,
+    ) -> None:
+        """
+        Delete an entry from the cache if present.
+
+        :param key: key of the entry
+        :type key: str
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_stale(
+        self: Self,
+        prefix: str,
+        keep: str,
+    ) -> int:
+        """
+        Delete the entries whose key starts with a prefix, except the ones starting with the kept prefix.
+
+        :param prefix: prefix of the keys of a namespace (e.g., 'chain:')
+        :type prefix: str
+        :param keep: prefix of the current keys of the namespace (e.g., 'chain:version:')
+        :type keep: str
+        :return: number of deleted entries
+        :rtype: int
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(prefix) and not key.startswith(keep)]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self: Self) -> None:
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def stats(self: Self) -> dict[str, float]:
+        """
+        Get the cache statistics.
+
+        :return: size, hits, misses, evictions and hit rate of the cache
+        :rtype: dict[str, float]
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def save(
+        self: Self,
+        path: str,
+    ) -> None:
+        """
+        Persist the non-expired entries to a JSON file (values must be JSON serializable).
+
+        :param path: path of the JSON file
+        :type path: str
+        """
+        with self._lock:
+            entries = [[key, value, expires_at] for key, (value, expires_at) in self._entries.items() if not self._is_expired((value, expires_at))]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(tmp_path, path)  # atomic swap to never leave a truncated file
+
+    def load(
+        self: Self,
+        path: str,
+    ) -> int:
+        """
+        Load entries persisted in a JSON file, skipping the expired ones.
+
+        :param path: path of the JSON file
+        :type path: str
+        :return: number of loaded entries
+        :rtype: int
+        """
+        if not os.path.isfile(path):
+            return 0
+        with open(path) as cache_file:
+            entries = json.load(cache_file)
+        with self._lock:
+            for key, value, expires_at in entries:
+                if not self._is_expired((value, expires_at)):
+                    self._entries[key] = (value, expires_at)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return len(self._entries)
+
+    @staticmethod
+    def _is_expired(
+        entry: tuple[Any, float | None],
+    ) -> bool:
+        """
+        Check if an entry is expired.
+
+        :param entry: cached value and its expiration timestamp
+        :type entry: tuple[Any, float | None]
+        :return: True if the entry is expired
+        :rtype: bool
+        """
+        return entry[1] is not None and entry[1] < time.time()
+
+
+class SQLiteCache:
+    """Persistent LRU cache stored in SQLite, with size and time-to-live eviction (values must be JSON serializable)."""
+
+    def __init__(
+        self: Self,
+        path: str,
+        max_size: int = 100_000,
+        ttl: float | None = None,
+        sync_interval: int = 1_000,
+    ) -> None:
+        """
+        Initialize the cache, creating the database if missing.
+
+        The number of entries is kept as a running count, recounted every sync_interval inserts
+        to account for the entries written by other processes (so that a write does not scan the table).
+
+        :param path: path of the SQLite database
+        :type path: str
+        :param max_size: maximum number of entries kept in the cache
+        :type max_size: int
+        :param ttl: time-to-live of each entry in seconds (None means no expiration)
+        :type ttl: float | None
+        :param sync_interval: number of inserts between two counts of the entries
+        :type sync_interval: int
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")  # readers do not block the writer of another process
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires_at REAL, accessed_at REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._lock = threading.Lock()
+        self._size = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]  # running count
+        self._inserts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self: Self) -> int:
+        """
+        Number of entries in the cache.
+
+        :return: number of entries
+        :rtype: int
+        """
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __contains__(self: Self, key: str) -> bool:
+        """
+        Check if a non-expired entry exists (without touching the counters).
+
+        :param key: key of the entry
+        :type key: str
+        :return: True if the entry exists
+        :rtype: bool
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            return row is not None and (row[0] is None or row[0] >= time.time())
+
+    def get(
+        self: Self,
+        key: str,
+        default: Any = None,
+    ) -> Any:
+        """
+        Get an entry from the cache, refreshing its recency.
+
+        :param key: key of the entry
+        :type key: str
+        :param default: value returned on a miss
+        :type default: Any
+        :return: cached value or default
+        :rtype: Any
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                if row is not None:
+                    self._size -= self._connection.execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount
+                    self.evictions += 1
+                self.misses += 1
+                return default
+            self._connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(
+        self: Self,
+        key: str,
+        value: Any,
+    ) -> None:
+        """
+        Set an entry in the cache, evicting the least recently used ones if full.
+
+        :param key: key of the entry
+        :type key: str
+        :param value: value to be cached
+        :type value: Any
+        """
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        with self._lock:
+            exists = self._connection.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            if not exists:
+                self._size += 1
+                self._inserts += 1
+                if self._inserts % self.sync_interval == 0:
+                    self._size = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            excess = self._size - self.max_size
+            if excess > 0:
+                evicted = self._connection.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                    (excess,),
+                ).rowcount
+                self._size -= evicted
+                self.evictions += evicted
+
+    def delete(
+        self: Self,
+        key: str,
+    ) -> None:
+        """
+        Delete an entry from the cache if present.
+
+        :param key: key of the entry
+        :type key: str
+        """
+        with self._lock:
+            self._size -= self._connection.execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount
+
+    def delete_stale(
+        self: Self,
+        prefix: str,
+        keep: str,
+    ) -> int:
+        """
+        Delete the entries whose key starts with a prefix, except the ones starting with the kept prefix.
+
+        :param prefix: prefix of the keys of a namespace (e.g., 'chain:')
+        :type prefix: str
+        :param keep: prefix of the current keys of the namespace (e.g., 'chain:version:')
+        :type keep: str
+        :return: number of deleted entries
+        :rtype: int
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM entries WHERE substr(key, 1, ?) = ? AND substr(key, 1, ?) != ?",
+                (len(prefix), prefix, len(keep), keep),
+            )
+            self._size -= cursor.rowcount
+            return cursor.rowcount
+
+    def clear(self: Self) -> None:
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            self._connection.execute("DELETE FROM entries")
+            self._size, self.hits, self.misses, self.evictions = 0, 0, 0, 0
+
+    def stats(self: Self) -> dict[str, float]:
+        """
+        Get the cache statistics (counters of this process).
+
+        :return: size, hits, misses, evictions and hit rate of the cache
+        :rtype: dict[str, float]
+        """
+        size = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self: Self) -> None:
+        """Close the connection to the database."""
+        with self._lock:
+            self._connection.close()
+
+
+# Define functions
+def hash_key(
+    *parts: str,
+) -> str:
+    """
+    Build a cache key hashing the given parts.
+
+    :param parts: strings identifying the entry
+    :type parts: str
+    :return: hex digest of the parts
+    :rtype: str
+    """
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
@@ -0,0 +1,98 @@
+"""
+Module containing the bounded thread pools used by the async path and the concurrent nodes.
+
+Blocking work (model inference, Vector Store queries) awaited by async code
+is offloaded to named pools with a fixed number of threads, instead of
+the unbounded default executor of the event loop, so that concurrent Graph
+runs overlap their I/O without oversubscribing the CPU with model threads.
+Nodes fanning out LLM calls (e.g., the document grader) submit them to a
+named pool as well, which caps the requests in flight across Graph runs.
+"""
+
+# Import packages and modules
+
+import asyncio
+import contextvars
+import functools
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from src.constants import ASYNC_EXECUTORS
+
+T = TypeVar("T")
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+# Define functions
+def get_executor(
+    name: str,
+) -> ThreadPoolExecutor:
+    """
+    Get (creating it on first use) the bounded thread pool with the given name.
+
+    :param name: name of the pool, a key of ASYNC_EXECUTORS
+    :type name: str
+    :return: thread pool
+    :rtype: ThreadPoolExecutor
+    """
+    if name not in _executors:
+        if name not in ASYNC_EXECUTORS:
+            raise KeyError(f"Unknown executor '{name}', use one of {list(ASYNC_EXECUTORS)}.")
+        with _lock:
+            if name not in _executors:
+                _executors[name] = ThreadPoolExecutor(
+                    max_workers=ASYNC_EXECUTORS[name],
+                    thread_name_prefix=f"{name}-executor",
+                )
+    return _executors[name]
+
+
+async def run_in_executor(
+    name: str,
+    func: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    """
+    Run a blocking function in a bounded thread pool, propagating the context (e.g., LangChain callbacks).
+
+    :param name: name of the pool, a key of ASYNC_EXECUTORS
+    :type name: str
+    :param func: blocking function
+    :type func: Callable[..., T]
+    :param args: positional arguments of the function
+    :param kwargs: keyword arguments of the function
+    :return: output of the function
+    :rtype: T
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(name),
+        functools.partial(context.run, func, *args, **kwargs),
+    )
+
+
+def submit(
+    name: str,
+    func: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> Future[T]:
+    """
+    Submit a blocking function to a bounded thread pool, propagating the context (e.g., LangChain callbacks).
+
+    :param name: name of the pool, a key of ASYNC_EXECUTORS
+    :type name: str
+    :param func: blocking function
+    :type func: Callable[..., T]
+    :param args: positional arguments of the function
+    :param kwargs: keyword arguments of the function
+    :return: future of the output of the function
+    :rtype: Future[T]
+    """
+    context = contextvars.copy_context()
+    return get_executor(name).submit(context.run, func, *args, **kwargs)
@@ -0,0 +1,55 @@
+"""
+Package dedicated to the Vector Store backends.
+
+The main modules are:
+* async_search: async search path using the bounded thread pools.
+* local: in-process NumPy Vector Store with exact and IVF approximate search.
+* factory: builder of the configured Vector Store backend (Pinecone or local).
+* filtering: topic tagging of the chunks and topic-aware metadata pre-filtering.
+* hybrid: dense + BM25 sparse hybrid retrieval over either backend.
+* mmr: vectorized Maximal Marginal Relevance selector.
+* pinecone_store: Pinecone Vector Store using the vectorized MMR selector.
+"""
+
+from .factory import build_vectorstore, get_backend
+from .filtering import (
+    infer_filter,
+    MetadataFilterRetriever,
+    tag_chunks,
+)
+from .hybrid import (
+    add_hybrid_documents,
+    build_sparse_encoder,
+    fit_sparse_encoder,
+    HybridSearchRetriever,
+    load_sparse_encoder,
+    remove_from_sparse_encoder,
+    save_sparse_encoder,
+    update_sparse_encoder,
+    upsert_embeddings,
+)
+from .local import LocalVectorStore
+from .mmr import maximal_marginal_relevance
+from .pinecone_store import PineconeMMRVectorStore
+
+# Make Vector Stores importable from the package
+
+__all__ = [
+    "add_hybrid_documents",
+    "build_sparse_encoder",
+    "build_vectorstore",
+    "fit_sparse_encoder",
+    "get_backend",
+    "HybridSearchRetriever",
+    "infer_filter",
+    "load_sparse_encoder",
+    "LocalVectorStore",
+    "maximal_marginal_relevance",
+    "MetadataFilterRetriever",
+    "PineconeMMRVectorStore",
+    "remove_from_sparse_encoder",
+    "save_sparse_encoder",
+    "tag_chunks",
+    "update_sparse_encoder",
+    "upsert_embeddings",
+]
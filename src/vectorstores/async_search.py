@@ -0,0 +1,92 @@
+"""
+Module containing the async search path shared by the Vector Stores.
+
+The default async methods of LangChain Vector Stores run the whole sync search
+(query embedding included) in the unbounded default executor of the event loop.
+Here the query is embedded through the async embeddings (cached, bounded inference
+pool) and only the index query runs in the bounded I/O pool.
+"""
+
+# Import packages and modules
+
+from typing import Any
+
+from langchain_core.documents import Document
+from typing_extensions import Self
+
+from src.utils.executors import run_in_executor
+
+
+# Define classes
+class AsyncSearchMixin:
+    """Async similarity and MMR search for Vector Stores exposing the by-vector sync searches."""
+
+    async def asimilarity_search(
+        self: Self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """
+        Return the documents most similar to the query.
+
+        :param query: query to search for
+        :type query: str
+        :param k: number of documents to return
+        :type k: int
+        :return: most similar documents
+        :rtype: list[Document]
+        """
+        return [document for document, _ in await self.asimilarity_search_with_score(query, k=k, **kwargs)]
+
+    async def asimilarity_search_with_score(
+        self: Self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """
+        Return the documents most similar to the query with their similarity score.
+
+        :param query: query to search for
+        :type query: str
+        :param k: number of documents to return
+        :type k: int
+        :return: most similar documents and their scores
+        :rtype: list[tuple[Document, float]]
+        """
+        query_vector = await self.embeddings.aembed_query(query)
+        return await run_in_executor("io", self.similarity_search_by_vector_with_score, query_vector, k=k, **kwargs)
+
+    async def amax_marginal_relevance_search(
+        self: Self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """
+        Return documents selected using Maximal Marginal Relevance.
+
+        :param query: query to search for
+        :type query: str
+        :param k: number of documents to return
+        :type k: int
+        :param fetch_k: number of documents to fetch before MMR
+        :type fetch_k: int
+        :param lambda_mult: trade-off between relevance (1) and diversity (0)
+        :type lambda_mult: float
+        :return: documents selected by MMR
+        :rtype: list[Document]
+        """
+        query_vector = await self.embeddings.aembed_query(query)
+        return await run_in_executor(
+            "io",
+            self.max_marginal_relevance_search_by_vector,
+            query_vector,
+            k=k,
+            fetch_k=fetch_k,
+            lambda_mult=lambda_mult,
+            **kwargs,
+        )
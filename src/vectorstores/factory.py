@@ -0,0 +1,78 @@
+"""Module defining the factory building the configured Vector Store backend."""
+
+# Import packages and modules
+
+import os
+
+from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from pinecone import Pinecone
+
+from src.constants import (
+    LOCAL_INDEX,
+    PINECONE_POOL,
+    VECTOR_STORE_BACKEND,
+)
+from src.utils.logging import logger
+from src.vectorstores.local import LocalVectorStore
+from src.vectorstores.pinecone_store import PineconeMMRVectorStore
+
+load_dotenv("local/.env")
+
+
+# Define functions
+def get_backend() -> str:
+    """
+    Get the configured Vector Store backend.
+
+    The VECTOR_STORE_BACKEND env variable takes precedence over the constant.
+
+    :return: name of the backend, either 'pinecone' or 'local'
+    :rtype: str
+    """
+    backend = os.getenv("VECTOR_STORE_BACKEND", VECTOR_STORE_BACKEND).lower()
+    if backend not in ("pinecone", "local"):
+        raise ValueError(f"Unknown vector store backend '{backend}', use 'pinecone' or 'local'.")
+    return backend
+
+
+def build_vectorstore(
+    embedding: Embeddings,
+    backend: str | None = None,
+) -> VectorStore:
+    """
+    Build the Vector Store for the given backend.
+
+    The local backend loads the persisted index if any, otherwise it starts empty.
+
+    :param embedding: embedding model to be used by the Vector Store
+    :type embedding: Embeddings
+    :param backend: name of the backend, defaults to the configured one
+    :type backend: str | None
+    :return: Vector Store
+    :rtype: VectorStore
+    """
+    backend = backend or get_backend()
+    logger.info(f"Using {backend} vector store backend.")
+    if backend == "local":
+        persist_dir = LOCAL_INDEX.get("persist_dir")
+        config = {key: value for key, value in LOCAL_INDEX.items() if key != "persist_dir"}
+        if LocalVectorStore.exists(persist_dir):
+            return LocalVectorStore.load(persist_dir, embedding=embedding, **config)
+        return LocalVectorStore(embedding=embedding, persist_dir=persist_dir, **config)
+
+    pc = Pinecone(
+        api_key=os.getenv("PINECONE_API_KEY"),
+        ssl_verify=False,
+        pool_threads=PINECONE_POOL.get("pool_threads"),
+    )
+    index = pc.Index(
+        os.getenv("INDEX_NAME"),
+        pool_threads=PINECONE_POOL.get("pool_threads"),
+        connection_pool_maxsize=PINECONE_POOL.get("connection_pool_maxsize"),
+    )  # keep-alive connections shared by the concurrent queries
+    return PineconeMMRVectorStore(
+        index=index,
+        embedding=embedding,
+    )
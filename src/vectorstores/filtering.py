@@ -0,0 +1,181 @@
+"""
+Module implementing topic-aware metadata pre-filtering.
+
+At ingestion, chunks are tagged with the topic (one of TOPICS) their text is
+mostly about, by keyword matching, and with the source they come from.
+At query time, the topics mentioned in the question become a metadata filter,
+so the Vector Store only scores the chunks of those topics; when the filtered
+search returns too few hits the retriever falls back to the whole index.
+"""
+
+# Import packages and modules
+
+import re
+from collections import Counter
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+from typing_extensions import Self
+
+from src.utils.logging import logger
+
+TOPIC_FIELD = "topic"
+SOURCE_FIELD = "source"
+
+
+# Define classes
+class MetadataFilterRetriever(BaseRetriever):
+    """Retriever pre-filtering the search by the topics of the question, with unfiltered fallback."""
+
+    base_retriever: BaseRetriever
+    """Retriever accepting a 'filter' argument (Vector Store or hybrid retriever)."""
+    topic_keywords: dict[str, list[str]]
+    """Keywords of each topic."""
+    min_hits: int = 1
+    """Minimum number of filtered hits, otherwise the search is run without filter."""
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+    )
+
+    def _get_relevant_documents(
+        self: Self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        filter: dict | None = None,
+    ) -> list[Document]:
+        """
+        Retrieve the documents, filtered by the caller filter or by the topics of the query.
+
+        :param query: query to search for
+        :type query: str
+        :param run_manager: callbacks manager of the run
+        :type run_manager: CallbackManagerForRetrieverRun
+        :param filter: metadata filter, defaults to the one inferred from the query
+        :type filter: dict | None
+        :return: retrieved documents
+        :rtype: list[Document]
+        """
+        filter = filter if filter is not None else infer_filter(query, self.topic_keywords)
+        config = {"callbacks": run_manager.get_child()}
+        if filter:
+            documents = self.base_retriever.invoke(query, config=config, filter=filter)
+            if len(documents) >= self.min_hits:
+                return documents
+            logger.info(f"Filtered search returned {len(documents)} < {self.min_hits} hits, searching the whole index.")
+        return self.base_retriever.invoke(query, config=config)
+
+    async def _aget_relevant_documents(
+        self: Self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        filter: dict | None = None,
+    ) -> list[Document]:
+        """
+        Retrieve the documents asynchronously, filtered by the caller filter or by the topics of the query.
+
+        :param query: query to search for
+        :type query: str
+        :param run_manager: callbacks manager of the run
+        :type run_manager: AsyncCallbackManagerForRetrieverRun
+        :param filter: metadata filter, defaults to the one inferred from the query
+        :type filter: dict | None
+        :return: retrieved documents
+        :rtype: list[Document]
+        """
+        filter = filter if filter is not None else infer_filter(query, self.topic_keywords)
+        config = {"callbacks": run_manager.get_child()}
+        if filter:
+            documents = await self.base_retriever.ainvoke(query, config=config, filter=filter)
+            if len(documents) >= self.min_hits:
+                return documents
+            logger.info(f"Filtered search returned {len(documents)} < {self.min_hits} hits, searching the whole index.")
+        return await self.base_retriever.ainvoke(query, config=config)
+
+
+# Define functions
+def topic_counts(
+    text: str,
+    topic_keywords: dict[str, list[str]],
+) -> Counter:
+    """
+    Count the keyword occurrences of each topic in a text.
+
+    Keywords match at the start of a word (e.g., 'prompt' matches 'prompting'), case insensitive.
+
+    :param text: text to analyze
+    :type text: str
+    :param topic_keywords: keywords of each topic
+    :type topic_keywords: dict[str, list[str]]
+    :return: number of keyword occurrences of each mentioned topic
+    :rtype: Counter
+    """
+    text = text.lower()
+    counts = Counter()
+    for topic, keywords in topic_keywords.items():
+        count = sum(len(re.findall(rf"\b{re.escape(keyword.lower())}", text)) for keyword in keywords)
+        if count:
+            counts[topic] = count
+    return counts
+
+
+def infer_filter(
+    question: str,
+    topic_keywords: dict[str, list[str]],
+) -> dict | None:
+    """
+    Infer the metadata filter of a question from the topics it mentions.
+
+    :param question: question asked by the user
+    :type question: str
+    :param topic_keywords: keywords of each topic
+    :type topic_keywords: dict[str, list[str]]
+    :return: filter on the topic field, None if no topic is mentioned
+    :rtype: dict | None
+    """
+    topics = sorted(topic_counts(question, topic_keywords))
+    if not topics:
+        return None
+    return {TOPIC_FIELD: {"$in": topics}}
+
+
+def tag_chunks(
+    chunks: list[Document],
+    topic_keywords: dict[str, list[str]],
+    default_topic: str = "other",
+) -> list[Document]:
+    """
+    Tag the chunks with their topic and source metadata (in place).
+
+    The topic of a chunk is its most mentioned topic, or the most mentioned topic
+    of its source when the chunk mentions none.
+
+    :param chunks: chunks to tag
+    :type chunks: list[Document]
+    :param topic_keywords: keywords of each topic
+    :type topic_keywords: dict[str, list[str]]
+    :param default_topic: topic of the chunks whose source mentions no topic
+    :type default_topic: str
+    :return: tagged chunks
+    :rtype: list[Document]
+    """
+    chunk_counts = [topic_counts(chunk.page_content, topic_keywords) for chunk in chunks]
+    source_counts: dict[str, Counter] = {}
+    for chunk, counts in zip(chunks, chunk_counts):
+        source_counts.setdefault(chunk.metadata.get(SOURCE_FIELD, ""), Counter()).update(counts)
+
+    for chunk, counts in zip(chunks, chunk_counts):
+        source = chunk.metadata.get(SOURCE_FIELD, "")
+        counts = counts or source_counts[source]
+        chunk.metadata[TOPIC_FIELD] = counts.most_common(1)[0][0] if counts else default_topic
+        chunk.metadata[SOURCE_FIELD] = source
+    logger.info(f"Tagged {len(chunks)} chunks with topics {dict(Counter(chunk.metadata[TOPIC_FIELD] for chunk in chunks))}.")
+
+    return chunks
@@ -0,0 +1,419 @@
+"""
+Module implementing hybrid (dense + BM25 sparse) retrieval.
+
+The BM25 encoder (from pinecone-text) is fitted on the chunks at ingestion time,
+its statistics (document frequencies and average length) being updated batch by batch
+as the chunks stream through the pipeline (and the deleted chunks removed from them
+on incremental refreshes), and its parameters are persisted locally,
+so that queries are encoded with the same vocabulary statistics.
+Sparse vectors are stored alongside the dense ones, either in a Pinecone index
+(which must use the dotproduct metric) or in the local Vector Store,
+and the two scores are fused at query time with a tunable alpha.
+"""
+
+# Import packages and modules
+
+import os
+import uuid
+from collections.abc import Iterable
+from typing import Any
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from pydantic import ConfigDict
+from typing_extensions import Self
+
+from src.utils.executors import run_in_executor
+from src.utils.logging import logger
+from src.vectorstores.local import LocalVectorStore
+
+
+# Define classes
+class HybridSearchRetriever(BaseRetriever):
+    """Retriever fusing dense and sparse scores with a convex combination."""
+
+    vectorstore: VectorStore
+    """Vector Store holding both dense and sparse vectors (Pinecone or local)."""
+    sparse_encoder: Any
+    """Fitted BM25 encoder used to encode the queries."""
+    k: int = 4
+    """Number of documents to return."""
+    alpha: float = 0.5
+    """Weight of the dense score (1 is pure dense, 0 is pure sparse)."""
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+    )
+
+    def _get_relevant_documents(
+        self: Self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+        filter: dict | None = None,
+    ) -> list[Document]:
+        """
+        Retrieve the documents with the highest fused score.
+
+        :param query: query to search for
+        :type query: str
+        :param run_manager: callbacks manager of the run
+        :type run_manager: CallbackManagerForRetrieverRun
+        :param filter: metadata filter restricting the search
+        :type filter: dict | None
+        :return: retrieved documents
+        :rtype: list[Document]
+        """
+        dense_vector = self.vectorstore.embeddings.embed_query(query)
+        return self._search(dense_vector, query, filter)
+
+    async def _aget_relevant_documents(
+        self: Self,
+        query: str,
+        *,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        filter: dict | None = None,
+    ) -> list[Document]:
+        """
+        Retrieve the documents with the highest fused score asynchronously.
+
+        The query is embedded in the bounded inference pool and the search runs in the bounded I/O pool.
+
+        :param query: query to search for
+        :type query: str
+        :param run_manager: callbacks manager of the run
+        :type run_manager: AsyncCallbackManagerForRetrieverRun
+        :param filter: metadata filter restricting the search
+        :type filter: dict | None
+        :return: retrieved documents
+        :rtype: list[Document]
+        """
+        dense_vector = await self.vectorstore.embeddings.aembed_query(query)
+        return await run_in_executor("io", self._search, dense_vector, query, filter)
+
+    def _search(
+        self: Self,
+        dense_vector: list[float],
+        query: str,
+        filter: dict | None = None,
+    ) -> list[Document]:
+        """
+        Search the documents with the highest fused score given the dense query vector.
+
+        :param dense_vector: dense query vector
+        :type dense_vector: list[float]
+        :param query: query to search for (encoded by the sparse encoder)
+        :type query: str
+        :param filter: metadata filter restricting the search
+        :type filter: dict | None
+        :return: retrieved documents
+        :rtype: list[Document]
+        """
+        sparse_vector = self.sparse_encoder.encode_queries(query)
+
+        if isinstance(self.vectorstore, LocalVectorStore):
+            docs_with_scores = self.vectorstore.hybrid_search_by_vector_with_score(
+                embedding=dense_vector,
+                sparse_vector=sparse_vector,
+                k=self.k,
+                alpha=self.alpha,
+                filter=filter,
+            )
+            return [doc for doc, _ in docs_with_scores]
+
+        # Pinecone: scale both vectors so that the dot product is the convex combination
+        dense_vector, sparse_vector = hybrid_scale(dense_vector, sparse_vector, alpha=self.alpha)
+        results = self.vectorstore.index.query(
+            vector=dense_vector,
+            sparse_vector=sparse_vector,
+            top_k=self.k,
+            include_metadata=True,
+            namespace=self.vectorstore._namespace,
+            filter=filter,
+        )
+        text_key = self.vectorstore._text_key
+        return [
+            Document(
+                id=match["id"],
+                page_content=match["metadata"].pop(text_key),
+                metadata=match["metadata"],
+            )
+            for match in results["matches"]
+            if text_key in match["metadata"]
+        ]
+
+
+# Define functions
+def hybrid_scale(
+    dense_vector: list[float],
+    sparse_vector: dict,
+    alpha: float,
+) -> tuple[list[float], dict]:
+    """
+    Scale the dense and sparse vectors for a convex combination of their scores.
+
+    :param dense_vector: dense query vector
+    :type dense_vector: list[float]
+    :param sparse_vector: sparse query vector as {"indices": [...], "values": [...]}
+    :type sparse_vector: dict
+    :param alpha: weight of the dense score (1 is pure dense, 0 is pure sparse)
+    :type alpha: float
+    :return: scaled dense and sparse vectors
+    :rtype: tuple[list[float], dict]
+    """
+    if not 0 <= alpha <= 1:
+        raise ValueError("Alpha must be between 0 and 1.")
+    return (
+        [value * alpha for value in dense_vector],
+        {
+            "indices": sparse_vector["indices"],
+            "values": [value * (1 - alpha) for value in sparse_vector["values"]],
+        },
+    )
+
+
+def fit_sparse_encoder(
+    texts: Iterable[str],
+    path: str,
+) -> Any:
+    """
+    Fit the BM25 encoder on the corpus and persist its parameters.
+
+    The corpus is consumed in one pass, so it can be streamed.
+
+    :param texts: corpus the encoder is fitted on
+    :type texts: Iterable[str]
+    :param path: JSON file where the parameters are persisted
+    :type path: str
+    :return: fitted BM25 encoder
+    :rtype: BM25Encoder
+    """
+    from pinecone_text.sparse import BM25Encoder
+
+    logger.info("Fitting BM25 encoder...")
+    encoder = BM25Encoder()
+    encoder.fit(texts)
+    logger.info(f"Fitted BM25 encoder on {encoder.n_docs} texts.")
+    save_sparse_encoder(encoder, path)
+
+    return encoder
+
+
+def build_sparse_encoder(
+    path: str | None = None,
+) -> Any:
+    """
+    Load the BM25 encoder persisted at a path, or build an unfitted one to be fitted on the stream of chunks.
+
+    :param path: JSON file where the parameters are persisted, None for a new encoder
+    :type path: str | None
+    :return: BM25 encoder
+    :rtype: BM25Encoder
+    """
+    from pinecone_text.sparse import BM25Encoder
+
+    if path is not None and os.path.isfile(path):
+        return load_sparse_encoder(path)
+    return BM25Encoder()
+
+
+def update_sparse_encoder(
+    encoder: Any,
+    texts: Iterable[str],
+) -> None:
+    """
+    Update the BM25 statistics with a batch of chunks (streamed fit, the counts of the previous batches are kept).
+
+    The chunks encoded before the last batch used the average length known at the time,
+    which converges as the corpus streams; the document frequencies used by the queries are exact.
+
+    :param encoder: BM25 encoder, fitted or not
+    :type encoder: BM25Encoder
+    :param texts: chunks to account for
+    :type texts: Iterable[str]
+    """
+    n_docs = encoder.n_docs or 0
+    total_length = (encoder.avgdl or 0.0) * n_docs
+    doc_freq = encoder.doc_freq if encoder.doc_freq is not None else {}
+    for text in texts:
+        indices, tf = encoder._tf(text)
+        if not indices:
+            continue
+        n_docs += 1
+        total_length += sum(tf)
+        for index in indices:
+            doc_freq[index] = doc_freq.get(index, 0) + 1
+    encoder.doc_freq = doc_freq
+    encoder.n_docs = n_docs
+    encoder.avgdl = total_length / n_docs if n_docs else None
+
+
+def remove_from_sparse_encoder(
+    encoder: Any,
+    texts: Iterable[str],
+) -> None:
+    """
+    Remove deleted chunks from the BM25 statistics, so that the query IDF follows the indexed chunks across refreshes.
+
+    The sparse vectors of the remaining chunks keep the statistics they were encoded with;
+    a full re-ingestion (--full) refits the encoder and re-encodes every chunk.
+
+    :param encoder: fitted BM25 encoder
+    :type encoder: BM25Encoder
+    :param texts: deleted chunks, previously accounted for by update_sparse_encoder
+    :type texts: Iterable[str]
+    """
+    if not encoder.n_docs:
+        return
+    n_docs = encoder.n_docs
+    total_length = (encoder.avgdl or 0.0) * n_docs
+    doc_freq = encoder.doc_freq
+    for text in texts:
+        indices, tf = encoder._tf(text)
+        if not indices:
+            continue
+        n_docs -= 1
+        total_length -= sum(tf)
+        for index in indices:
+            if doc_freq.get(index, 0) > 1:
+                doc_freq[index] -= 1
+            else:
+                doc_freq.pop(index, None)
+    encoder.n_docs = max(n_docs, 0)
+    encoder.avgdl = max(total_length, 0.0) / encoder.n_docs if encoder.n_docs else None
+
+
+def save_sparse_encoder(
+    encoder: Any,
+    path: str,
+) -> None:
+    """
+    Persist the parameters of the BM25 encoder.
+
+    :param encoder: fitted BM25 encoder
+    :type encoder: BM25Encoder
+    :param path: JSON file where the parameters are persisted
+    :type path: str
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    encoder.dump(tmp_path)
+    os.replace(tmp_path, path)  # a reader never sees a partially written file
+    logger.info(f"Persisted BM25 parameters ({encoder.n_docs} texts) to {path}.")
+
+
+def load_sparse_encoder(
+    path: str,
+) -> Any:
+    """
+    Load the BM25 encoder fitted at ingestion time.
+
+    :param path: JSON file where the parameters are persisted
+    :type path: str
+    :return: fitted BM25 encoder
+    :rtype: BM25Encoder
+    """
+    from pinecone_text.sparse import BM25Encoder
+
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"BM25 parameters not found at {path}, run the ingestion with hybrid search enabled first.")
+    return BM25Encoder().load(path)
+
+
+def add_hybrid_documents(
+    vectorstore: VectorStore,
+    documents: list[Document],
+    sparse_encoder: Any,
+    ids: list[str] | None = None,
+    batch_size: int = 100,
+) -> list[str]:
+    """
+    Embed the documents with both dense and sparse encoders and upsert them.
+
+    :param vectorstore: Vector Store (Pinecone or local)
+    :type vectorstore: VectorStore
+    :param documents: documents to index
+    :type documents: list[Document]
+    :param sparse_encoder: fitted BM25 encoder
+    :type sparse_encoder: BM25Encoder
+    :param ids: ids of the documents, defaults to the document ids (random ones if missing)
+    :type ids: list[str] | None
+    :param batch_size: number of vectors upserted per request (Pinecone only)
+    :type batch_size: int
+    :return: ids of the indexed documents
+    :rtype: list[str]
+    """
+    texts = [doc.page_content for doc in documents]
+    return upsert_embeddings(
+        vectorstore,
+        documents,
+        embeddings=vectorstore.embeddings.embed_documents(texts),
+        ids=ids,
+        sparse_vectors=sparse_encoder.encode_documents(texts),
+        batch_size=batch_size,
+    )
+
+
+def upsert_embeddings(
+    vectorstore: VectorStore,
+    documents: list[Document],
+    embeddings: list[list[float]],
+    ids: list[str] | None = None,
+    sparse_vectors: list[dict] | None = None,
+    batch_size: int = 100,
+) -> list[str]:
+    """
+    Upsert already embedded documents, with their sparse vectors if any.
+
+    :param vectorstore: Vector Store (Pinecone or local)
+    :type vectorstore: VectorStore
+    :param documents: documents to index
+    :type documents: list[Document]
+    :param embeddings: dense vectors of the documents
+    :type embeddings: list[list[float]]
+    :param ids: ids of the documents, defaults to the document ids (random ones if missing)
+    :type ids: list[str] | None
+    :param sparse_vectors: sparse vectors of the documents, None for dense only
+    :type sparse_vectors: list[dict] | None
+    :param batch_size: number of vectors upserted per request (Pinecone only)
+    :type batch_size: int
+    :return: ids of the indexed documents
+    :rtype: list[str]
+    """
+    ids = ids or [doc.id for doc in documents]
+
+    if isinstance(vectorstore, LocalVectorStore):
+        return vectorstore.add_embeddings(
+            texts=[doc.page_content for doc in documents],
+            embeddings=embeddings,
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids,
+            sparse_vectors=sparse_vectors,
+        )
+
+    ids = [id_ or str(uuid.uuid4()) for id_ in ids]
+    text_key = vectorstore._text_key
+    vectors = [
+        {
+            "id": id_,
+            "values": list(dense_vector),
+            "metadata": {**doc.metadata, text_key: doc.page_content},
+        }
+        for id_, doc, dense_vector in zip(ids, documents, embeddings)
+    ]
+    for vector, sparse_vector in zip(vectors, sparse_vectors or []):
+        vector["sparse_values"] = sparse_vector
+    for start in range(0, len(vectors), batch_size):
+        vectorstore.index.upsert(
+            vectors=vectors[start : start + batch_size],
+            namespace=vectorstore._namespace,
+        )
+
+    return ids
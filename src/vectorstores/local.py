@@ -0,0 +1,811 @@
+"""
+Module implementing an in-process Vector Store backed by NumPy.
+
+The store keeps all the vectors in a single matrix in memory and supports:
+* exact search: brute-force similarity over the whole matrix.
+* approximate search: inverted file index (IVF), where vectors are clustered
+  via k-means and only the closest clusters are probed at query time.
+* hybrid search: dense scores fused with sparse (e.g., BM25) scores stored
+  alongside the vectors, weighted by a tunable alpha.
+* metadata pre-filtering: Pinecone-like filters ($eq, $ne, $in, $nin, $and, $or)
+  restrict the vectors scored by every search.
+
+The index can be persisted to (and loaded from) a local directory,
+making it usable without any network access.
+"""
+
+# Import packages and modules
+
+import json
+import os
+import uuid
+import threading
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from typing_extensions import Self
+
+from src.utils.logging import logger
+from src.vectorstores.async_search import AsyncSearchMixin
+from src.vectorstores.mmr import maximal_marginal_relevance
+
+VECTORS_FILE_NAME = "vectors.npy"
+DOCSTORE_FILE_NAME = "docstore.json"
+
+
+# Define classes
+class LocalVectorStore(AsyncSearchMixin, VectorStore):
+    """In-process Vector Store with exact, IVF approximate and hybrid search."""
+
+    def __init__(
+        self: Self,
+        embedding: Embeddings,
+        index_type: str = "exact",
+        metric: str = "cosine",
+        n_lists: int = 64,
+        n_probe: int = 8,
+        persist_dir: str | None = None,
+    ) -> None:
+        """
+        Initialize the local Vector Store.
+
+        :param embedding: embedding model used to embed texts and queries
+        :type embedding: Embeddings
+        :param index_type: type of index, either 'exact' or 'ivf'
+        :type index_type: str
+        :param metric: similarity metric, either 'cosine' or 'dotproduct'
+        :type metric: str
+        :param n_lists: number of clusters of the IVF index
+        :type n_lists: int
+        :param n_probe: number of clusters probed at query time by the IVF index
+        :type n_probe: int
+        :param persist_dir: directory where the index is persisted
+        :type persist_dir: str | None
+        """
+        if index_type not in ("exact", "ivf"):
+            raise ValueError(f"Unknown index type '{index_type}', use 'exact' or 'ivf'.")
+        if metric not in ("cosine", "dotproduct"):
+            raise ValueError(f"Unknown metric '{metric}', use 'cosine' or 'dotproduct'.")
+        self.embedding = embedding
+        self.index_type = index_type
+        self.metric = metric
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.persist_dir = persist_dir
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._metadatas: list[dict] = []
+        self._sparse_vectors: list[dict | None] = []  # sparse vectors as {"indices": [...], "values": [...]}
+        self._sparse_index: dict[int, tuple[np.ndarray, np.ndarray]] | None = None  # term -> (positions, values)
+        self._positions: dict[str, int] = {}  # id -> position in the index
+        self._vectors: np.ndarray | None = None  # vectors as stored (n, d), view of the first rows of _buffer
+        self._search_vectors: np.ndarray | None = None  # vectors used for search (normalized if cosine)
+        self._buffer: np.ndarray | None = None  # preallocated (capacity, d) storage grown geometrically
+        self._search_buffer: np.ndarray | None = None  # same for the search vectors
+        self._centroids: np.ndarray | None = None  # IVF centroids (n_lists, d)
+        self._assignments: np.ndarray | None = None  # IVF cluster of each vector (n,)
+        self._filter_cache: dict[str, np.ndarray] = {}  # filter -> positions of the matching vectors
+        self._index_lock = threading.Lock()  # concurrent searches (e.g., the async ones) build the lazy indexes once
+
+    @property
+    def embeddings(self: Self) -> Embeddings:
+        """
+        Embedding model used by the Vector Store.
+
+        :return: embedding model
+        :rtype: Embeddings
+        """
+        return self.embedding
+
+    def __len__(self: Self) -> int:
+        """
+        Number of vectors stored in the index.
+
+        :return: number of vectors
+        :rtype: int
+        """
+        return len(self._ids)
+
+    # Write operations
+    def add_texts(
+        self: Self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        """
+        Embed and add texts to the index.
+
+        :param texts: texts to be added
+        :type texts: Iterable[str]
+        :param metadatas: metadata of each text
+        :type metadatas: list[dict] | None
+        :param ids: ids of each text, random ones are generated if missing
+        :type ids: list[str] | None
+        :return: ids of the added texts
+        :rtype: list[str]
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        vectors = self.embedding.embed_documents(texts)
+        return self.add_embeddings(
+            texts=texts,
+            embeddings=vectors,
+            metadatas=metadatas,
+            ids=ids,
+        )
+
+    def add_embeddings(
+        self: Self,
+        texts: list[str],
+        embeddings: list[list[float]] | np.ndarray,
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+        sparse_vectors: list[dict] | None = None,
+    ) -> list[str]:
+        """
+        Add already embedded texts to the index (existing ids are overwritten).
+
+        :param texts: texts to be added
+        :type texts: list[str]
+        :param embeddings: vectors of the texts
+        :type embeddings: list[list[float]] | np.ndarray
+        :param metadatas: metadata of each text
+        :type metadatas: list[dict] | None
+        :param ids: ids of each text, random ones are generated if missing
+        :type ids: list[str] | None
+        :param sparse_vectors: sparse vectors of each text, used by hybrid search
+        :type sparse_vectors: list[dict] | None
+        :return: ids of the added texts
+        :rtype: list[str]
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+            raise ValueError("Embeddings must be a matrix with one row per text.")
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [id_ or str(uuid.uuid4()) for id_ in ids] if ids else [str(uuid.uuid4()) for _ in texts]
+
+        sparse_vectors = sparse_vectors or [None for _ in texts]
+
+        # Upsert semantics: the rows of the existing ids are overwritten in place (the last one wins within a batch)
+        rows = {id_: row for row, id_ in enumerate(ids)}
+        overwritten = [(self._positions[id_], row) for id_, row in rows.items() if id_ in self._positions]
+        appended = [row for id_, row in rows.items() if id_ not in self._positions]
+        for position, row in overwritten:
+            self._texts[position] = texts[row]
+            self._metadatas[position] = dict(metadatas[row])
+            self._sparse_vectors[position] = sparse_vectors[row]
+        if overwritten:
+            positions, overwritten_rows = (list(values) for values in zip(*overwritten))
+            self._vectors[positions] = vectors[overwritten_rows]
+            if self.metric == "cosine":
+                self._search_vectors[positions] = _normalize(vectors[overwritten_rows])
+        if appended:
+            self._positions.update((ids[row], len(self._ids) + offset) for offset, row in enumerate(appended))
+            self._ids.extend(ids[row] for row in appended)
+            self._texts.extend(texts[row] for row in appended)
+            self._metadatas.extend(dict(metadatas[row]) for row in appended)
+            self._sparse_vectors.extend(sparse_vectors[row] for row in appended)
+            self._append_vectors(vectors[appended])
+        self._refresh_index()
+
+        return ids
+
+    def delete(
+        self: Self,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> bool | None:
+        """
+        Delete vectors from the index by id.
+
+        :param ids: ids of the vectors to be deleted
+        :type ids: list[str] | None
+        :return: True if the deletion was performed
+        :rtype: bool | None
+        """
+        if not ids or self._vectors is None:
+            return False
+        to_delete = set(ids)
+        keep = [position for position, id_ in enumerate(self._ids) if id_ not in to_delete]
+        self._ids = [self._ids[position] for position in keep]
+        self._texts = [self._texts[position] for position in keep]
+        self._metadatas = [self._metadatas[position] for position in keep]
+        self._sparse_vectors = [self._sparse_vectors[position] for position in keep]
+        self._positions = {id_: position for position, id_ in enumerate(self._ids)}
+        vectors = self._vectors[keep]
+        self._vectors, self._search_vectors, self._buffer, self._search_buffer = None, None, None, None
+        if keep:
+            self._append_vectors(vectors)
+        self._refresh_index()
+
+        return True
+
+    def get_by_ids(
+        self: Self,
+        ids: list[str],
+        /,
+    ) -> list[Document]:
+        """
+        Get documents by their ids.
+
+        :param ids: ids of the documents
+        :type ids: list[str]
+        :return: documents found in the index
+        :rtype: list[Document]
+        """
+        return [self._to_document(self._positions[id_]) for id_ in ids if id_ in self._positions]
+
+    # Read operations
+    def similarity_search(
+        self: Self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """
+        Return the documents most similar to the query.
+
+        :param query: query to search for
+        :type query: str
+        :param k: number of documents to return
+        :type k: int
+        :return: most similar documents
+        :rtype: list[Document]
+        """
+        return [document for document, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def similarity_search_with_score(
+        self: Self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """
+        Return the documents most similar to the query with their similarity score.
+
+        :param query: query to search for
+        :type query: str
+        :param k: number of documents to return
+        :type k: int
+        :return: most similar documents and their scores
+        :rtype: list[tuple[Document, float]]
+        """
+        query_vector = self.embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(query_vector, k=k, **kwargs)
+
+    def similarity_search_by_vector(
+        self: Self,
+        embedding: list[float],
+        k: int = 4,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """
+        Return the documents most similar to the embedding vector.
+
+        :param embedding: query vector
+        :type embedding: list[float]
+        :param k: number of documents to return
+        :type k: int
+        :return: most similar documents
+        :rtype: list[Document]
+        """
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)]
+
+    def similarity_search_by_vector_with_score(
+        self: Self,
+        embedding: list[float],
+        k: int = 4,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """
+        Return the documents most similar to the embedding vector with their similarity score.
+
+        :param embedding: query vector
+        :type embedding: list[float]
+        :param k: number of documents to return
+        :type k: int
+        :param kwargs: search arguments, 'filter' restricts the search to the matching metadata
+        :return: most similar documents and their scores
+        :rtype: list[tuple[Document, float]]
+        """
+        positions, scores = self._search(np.asarray(embedding, dtype=np.float32), k=k, filter=kwargs.get("filter"))
+        return [(self._to_document(position), float(score)) for position, score in zip(positions, scores)]
+
+    def max_marginal_relevance_search(
+        self: Self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """
+        Return documents selected using Maximal Marginal Relevance.
+
+        :param query: query to search for
+        :type query: str
+        :param k: number of documents to return
+        :type k: int
+        :param fetch_k: number of documents to fetch before MMR
+        :type fetch_k: int
+        :param lambda_mult: trade-off between relevance (1) and diversity (0)
+        :type lambda_mult: float
+        :return: documents selected by MMR
+        :rtype: list[Document]
+        """
+        query_vector = self.embedding.embed_query(query)
+        return self.max_marginal_relevance_search_by_vector(
+            query_vector,
+            k=k,
+            fetch_k=fetch_k,
+            lambda_mult=lambda_mult,
+            **kwargs,
+        )
+
+    def max_marginal_relevance_search_by_vector(
+        self: Self,
+        embedding: list[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """
+        Return documents selected using Maximal Marginal Relevance from a query vector.
+
+        :param embedding: query vector
+        :type embedding: list[float]
+        :param k: number of documents to return
+        :type k: int
+        :param fetch_k: number of documents to fetch before MMR
+        :type fetch_k: int
+        :param lambda_mult: trade-off between relevance (1) and diversity (0)
+        :type lambda_mult: float
+        :param kwargs: search arguments, 'filter' restricts the search to the matching metadata
+        :return: documents selected by MMR
+        :rtype: list[Document]
+        """
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        positions, _ = self._search(query_vector, k=fetch_k, filter=kwargs.get("filter"))
+        if len(positions) == 0:
+            return []
+        selected = maximal_marginal_relevance(
+            query_embedding=query_vector,
+            embedding_list=self._vectors[positions],
+            lambda_mult=lambda_mult,
+            k=k,
+        )
+        return [self._to_document(positions[position]) for position in selected]
+
+    def hybrid_search_by_vector_with_score(
+        self: Self,
+        embedding: list[float],
+        sparse_vector: dict,
+        k: int = 4,
+        alpha: float = 0.5,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        """
+        Return the documents with the highest fused dense and sparse score.
+
+        The fused score is alpha * dense score + (1 - alpha) * sparse dot product,
+        the same convex combination used by Pinecone hybrid indexes.
+
+        :param embedding: dense query vector
+        :type embedding: list[float]
+        :param sparse_vector: sparse query vector as {"indices": [...], "values": [...]}
+        :type sparse_vector: dict
+        :param k: number of documents to return
+        :type k: int
+        :param alpha: weight of the dense score (1 is pure dense, 0 is pure sparse)
+        :type alpha: float
+        :param kwargs: search arguments, 'filter' restricts the search to the matching metadata
+        :return: documents and their fused scores, sorted by score
+        :rtype: list[tuple[Document, float]]
+        """
+        if not 0 <= alpha <= 1:
+            raise ValueError("Alpha must be between 0 and 1.")
+        if self._search_vectors is None or k <= 0:
+            return []
+        query_vector = np.asarray(embedding, dtype=np.float32)
+        if self.metric == "cosine":
+            query_vector = _normalize(query_vector[None, :])[0]
+        scores = alpha * (self._search_vectors @ query_vector) + (1 - alpha) * self._sparse_scores(sparse_vector)
+        candidates = self._filter_positions(kwargs.get("filter"))
+        if candidates is not None:
+            scores = scores[candidates]
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = top if candidates is None else candidates[top]
+
+        return [(self._to_document(position), float(score)) for position, score in zip(positions, scores[top])]
+
+    @classmethod
+    def from_texts(
+        cls: type["LocalVectorStore"],
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        *,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        """
+        Build a local Vector Store from texts.
+
+        :param texts: texts to be added
+        :type texts: list[str]
+        :param embedding: embedding model
+        :type embedding: Embeddings
+        :param metadatas: metadata of each text
+        :type metadatas: list[dict] | None
+        :param ids: ids of each text
+        :type ids: list[str] | None
+        :return: populated Vector Store
+        :rtype: LocalVectorStore
+        """
+        vectorstore = cls(embedding=embedding, **kwargs)
+        vectorstore.add_texts(texts, metadatas, ids=ids)
+        return vectorstore
+
+    # Persistence
+    def persist(
+        self: Self,
+        persist_dir: str | None = None,
+    ) -> None:
+        """
+        Persist the index to a local directory.
+
+        :param persist_dir: target directory, defaults to the one set at initialization
+        :type persist_dir: str | None
+        """
+        persist_dir = persist_dir or self.persist_dir
+        if persist_dir is None:
+            raise ValueError("No directory to persist the index to.")
+        os.makedirs(persist_dir, exist_ok=True)
+        vectors = self._vectors if self._vectors is not None else np.empty((0, 0), dtype=np.float32)
+        np.save(os.path.join(persist_dir, VECTORS_FILE_NAME), vectors)
+        with open(os.path.join(persist_dir, DOCSTORE_FILE_NAME), "w") as docstore_file:
+            json.dump(
+                {
+                    "metric": self.metric,
+                    "ids": self._ids,
+                    "texts": self._texts,
+                    "metadatas": self._metadatas,
+                    "sparse_vectors": self._sparse_vectors,
+                },
+                docstore_file,
+            )
+        logger.info(f"Persisted {len(self)} vectors to {persist_dir}.")
+
+    @classmethod
+    def load(
+        cls: type["LocalVectorStore"],
+        persist_dir: str,
+        embedding: Embeddings,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        """
+        Load an index persisted in a local directory.
+
+        :param persist_dir: directory where the index was persisted
+        :type persist_dir: str
+        :param embedding: embedding model
+        :type embedding: Embeddings
+        :return: loaded Vector Store
+        :rtype: LocalVectorStore
+        """
+        with open(os.path.join(persist_dir, DOCSTORE_FILE_NAME)) as docstore_file:
+            docstore = json.load(docstore_file)
+        kwargs.setdefault("metric", docstore.get("metric", "cosine"))
+        vectorstore = cls(embedding=embedding, persist_dir=persist_dir, **kwargs)
+        if docstore["ids"]:
+            vectorstore.add_embeddings(
+                texts=docstore["texts"],
+                embeddings=np.load(os.path.join(persist_dir, VECTORS_FILE_NAME)),
+                metadatas=docstore["metadatas"],
+                ids=docstore["ids"],
+                sparse_vectors=docstore.get("sparse_vectors"),
+            )
+        logger.info(f"Loaded {len(vectorstore)} vectors from {persist_dir}.")
+
+        return vectorstore
+
+    @staticmethod
+    def exists(
+        persist_dir: str,
+    ) -> bool:
+        """
+        Check whether an index is persisted in a local directory.
+
+        :param persist_dir: directory to check
+        :type persist_dir: str
+        :return: True if the index exists
+        :rtype: bool
+        """
+        return os.path.isfile(os.path.join(persist_dir, DOCSTORE_FILE_NAME))
+
+    # Internals
+    def _select_relevance_score_fn(self: Self) -> Callable[[float], float]:
+        """
+        Map the raw similarity score to a relevance score in [0, 1].
+
+        :return: relevance score function
+        :rtype: Callable[[float], float]
+        """
+        if self.metric == "cosine":
+            return lambda score: (score + 1.0) / 2.0
+        return lambda score: 1.0 / (1.0 + np.exp(-score))
+
+    def _to_document(
+        self: Self,
+        position: int,
+    ) -> Document:
+        """
+        Build the Document stored at a given position.
+
+        :param position: position in the index
+        :type position: int
+        :return: stored document
+        :rtype: Document
+        """
+        return Document(
+            id=self._ids[position],
+            page_content=self._texts[position],
+            metadata=dict(self._metadatas[position]),
+        )
+
+    def _append_vectors(
+        self: Self,
+        vectors: np.ndarray,
+    ) -> None:
+        """
+        Append vectors to the preallocated buffers, normalizing only the new rows.
+
+        The buffers double their capacity when full, so that repeated batch upserts
+        cost amortized linear time instead of copying the whole matrix at each write.
+
+        :param vectors: vectors to append (m, d)
+        :type vectors: np.ndarray
+        """
+        size = 0 if self._vectors is None else len(self._vectors)
+        needed = size + len(vectors)
+        if self._buffer is None or needed > len(self._buffer):
+            capacity = max(needed, 2 * size)
+            buffer = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            buffer[:size] = self._vectors[:size] if size else 0.0
+            search_buffer = buffer
+            if self.metric == "cosine":
+                search_buffer = np.empty_like(buffer)
+                search_buffer[:size] = self._search_vectors[:size] if size else 0.0
+            self._buffer, self._search_buffer = buffer, search_buffer
+        self._buffer[size:needed] = vectors
+        if self.metric == "cosine":
+            self._search_buffer[size:needed] = _normalize(vectors)
+        self._vectors = self._buffer[:needed]
+        self._search_vectors = self._search_buffer[:needed]
+
+    def _refresh_index(self: Self) -> None:
+        """Invalidate the IVF, sparse and filter indexes after a write."""
+        self._centroids, self._assignments = None, None
+        self._sparse_index = None
+        self._filter_cache = {}
+
+    def _train_ivf(self: Self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Cluster the vectors via k-means to build the IVF index, once across concurrent searches.
+
+        :return: centroids (n_lists, d) and cluster of each vector (n,)
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        with self._index_lock:
+            if self._centroids is None or self._assignments is None:
+                n_lists = min(self.n_lists, len(self))
+                centroids = _kmeans(self._search_vectors, n_clusters=n_lists)
+                self._centroids, self._assignments = centroids, np.argmax(self._search_vectors @ centroids.T, axis=1)
+                logger.info(f"Trained IVF index with {n_lists} lists over {len(self)} vectors.")
+            return self._centroids, self._assignments
+
+    def _sparse_scores(
+        self: Self,
+        sparse_vector: dict,
+    ) -> np.ndarray:
+        """
+        Dot product between a sparse query vector and every stored sparse vector.
+
+        :param sparse_vector: sparse query vector as {"indices": [...], "values": [...]}
+        :type sparse_vector: dict
+        :return: sparse score of each stored vector (0 for vectors with no sparse part)
+        :rtype: np.ndarray
+        """
+        if self._sparse_index is None:  # build the inverted index on first use
+            postings: dict[int, tuple[list[int], list[float]]] = {}
+            for position, stored in enumerate(self._sparse_vectors):
+                stored = stored or {}
+                for term, value in zip(stored.get("indices", []), stored.get("values", [])):
+                    term_positions, term_values = postings.setdefault(term, ([], []))
+                    term_positions.append(position)
+                    term_values.append(value)
+            self._sparse_index = {
+                term: (np.asarray(term_positions), np.asarray(term_values, dtype=np.float32))
+                for term, (term_positions, term_values) in postings.items()
+            }
+        scores = np.zeros(len(self), dtype=np.float32)
+        for term, value in zip(sparse_vector.get("indices", []), sparse_vector.get("values", [])):
+            if term in self._sparse_index:
+                term_positions, term_values = self._sparse_index[term]
+                np.add.at(scores, term_positions, value * term_values)
+
+        return scores
+
+    def _filter_positions(
+        self: Self,
+        filter: dict | None,
+    ) -> np.ndarray | None:
+        """
+        Positions of the vectors whose metadata match the filter (cached until the next write).
+
+        :param filter: metadata filter, None for no filtering
+        :type filter: dict | None
+        :return: sorted positions of the matching vectors, None for no filtering
+        :rtype: np.ndarray | None
+        """
+        if not filter:
+            return None
+        key = json.dumps(filter, sort_keys=True, default=str)
+        if key not in self._filter_cache:
+            self._filter_cache[key] = np.asarray(
+                [position for position, metadata in enumerate(self._metadatas) if _matches(metadata, filter)],
+                dtype=np.int64,
+            )
+        return self._filter_cache[key]
+
+    def _search(
+        self: Self,
+        query_vector: np.ndarray,
+        k: int,
+        filter: dict | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Search the top-k positions and scores for a query vector.
+
+        :param query_vector: query vector
+        :type query_vector: np.ndarray
+        :param k: number of results
+        :type k: int
+        :param filter: metadata filter restricting the scored vectors
+        :type filter: dict | None
+        :return: positions in the index and similarity scores, sorted by score
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        if self._search_vectors is None or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if self.metric == "cosine":
+            query_vector = _normalize(query_vector[None, :])[0]
+
+        candidates = self._filter_positions(filter)
+        if self.index_type == "ivf" and len(self) > self.n_lists:
+            centroids, assignments = self._train_ivf()
+            closest_lists = np.argsort(-(centroids @ query_vector))[: self.n_probe]
+            probed = np.flatnonzero(np.isin(assignments, closest_lists))
+            if candidates is not None:
+                probed = np.intersect1d(probed, candidates, assume_unique=True)
+            if len(probed) >= k:  # otherwise not enough vectors in the probed lists
+                candidates = probed
+        if candidates is not None and len(candidates) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        matrix = self._search_vectors if candidates is None else self._search_vectors[candidates]
+        scores = matrix @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = top if candidates is None else candidates[top]
+
+        return positions, scores[top]
+
+
+# Define functions
+def _normalize(
+    vectors: np.ndarray,
+) -> np.ndarray:
+    """
+    L2-normalize the rows of a matrix.
+
+    :param vectors: matrix to normalize
+    :type vectors: np.ndarray
+    :return: matrix with unit-norm rows
+    :rtype: np.ndarray
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    n_iterations: int = 10,
+    seed: int = 42,
+) -> np.ndarray:
+    """
+    Spherical k-means used to train the IVF centroids.
+
+    :param vectors: vectors to cluster
+    :type vectors: np.ndarray
+    :param n_clusters: number of clusters
+    :type n_clusters: int
+    :param n_iterations: number of Lloyd iterations
+    :type n_iterations: int
+    :param seed: random seed for the centroids initialization
+    :type seed: int
+    :return: centroids (n_clusters, d)
+    :rtype: np.ndarray
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)]
+    for _ in range(n_iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(n_clusters):
+            members = vectors[assignments == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+
+    return centroids
+
+
+def _matches(
+    metadata: dict,
+    filter: dict,
+) -> bool:
+    """
+    Check whether metadata match a Pinecone-like filter.
+
+    Supported operators are $eq, $ne, $in, $nin (on scalar or list values) and $and, $or.
+    Fields without operator are compared for equality, and all fields must match.
+
+    :param metadata: metadata of a document
+    :type metadata: dict
+    :param filter: metadata filter
+    :type filter: dict
+    :return: True if the metadata match
+    :rtype: bool
+    """
+    for field, condition in filter.items():
+        if field == "$and":
+            if not all(_matches(metadata, sub_filter) for sub_filter in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(_matches(metadata, sub_filter) for sub_filter in condition):
+                return False
+            continue
+        value = metadata.get(field)
+        values = value if isinstance(value, list) else [value]  # list values match if any element does
+        conditions = condition if isinstance(condition, dict) else {"$eq": condition}
+        for operator, operand in conditions.items():
+            if operator == "$eq":
+                matched = operand in values
+            elif operator == "$ne":
+                matched = operand not in values
+            elif operator == "$in":
+                matched = any(item in operand for item in values)
+            elif operator == "$nin":
+                matched = not any(item in operand for item in values)
+            else:
+                raise ValueError(f"Unsupported filter operator '{operator}'.")
+            if not matched:
+                return False
+    return True
+
@@ -0,0 +1,66 @@
+"""
+Module implementing a vectorized Maximal Marginal Relevance (MMR) selector.
+
+The query-candidate and candidate-candidate similarities are computed once
+as matrix products, then the greedy selection only updates a vector holding
+the maximum similarity of each candidate to the already selected ones.
+This replaces the nested Python loop (and the repeated similarity computation)
+of the generic LangChain implementation, so large fetch_k values stay cheap.
+"""
+
+# Import packages and modules
+
+import numpy as np
+
+
+# Define functions
+def maximal_marginal_relevance(
+    query_embedding: list[float] | np.ndarray,
+    embedding_list: list[list[float]] | np.ndarray,
+    lambda_mult: float = 0.5,
+    k: int = 4,
+) -> list[int]:
+    """
+    Select the candidates maximizing relevance to the query and diversity among them.
+
+    Each step picks the candidate maximizing
+    lambda_mult * sim(query, candidate) - (1 - lambda_mult) * max sim(candidate, selected),
+    using cosine similarity.
+
+    :param query_embedding: query vector
+    :type query_embedding: list[float] | np.ndarray
+    :param embedding_list: candidates vectors (as returned by the index, no re-embedding)
+    :type embedding_list: list[list[float]] | np.ndarray
+    :param lambda_mult: trade-off between relevance (1) and diversity (0)
+    :type lambda_mult: float
+    :param k: number of candidates to select
+    :type k: int
+    :return: positions of the selected candidates, in selection order
+    :rtype: list[int]
+    """
+    candidates = np.asarray(embedding_list, dtype=np.float32)
+    k = min(k, len(candidates))
+    if k <= 0:
+        return []
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+
+    # Cosine similarities computed once
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+    similarity_to_query = candidates @ query  # (n,)
+    similarity_between = candidates @ candidates.T  # (n, n)
+
+    relevance = lambda_mult * similarity_to_query
+    max_similarity_to_selected = np.full(len(candidates), -np.inf, dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+
+    selected = [int(np.argmax(similarity_to_query))]
+    for _ in range(k - 1):
+        last = selected[-1]
+        available[last] = False
+        np.maximum(max_similarity_to_selected, similarity_between[:, last], out=max_similarity_to_selected)
+        scores = relevance - (1 - lambda_mult) * max_similarity_to_selected
+        scores[~available] = -np.inf
+        selected.append(int(np.argmax(scores)))
+
+    return selected
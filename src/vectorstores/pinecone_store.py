@@ -0,0 +1,72 @@
+"""Module extending the Pinecone Vector Store with the vectorized MMR selector and the bounded async search."""
+
+# Import packages and modules
+
+from typing import Any
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_pinecone import PineconeVectorStore
+from typing_extensions import Self
+
+from src.vectorstores.async_search import AsyncSearchMixin
+from src.vectorstores.mmr import maximal_marginal_relevance
+
+
+# Define classes
+class PineconeMMRVectorStore(AsyncSearchMixin, PineconeVectorStore):
+    """Pinecone Vector Store running MMR on the vectors returned by the query."""
+
+    def max_marginal_relevance_search_by_vector(
+        self: Self,
+        embedding: list[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: dict | None = None,
+        namespace: str | None = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        """
+        Return documents selected using Maximal Marginal Relevance from a query vector.
+
+        :param embedding: query vector
+        :type embedding: list[float]
+        :param k: number of documents to return
+        :type k: int
+        :param fetch_k: number of documents to fetch before MMR
+        :type fetch_k: int
+        :param lambda_mult: trade-off between relevance (1) and diversity (0)
+        :type lambda_mult: float
+        :param filter: metadata filter
+        :type filter: dict | None
+        :param namespace: namespace to search in
+        :type namespace: str | None
+        :return: documents selected by MMR
+        :rtype: list[Document]
+        """
+        results = self.index.query(
+            vector=embedding,
+            top_k=fetch_k,
+            include_values=True,  # reuse the stored vectors instead of re-embedding the candidates
+            include_metadata=True,
+            namespace=namespace if namespace is not None else self._namespace,
+            filter=filter,
+        )
+        matches = [match for match in results["matches"] if self._text_key in match["metadata"]]
+        if not matches:
+            return []
+        selected = maximal_marginal_relevance(
+            query_embedding=embedding,
+            embedding_list=np.asarray([match["values"] for match in matches], dtype=np.float32),
+            lambda_mult=lambda_mult,
+            k=k,
+        )
+        return [
+            Document(
+                id=matches[position]["id"],
+                page_content=matches[position]["metadata"].pop(self._text_key),
+                metadata=matches[position]["metadata"],
+            )
+            for position in selected
+        ]